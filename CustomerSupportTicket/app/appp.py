@@ -1,13 +1,33 @@
 
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Query, Request
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 from pydantic import BaseModel
-from models.S import analyze_sentiment
-from models.R import automate_response
-from models.I import escalateit
-import requests
+from models.S import analyze_sentiment, analyze_sentiment_batch, SENTIMENT_BATCH_SIZE
+from models.R import automate_response, stream_automate_response
+from models.combined import TICKET_ANALYSIS_MODE, analyze_and_respond
+from models.I import escalateit, escalation_candidate, escalation_certain
+from models.clients import init_clients, close_clients
+from models.cache import result_cache
+from models.embedding_cache import get_embedding_cache
+from models.semantic_cache import semantic_cache
+from models.dedup import DEDUP_ENABLED, DEDUP_INDEX_PATH, ticket_dedup, dedup_namespace
+from models.local_sentiment import classify_locally, sentiment_routing
+from models.breakers import CircuitOpenError, breakers, degraded_paths, mongo_breaker
+from models.webhooks import webhook_dispatcher
+from models.metrics import metrics, track_stage, CONTENT_TYPE
+from models.scheduler import llm_scheduler, priority_context
+import asyncio
+import functools
+import json
+import math
+import os
 import logging
+from concurrent.futures import ThreadPoolExecutor
+from bson import ObjectId
+from bson.errors import InvalidId
+from pymongo import DESCENDING, IndexModel
 from motor.motor_asyncio import AsyncIOMotorClient
-from typing import Dict
+from typing import Dict, Optional
 
 # Initialize FastAPI app
 app = FastAPI()
@@ -20,6 +40,40 @@ MONGO_URL = "mongodb://ticket:27017"  # Change this to your MongoDB URL if neede
 DATABASE_NAME = "tickets_system"
 COLLECTION_NAME = "tickets"
 
+# Worker threads used to run the blocking Gemini / Pinecone / HTTP calls off the event loop
+STAGE_WORKERS = int(os.environ.get("STAGE_WORKERS", "64"))
+# Separate threads for escalated tickets, so they never queue behind routine ones for a thread
+PRIORITY_STAGE_WORKERS = int(os.environ.get("PRIORITY_STAGE_WORKERS", "16"))
+
+# GET /tickets: default and maximum page size
+TICKETS_PAGE_SIZE = 50
+TICKETS_MAX_PAGE_SIZE = 200
+
+# Fields returned by GET /tickets unless the full documents are requested
+TICKET_LIST_PROJECTION = {
+    "customer_email": 1,
+    "sentiment": 1,
+    "escalation_required": 1,
+    "priority": 1,
+}
+
+# Each filterable field is paired with _id so filtered "latest first" pages
+# are an index range scan whatever the collection size
+TICKET_INDEXES = [
+    IndexModel([("escalation_required", DESCENDING), ("_id", DESCENDING)]),
+    IndexModel([("priority", DESCENDING), ("_id", DESCENDING)]),
+    IndexModel([("sentiment", DESCENDING), ("_id", DESCENDING)]),
+    IndexModel([("customer_email", DESCENDING), ("_id", DESCENDING)]),
+]
+
+# Sent when the response cannot be generated (Gemini failing or its circuit open)
+DEGRADED_RESPONSE_BODY = ("Thank you for contacting us. We have received your ticket and a support agent "
+                          "will follow up with you shortly.")
+
+# Batch endpoint: tickets processed at once, and documents per insert_many call
+BATCH_CONCURRENCY = int(os.environ.get("BATCH_CONCURRENCY", "8"))
+BATCH_INSERT_SIZE = int(os.environ.get("BATCH_INSERT_SIZE", "50"))
+
 # Define the Ticket model
 class Ticket(BaseModel):
     subject: str
@@ -36,85 +90,884 @@ async def startup_db():
     app.db = app.mongodb_client[DATABASE_NAME]
     app.collection = app.db[COLLECTION_NAME]
 
+    # Blocking SDK calls run in this pool so a slow LLM call never stalls other tickets
+    app.stage_executor = ThreadPoolExecutor(max_workers=STAGE_WORKERS, thread_name_prefix="ticket-stage")
+    asyncio.get_running_loop().set_default_executor(app.stage_executor)
+    app.priority_executor = ThreadPoolExecutor(max_workers=PRIORITY_STAGE_WORKERS, thread_name_prefix="priority-stage")
+
+    # Build the Gemini model, Pinecone index and HTTP session once for the whole process
+    app.clients = await asyncio.to_thread(init_clients)
+
+    if DEDUP_ENABLED and DEDUP_INDEX_PATH:
+        loaded = await asyncio.to_thread(ticket_dedup.load)
+        logging.info("Loaded %d recent tickets into the duplicate index", loaded)
+
+    # Created in the background so an unreachable database does not hold up startup
+    app.index_task = asyncio.ensure_future(ensure_ticket_indexes(app.collection))
+
+
+async def ensure_ticket_indexes(collection):
+    """
+    Create the indexes behind GET /tickets (a no-op when they already exist).
+    """
+    try:
+        names = await collection.create_indexes(TICKET_INDEXES)
+        logging.info("Ticket indexes ready: %s", ", ".join(names))
+    except Exception as e:
+        logging.error("Could not create ticket indexes: %s", str(e))
+
 @app.on_event("shutdown")
 async def shutdown_db():
+    app.index_task.cancel()
     app.mongodb_client.close()
+    # Give queued webhooks a chance to go out before the process exits
+    await asyncio.to_thread(webhook_dispatcher.stop)
+    if DEDUP_ENABLED and DEDUP_INDEX_PATH:
+        await asyncio.to_thread(ticket_dedup.save)
+    close_clients()
+    app.stage_executor.shutdown(wait=False)
+    app.priority_executor.shutdown(wait=False)
+
+
+def parse_sentiment_result(sentiment_result):
+    """
+    Normalize the output of the sentiment model into (sentiment, thought).
+    """
+    if isinstance(sentiment_result, str):
+        return sentiment_result, ""  # No additional thought if it's just a string sentiment
+    if isinstance(sentiment_result, dict) and "sentiment" in sentiment_result:
+        # The model module returns "thoughts"; older callers used "thought"
+        thought = sentiment_result.get("thought", sentiment_result.get("thoughts", ""))
+        return sentiment_result["sentiment"], thought
+    raise ValueError("Invalid response from sentiment analysis model")
+
+
+def degradable(error):
+    """
+    Whether a failed stage should fall back instead of failing the ticket: dependency
+    errors and open circuits do, unusable input or replies (ValueError) do not.
+    """
+    return isinstance(error, Exception) and not isinstance(error, ValueError)
+
+
+def fallback_sentiment(ticket: Ticket, degraded):
+    """
+    (sentiment, thought) when Gemini gave no sentiment: the local classifier's label at
+    any confidence, or (None, ...) when no local model is available.
+    """
+    local = classify_locally(ticket.subject, ticket.body)
+    if local is None:
+        return None, "Sentiment unavailable; escalation decided by keywords only."
+    label, confidence = local
+    degraded.append("local_sentiment")
+    return label, f"Gemini unavailable; classified locally with {confidence:.0%} confidence."
+
+
+def resolve_sentiment(ticket: Ticket, sentiment_result, degraded):
+    """
+    (sentiment, thought) from a sentiment stage's outcome, falling back when it raised
+    (the exception is passed in) or gave no usable answer (None).
+    """
+    if sentiment_result is None or isinstance(sentiment_result, Exception):
+        return fallback_sentiment(ticket, degraded)
+    return parse_sentiment_result(sentiment_result)
+
+
+def fallback_response(ticket: Ticket, degraded):
+    degraded.append("canned_response")
+    return f"Re: {ticket.subject}", DEGRADED_RESPONSE_BODY
+
+
+def record_degraded(document: Dict, degraded):
+    """
+    Mark a ticket document with the fallbacks used for it (if any) and count them.
+    """
+    if degraded:
+        document["degraded"] = degraded
+        for path in degraded:
+            degraded_paths.inc(path=path)
+    return document
+
+
+def check_mongo():
+    """
+    Fail fast, before any LLM work, while MongoDB's circuit is open.
+    """
+    retry_after = mongo_breaker.retry_after()
+    if retry_after:
+        raise CircuitOpenError(mongo_breaker.name, retry_after)
+
+
+def service_unavailable(error: CircuitOpenError):
+    return HTTPException(status_code=503, detail=f"Service temporarily unavailable: {str(error)}",
+                         headers={"Retry-After": str(max(1, math.ceil(error.retry_after)))})
+
+
+def ticket_priority_class(ticket: Ticket, default="standard"):
+    """
+    Scheduling class of a ticket's Gemini calls: "escalated" when its text matches
+    the rule that escalates regardless of sentiment, `default` otherwise.
+    """
+    if escalation_certain({"tag_1": ticket.subject, "tag_2": ticket.body}):
+        return "escalated"
+    return default
+
+
+async def run_stage(priority_class, func, *args):
+    """
+    Run a blocking stage in a worker thread with its Gemini calls scheduled as `priority_class`.
+    """
+    executor = app.priority_executor if priority_class == "escalated" else None
+    context = priority_context(priority_class)
+    return await asyncio.get_running_loop().run_in_executor(executor, functools.partial(context.run, func, *args))
+
+
+async def analyze_ticket(ticket: Ticket, sentiment_task=None, default_class="standard") -> Dict:
+    """
+    Run the analysis stages for one ticket and build the document to store.
+
+    Sentiment classification and the response branch (extraction, retrieval and
+    generation) do not depend on each other, so they run concurrently in worker
+    threads and the ticket costs roughly the slower of the two branches.
+    `sentiment_task` is an awaitable supplying the sentiment result when it is
+    computed elsewhere (e.g. batched with other tickets).
+
+    With TICKET_ANALYSIS_MODE=combined (and no batched sentiment), one Gemini call
+    returns the sentiment together with the product and issue, and the response
+    is generated from it.
+
+    Gemini calls are scheduled as "escalated" when the ticket matches the
+    sentiment-independent escalation rule and as `default_class` otherwise.
+
+    When Gemini fails or its circuit is open, the ticket is still answered: the
+    sentiment comes from the local classifier (or escalation from keywords alone)
+    and the response is a canned acknowledgement. The fallbacks used are listed
+    in the document's "degraded" field.
+    """
+    priority_class = ticket_priority_class(ticket, default_class)
+    if sentiment_task is None and TICKET_ANALYSIS_MODE == "combined":
+        try:
+            sentiment_result, auto_response = await run_stage(
+                priority_class, analyze_and_respond, ticket.subject, ticket.body
+            )
+        except Exception as e:
+            if not degradable(e):
+                raise
+            sentiment_result, auto_response = e, e
+    else:
+        if sentiment_task is None:
+            sentiment_task = run_stage(priority_class, analyze_sentiment, ticket.subject, ticket.body)
+
+        # Step 1: Sentiment analysis and response automation in parallel
+        sentiment_result, auto_response = await asyncio.gather(
+            sentiment_task,
+            run_stage(priority_class, automate_response, ticket.subject, ticket.body),
+            return_exceptions=True,
+        )
+        for outcome in (sentiment_result, auto_response):
+            if isinstance(outcome, BaseException) and not degradable(outcome):
+                raise outcome
+
+    degraded = []
+    if isinstance(auto_response, Exception):
+        logging.error("Response generation unavailable, sending the canned reply: %s", str(auto_response))
+        auto_response = fallback_response(ticket, degraded)
+    sentiment, thought = resolve_sentiment(ticket, sentiment_result, degraded)
+    escalation_required, priority = assess_escalation(ticket, sentiment, degraded)
+
+    # Construct response payload
+    return record_degraded({
+        "customer_email": ticket.customer_email,
+        "customer_ticket": ticket.body,
+        "sentiment": sentiment,
+        "thought": thought,
+        "escalation_required": escalation_required,
+        "priority": priority,
+        "response": auto_response
+    }, degraded)
+
+
+def assess_escalation(ticket: Ticket, sentiment, degraded=None):
+    """
+    Return (escalation_required, priority) for a ticket with a known sentiment.
+    Without a sentiment any escalation keyword rule escalates the ticket, so an
+    outage errs towards escalating.
+    """
+    if sentiment is None:
+        if degraded is not None:
+            degraded.append("keyword_escalation")
+        escalation_required = escalation_candidate({"tag_1": ticket.subject, "tag_2": ticket.body})
+        return escalation_required, "high" if escalation_required else "low"
+
+    # Step 2: Set priority based on sentiment
+    priority = "high" if sentiment == "frustrated" else "low"
+
+    # Step 3: Prepare issue for escalation based on certain tags (simplified example)
+    incoming_issue = {
+        "priority": priority,
+        "tag_1": ticket.subject,
+        "tag_2": ticket.body,
+        "tag_3": ""
+    }
+
+    # Step 4: Determine if issue escalation is needed
+    escalation_required = escalateit(incoming_issue)
+
+    # Update priority if escalation is required
+    priority = "high" if escalation_required else "low"
+    return escalation_required, priority
+
+
+def build_zapier_payload(ticket: Ticket, auto_response) -> Dict:
+    return {
+        "To": ticket.customer_email,
+        "Subject": f"Issue Report: {ticket.subject}",
+        "Body": f"{auto_response}\nThank you for bringing this to our attention.\nRegards, Support Team"
+    }
+
+
+def send_to_zapier(payload: Dict):
+    """
+    Hand the payload to the background webhook dispatcher; delivery, retries and
+    dead-lettering happen off the request path.
+    """
+    with track_stage("zapier_enqueue"):
+        return webhook_dispatcher.enqueue(ZAPIER_WEBHOOK_URL, payload)
+
+
+async def find_duplicate(signature, namespace):
+    """
+    Return (stored document, similarity) of a near-identical earlier ticket from the
+    same customer within the dedup window, or None.
+    """
+    match = ticket_dedup.query(signature, namespace)
+    if match is None:
+        return None
+    key, similarity = match
+    try:
+        with mongo_breaker.guard(), track_stage("mongo"):
+            original = await app.collection.find_one({"_id": ObjectId(key)})
+    except Exception as e:
+        logging.error("Duplicate lookup failed, processing the ticket as new: %s", str(e))
+        return None
+    if original is None:
+        # The original was deleted; process this copy as a new ticket
+        ticket_dedup.discard(key)
+        return None
+    if not original.get("response"):
+        # Nothing to reuse (e.g. the original was itself degraded); analyze this copy
+        return None
+    ticket_dedup.record_duplicate()
+    return original, similarity
+
+
+async def store_duplicate(ticket: Ticket, original: Dict, similarity: float):
+    """
+    Store a ticket that duplicates `original`, reusing its analysis instead of re-running it.
+    The stored copy is flagged with duplicate_of, and the customer is still sent the
+    reused response so no submission goes unanswered.
+    """
+    document = {
+        "customer_email": ticket.customer_email,
+        "customer_ticket": ticket.body,
+        "duplicate_of": str(original["_id"]),
+        "duplicate_similarity": similarity,
+        **{field: original.get(field) for field in ("sentiment", "thought", "escalation_required", "priority", "response")},
+    }
+    with mongo_breaker.guard(), track_stage("mongo"):
+        result = await app.collection.insert_one(document)
+    send_to_zapier(build_zapier_payload(ticket, document["response"]))
+    return {
+        "status": "success",
+        "message": "Duplicate of an earlier ticket; its result was reused",
+        "ticket_id": str(result.inserted_id),
+        "duplicate_of": str(original["_id"]),
+    }
+
+
+def dedup_key(ticket: Ticket):
+    """
+    (MinHash signature, namespace) of a ticket for the near-duplicate window, or
+    (None, None) when dedup is off.
+    """
+    if not DEDUP_ENABLED:
+        return None, None
+    text = f"{ticket.subject}\n{ticket.body}"
+    return ticket_dedup.signature(text), dedup_namespace(ticket.customer_email, text)
+
+
+async def store_ticket(ticket: Ticket, document: Dict, signature=None, namespace=None) -> str:
+    """
+    Save an analyzed ticket to MongoDB, add it to the dedup window and queue its
+    Zapier webhook. Returns the stored ticket id.
+    """
+    with mongo_breaker.guard(), track_stage("mongo"):
+        result = await app.collection.insert_one(document)
+    if signature is not None:
+        ticket_dedup.add(str(result.inserted_id), signature, namespace)
+    send_to_zapier(build_zapier_payload(ticket, document["response"]))
+    return str(result.inserted_id)
+
 
 @app.post("/process-ticket/")
 async def process_ticket(ticket: Ticket):
     try:
-        # Step 1: Sentiment analysis
-        sentiment_result = analyze_sentiment(ticket.subject, ticket.body)
-
-        # Handle different types of sentiment analysis results
-        if isinstance(sentiment_result, str):
-            sentiment = sentiment_result
-            thought = ""  # No additional thought if it's just a string sentiment
-        elif isinstance(sentiment_result, dict) and "sentiment" in sentiment_result:
-            sentiment = sentiment_result["sentiment"]
-            thought = sentiment_result.get("thought", "")  # Default to empty string if no thought
-        else:
-            raise ValueError("Invalid response from sentiment analysis model")
-
-        # Step 2: Set priority based on sentiment
-        priority = "high" if sentiment == "frustrated" else "low"
-
-        # Step 3: Prepare issue for escalation based on certain tags (simplified example)
-        incoming_issue = {
-            "priority": priority,
-            "tag_1": ticket.subject,
-            "tag_2": ticket.body,
-            "tag_3": ""
-        }
+        with track_stage("process_ticket"):
+            check_mongo()
+
+            # Near-identical resubmissions from the same customer reuse the stored result
+            signature, namespace = dedup_key(ticket)
+            if signature is not None:
+                duplicate = await find_duplicate(signature, namespace)
+                if duplicate is not None:
+                    return await store_duplicate(ticket, *duplicate)
 
-        # Step 4: Determine if issue escalation is needed
-        escalation_required = escalateit(incoming_issue)
+            # Steps 1-5: Sentiment, escalation and automated response
+            response = await analyze_ticket(ticket)
 
-        # Update priority if escalation is required
-        priority = "high" if escalation_required else "low"
+            # Step 6: Save the response to MongoDB, then queue the Zapier webhook
+            ticket_id = await store_ticket(ticket, response, signature, namespace)
+
+        # Return response to client
+        return {"status": "success", "message": "Ticket processed successfully", "ticket_id": ticket_id}
+
+    except ValueError as val_err:
+        logging.error("Value error: %s", str(val_err))
+        raise HTTPException(status_code=400, detail=f"Processing error: {str(val_err)}")
+    except CircuitOpenError as open_err:
+        logging.error("Failing fast: %s", str(open_err))
+        raise service_unavailable(open_err)
+    except Exception as e:
+        logging.error("Unexpected error: %s", str(e), exc_info=True)
+        raise HTTPException(status_code=500, detail=f"An unexpected error occurred: {str(e)}")
 
-        # Step 5: Automate the response
-        auto_response = automate_response(ticket.subject, ticket.body)
 
-        # Construct response payload
-        response = {
+async def iter_batch_items(request: Request):
+    """
+    Yield raw ticket objects from a JSON array body or, for NDJSON bodies, line by line as they arrive.
+    """
+    content_type = request.headers.get("content-type", "")
+    if "ndjson" in content_type or "jsonlines" in content_type:
+        buffer = b""
+        async for chunk in request.stream():
+            buffer += chunk
+            *lines, buffer = buffer.split(b"\n")
+            for line in lines:
+                if line.strip():
+                    yield json.loads(line)
+        if buffer.strip():
+            yield json.loads(buffer)
+    else:
+        payload = await request.json()
+        if not isinstance(payload, list):
+            raise ValueError("Expected a JSON array of tickets")
+        for item in payload:
+            yield item
+
+
+async def process_batch_item(index, item, sentiment_task=None):
+    """
+    Analyze one ticket of a batch. Returns (result line, document to insert or None,
+    Zapier payload to send once the document is stored).
+    """
+    try:
+        ticket = Ticket(**item)
+        with track_stage("batch_ticket"):
+            document = await analyze_ticket(ticket, sentiment_task, default_class="bulk")
+    except Exception as e:
+        logging.error("Batch ticket %s failed: %s", index, str(e))
+        return {"index": index, "status": "error", "detail": str(e)}, None, None
+
+    # Assign the id up front so the result can be streamed before the bulk insert runs
+    document["_id"] = ObjectId()
+    result = {
+        "index": index,
+        "status": "success",
+        "ticket_id": str(document["_id"]),
+        "sentiment": document["sentiment"],
+        "escalation_required": document["escalation_required"],
+        "priority": document["priority"],
+    }
+    return result, document, build_zapier_payload(ticket, document["response"])
+
+
+class BatchStreamingResponse(StreamingResponse):
+    """
+    StreamingResponse that starts watching for a client disconnect only once the
+    request body has been read. Below ASGI spec 2.4 Starlette's disconnect
+    listener reads from `receive` as well, and would swallow body chunks the
+    batch is still consuming.
+    """
+
+    def __init__(self, content, body_read: asyncio.Event, **kwargs):
+        super().__init__(content, **kwargs)
+        self.body_read = body_read
+
+    async def listen_for_disconnect(self, receive):
+        await self.body_read.wait()
+        await super().listen_for_disconnect(receive)
+
+
+async def start_batch(request: Request, concurrency: int):
+    """
+    Feed the request's tickets to `concurrency` workers and return (an async
+    generator yielding one NDJSON line per ticket as it completes, an event set
+    once the request body has been read).
+
+    The first ticket is read before responding, so a body that is not a batch at
+    all gets a 400. After that the body is read by a background task while results
+    stream back; the queues between reader, workers and response are bounded, so
+    a batch holds at most a few BATCH_INSERT_SIZE documents in memory. Clients
+    sending very large NDJSON bodies should read the response while they send.
+
+    Documents are written with insert_many every BATCH_INSERT_SIZE tickets and
+    their Zapier webhooks are queued only once the write succeeds; a failed write
+    is reported as an extra error line naming the affected ticket ids. A malformed
+    line part-way through stops reading: the tickets before it are still processed
+    and stored, and the summary line that ends the stream carries the error.
+    """
+    items = iter_batch_items(request)
+    try:
+        first = await items.__anext__()
+    except StopAsyncIteration:
+        first = None
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid batch payload: {str(e)}")
+
+    inbox = asyncio.Queue(maxsize=concurrency * 2)
+    outbox = asyncio.Queue(maxsize=concurrency * 2)
+    body_read = asyncio.Event()
+    summary = {"status": "done", "received": 0, "succeeded": 0, "failed": 0, "inserted": 0}
+
+    async def worker():
+        while True:
+            job = await inbox.get()
+            if job is None:
+                break
+            await outbox.put(await process_batch_item(*job))
+        await outbox.put(None)
+
+    async def flush(pending):
+        documents = [document for document, _ in pending]
+        try:
+            with mongo_breaker.guard(), track_stage("mongo_bulk"):
+                result = await app.collection.insert_many(documents, ordered=False)
+        except Exception as e:
+            logging.error("Bulk insert of %d tickets failed: %s", len(documents), str(e))
+            return {
+                "status": "error",
+                "detail": f"Failed to store tickets: {str(e)}",
+                "ticket_ids": [str(document["_id"]) for document in documents],
+            }
+        summary["inserted"] += len(result.inserted_ids)
+        for _, payload in pending:
+            send_to_zapier(payload)
+        return None
+
+    async def dispatch(chunk):
+        # One Gemini call classifies the sentiment of every valid ticket in the chunk
+        tickets = []
+        for position, (index, item) in enumerate(chunk):
+            try:
+                ticket = Ticket(**item)
+                tickets.append((position, ticket))
+            except Exception:
+                pass  # reported by the worker
+        shared = None
+        if tickets:
+            shared = asyncio.ensure_future(run_stage(
+                "bulk", analyze_sentiment_batch, [(ticket.subject, ticket.body) for _, ticket in tickets]
+            ))
+        slots = {position: slot for slot, (position, _) in enumerate(tickets)}
+
+        async def pick(slot):
+            return (await shared)[slot]
+
+        for position, (index, item) in enumerate(chunk):
+            sentiment_task = pick(slots[position]) if position in slots else None
+            await inbox.put((index, item, sentiment_task))
+
+    async def reader():
+        index = 0
+        chunk = []
+        try:
+            if first is not None:
+                chunk.append((index, first))
+                index += 1
+                async for item in items:
+                    chunk.append((index, item))
+                    index += 1
+                    if len(chunk) >= SENTIMENT_BATCH_SIZE:
+                        await dispatch(chunk)
+                        chunk = []
+        except Exception as e:
+            # A malformed line, or the client went away mid-body
+            logging.error("Batch input stopped after %d tickets: %s", index, str(e))
+            summary["status"] = "error"
+            summary["detail"] = f"Invalid batch payload: {str(e)}"
+        finally:
+            body_read.set()
+        if chunk:
+            await dispatch(chunk)
+        summary["received"] = index
+        for _ in range(concurrency):
+            await inbox.put(None)
+
+    workers = [asyncio.create_task(worker()) for _ in range(concurrency)]
+    reading = asyncio.create_task(reader())
+
+    async def results():
+        pending = []
+        running = concurrency
+        try:
+            while running:
+                item = await outbox.get()
+                if item is None:
+                    running -= 1
+                    continue
+                line, document, payload = item
+                if document is None:
+                    summary["failed"] += 1
+                else:
+                    summary["succeeded"] += 1
+                    pending.append((document, payload))
+                yield json.dumps(line) + "\n"
+
+                if len(pending) >= BATCH_INSERT_SIZE:
+                    error = await flush(pending)
+                    pending = []
+                    if error:
+                        yield json.dumps(error) + "\n"
+
+            if pending:
+                error = await flush(pending)
+                if error:
+                    yield json.dumps(error) + "\n"
+            yield json.dumps(summary) + "\n"
+        finally:
+            reading.cancel()
+            for task in workers:
+                task.cancel()
+
+    return results(), body_read
+
+
+@app.post("/process-tickets/batch")
+async def process_tickets_batch(
+    request: Request,
+    concurrency: int = Query(BATCH_CONCURRENCY, ge=1, le=STAGE_WORKERS),
+):
+    """
+    Process many tickets in one request. Accepts a JSON array or an NDJSON stream
+    (Content-Type: application/x-ndjson) of tickets and streams back one NDJSON
+    result per ticket in completion order, each carrying the ticket's input index.
+    """
+    # Tickets could not be stored: fail before analyzing any of them
+    try:
+        check_mongo()
+    except CircuitOpenError as e:
+        raise service_unavailable(e)
+    results, body_read = await start_batch(request, concurrency)
+    return BatchStreamingResponse(results, body_read, media_type="application/x-ndjson")
+
+
+def sse_event(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+def stream_response_events(ticket: Ticket, loop, queue):
+    """
+    Run the streaming response pipeline in a worker thread, handing each event to the event loop's queue.
+    """
+    try:
+        for kind, text in stream_automate_response(ticket.subject, ticket.body):
+            loop.call_soon_threadsafe(queue.put_nowait, (kind, text))
+    except Exception as e:
+        loop.call_soon_threadsafe(queue.put_nowait, ("error", e))
+    loop.call_soon_threadsafe(queue.put_nowait, None)
+
+
+async def ticket_event_stream(ticket: Ticket):
+    """
+    Server-sent events for one ticket: sentiment, escalation, the response subject,
+    the response body token by token, and finally the stored ticket id.
+
+    The response starts generating at once, alongside sentiment; its tokens are
+    queued while sentiment and escalation are sent and are forwarded as they arrive.
+    Dedup, the sentiment and response fallbacks and storage are the same as for
+    /process-ticket/; a duplicate replays the original's result.
+    """
+    loop = asyncio.get_running_loop()
+    queue = asyncio.Queue()
+    priority_class = ticket_priority_class(ticket)
+    producer = None
+    degraded = []
+    try:
+        signature, namespace = dedup_key(ticket)
+        duplicate = await find_duplicate(signature, namespace) if signature is not None else None
+        if duplicate is not None:
+            original = duplicate[0]
+            subject, body = original["response"]
+            yield sse_event("sentiment", {"sentiment": original.get("sentiment"), "thought": original.get("thought")})
+            yield sse_event("escalation", {"escalation_required": original.get("escalation_required"),
+                                           "priority": original.get("priority")})
+            yield sse_event("subject", {"subject": subject})
+            yield sse_event("token", {"text": body})
+            yield sse_event("done", await store_duplicate(ticket, *duplicate))
+            return
+
+        producer = asyncio.ensure_future(run_stage(priority_class, stream_response_events, ticket, loop, queue))
+        try:
+            sentiment_result = await run_stage(priority_class, analyze_sentiment, ticket.subject, ticket.body)
+        except Exception as e:
+            if not degradable(e):
+                raise
+            logging.error("Sentiment unavailable, using the fallback: %s", str(e))
+            sentiment_result = e
+        sentiment, thought = resolve_sentiment(ticket, sentiment_result, degraded)
+        yield sse_event("sentiment", {"sentiment": sentiment, "thought": thought})
+
+        escalation_required, priority = assess_escalation(ticket, sentiment, degraded)
+        yield sse_event("escalation", {"escalation_required": escalation_required, "priority": priority})
+
+        subject, tokens = "No subject", []
+        while True:
+            event = await queue.get()
+            if event is None:
+                break
+            kind, value = event
+            if kind == "error":
+                # Nothing streamed yet: send the canned reply instead of an error
+                if tokens or subject != "No subject" or not degradable(value):
+                    raise value
+                subject, body = fallback_response(ticket, degraded)
+                tokens.append(body)
+                yield sse_event("subject", {"subject": subject})
+                yield sse_event("token", {"text": body})
+                continue
+            if kind == "subject":
+                subject = value
+                yield sse_event("subject", {"subject": value})
+            else:
+                tokens.append(value)
+                yield sse_event("token", {"text": value})
+
+        # Store and notify exactly as /process-ticket/ does
+        document = record_degraded({
             "customer_email": ticket.customer_email,
             "customer_ticket": ticket.body,
             "sentiment": sentiment,
             "thought": thought,
             "escalation_required": escalation_required,
             "priority": priority,
-            "response": auto_response
-        }
+            "response": (subject, "".join(tokens)),
+        }, degraded)
+        ticket_id = await store_ticket(ticket, document, signature, namespace)
+        yield sse_event("done", {"status": "success", "ticket_id": ticket_id})
+    except Exception as e:
+        logging.error("Streaming ticket failed: %s", str(e), exc_info=True)
+        yield sse_event("error", {"detail": str(e)})
+    finally:
+        if producer is not None:
+            await asyncio.gather(producer, return_exceptions=True)
 
-        # Step 6: Save the response to MongoDB
-        result = await app.collection.insert_one(response)  # Insert into MongoDB
 
-        # Step 7: Prepare Zapier payload
-        zapier_payload = {
-            "To": ticket.customer_email,
-            "Subject": f"Issue Report: {ticket.subject}",
-            "Body": f"{auto_response}\nThank you for bringing this to our attention.\nRegards, Support Team"
-        }
+def sse_response(ticket: Ticket):
+    # Fail before any LLM work while the ticket could not be stored
+    try:
+        check_mongo()
+    except CircuitOpenError as e:
+        raise service_unavailable(e)
+    # No proxy buffering, so each event reaches the agent as soon as it is sent
+    return StreamingResponse(ticket_event_stream(ticket), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
 
-        # Step 8: Send data to Zapier via webhook
-        zapier_response = requests.post(ZAPIER_WEBHOOK_URL, json=zapier_payload)
-        zapier_response.raise_for_status()  # Raise error if something goes wrong
 
-        # Return response to client
-        return {"status": "success", "message": "Ticket processed successfully", "ticket_id": str(result.inserted_id)}
+@app.post("/process-ticket/stream")
+async def process_ticket_stream(ticket: Ticket):
+    """
+    Like /process-ticket/, but streams progress as server-sent events (sentiment,
+    escalation, subject, token..., done) so the response body appears as it is generated.
+    """
+    return sse_response(ticket)
 
-    except requests.RequestException as req_err:
-        logging.error("Error sending data to Zapier: %s", str(req_err))
-        raise HTTPException(status_code=500, detail=f"Failed to send data to Zapier: {str(req_err)}")
-    except ValueError as val_err:
-        logging.error("Value error: %s", str(val_err))
-        raise HTTPException(status_code=400, detail=f"Processing error: {str(val_err)}")
-    except Exception as e:
-        logging.error("Unexpected error: %s", str(e), exc_info=True)
-        raise HTTPException(status_code=500, detail=f"An unexpected error occurred: {str(e)}")
+
+@app.get("/process-ticket/stream")
+async def process_ticket_stream_get(subject: str, body: str, customer_email: str):
+    """
+    GET form of /process-ticket/stream for EventSource clients, which cannot POST.
+    """
+    return sse_response(Ticket(subject=subject, body=body, customer_email=customer_email))
+
+
+@app.get("/tickets")
+async def list_tickets(
+    priority: Optional[str] = None,
+    sentiment: Optional[str] = None,
+    escalation_required: Optional[bool] = None,
+    customer_email: Optional[str] = None,
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    limit: int = Query(TICKETS_PAGE_SIZE, ge=1, le=TICKETS_MAX_PAGE_SIZE),
+    full: bool = Query(False, description="include the ticket text, thought and response"),
+):
+    """
+    Processed tickets, newest first, optionally filtered. Pages are keyset-paginated
+    on _id: pass the returned next_cursor to get the following page.
+    """
+    query = {}
+    for field, value in (("priority", priority), ("sentiment", sentiment),
+                         ("escalation_required", escalation_required), ("customer_email", customer_email)):
+        if value is not None:
+            query[field] = value
+    if cursor is not None:
+        try:
+            query["_id"] = {"$lt": ObjectId(cursor)}
+        except (InvalidId, TypeError):
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    projection = None if full else TICKET_LIST_PROJECTION
+    try:
+        with mongo_breaker.guard():
+            documents = await app.collection.find(query, projection).sort("_id", DESCENDING).limit(limit).to_list(
+                length=limit)
+    except CircuitOpenError as e:
+        raise service_unavailable(e)
+
+    tickets = []
+    for document in documents:
+        ticket_id = document.pop("_id")
+        tickets.append({"ticket_id": str(ticket_id), "created_at": ticket_id.generation_time.isoformat(), **document})
+    next_cursor = tickets[-1]["ticket_id"] if len(tickets) == limit else None
+    return {"tickets": tickets, "next_cursor": next_cursor}
+
+
+@app.get("/cache/stats")
+def cache_stats():
+    """
+    Hit/miss counters of the LLM result cache and the Gemini calls it saved,
+    plus size, hit rate and evictions of the embedding cache and the threshold,
+    hit rate and generations avoided by the semantic response cache.
+    """
+    return {
+        **result_cache.stats(),
+        "embeddings": get_embedding_cache().stats(),
+        "semantic": semantic_cache.stats(),
+    }
+
+
+@app.delete("/cache/semantic")
+def invalidate_semantic_cache(product_name: Optional[str] = None):
+    """
+    Forget reusable answers for one product (or for all products), e.g. once an outage is resolved.
+    """
+    return {"product_name": product_name, "removed": semantic_cache.invalidate(product_name)}
+
+
+@app.get("/webhooks/stats")
+def webhook_stats():
+    """
+    Outbound webhook queue depth and delivery, retry and dead-letter counters.
+    """
+    return webhook_dispatcher.stats()
+
+
+@app.get("/dedup/stats")
+def dedup_stats():
+    """
+    Size of the near-duplicate window and how many tickets were linked to an earlier one.
+    """
+    return ticket_dedup.stats()
+
+
+@app.get("/sentiment/routing")
+def sentiment_routing_stats():
+    """
+    Share of tickets classified by the local model versus Gemini, and how often they agree.
+    """
+    return sentiment_routing.report()
+
+
+@app.get("/health")
+def health():
+    """
+    Circuit breaker state of each dependency (Gemini, Pinecone, MongoDB, Zapier).
+    "degraded" while any circuit is not closed, when tickets are answered through
+    fallbacks; HTTP 503 while MongoDB's circuit is open, as tickets cannot be stored.
+    """
+    dependencies = {name: breaker.stats() for name, breaker in breakers.items()}
+    healthy = all(dependency["state"] == "closed" for dependency in dependencies.values())
+    body = {"status": "ok" if healthy else "degraded", "dependencies": dependencies}
+    if dependencies["mongo"]["state"] == "open":
+        return JSONResponse(body, status_code=503)
+    return body
+
+
+@metrics.collector
+def component_metrics():
+    """
+    Counters the caches, webhook dispatcher and sentiment router already keep, read at scrape time.
+    """
+    cache = result_cache.stats()
+    embeddings = get_embedding_cache().stats()
+    webhooks = webhook_dispatcher.stats()
+    routing = sentiment_routing.report()
+    semantic = semantic_cache.stats()
+    dedup = ticket_dedup.stats()
+    scheduler = llm_scheduler.stats()
+    circuits = {name: breaker.stats() for name, breaker in breakers.items()}
+    stages = cache["stages"].items()
+    return [
+        ("result_cache_hits_total", "counter", "LLM result cache hits by stage.",
+         [({"stage": stage}, counters["hits"]) for stage, counters in stages]),
+        ("result_cache_misses_total", "counter", "LLM result cache misses by stage.",
+         [({"stage": stage}, counters["misses"]) for stage, counters in stages]),
+        ("result_cache_llm_calls_saved_total", "counter", "Gemini calls avoided by result cache hits.",
+         [({}, cache["llm_calls_saved"])]),
+        ("embedding_cache_hits_total", "counter", "Embedding cache hits.", [({}, embeddings["hits"])]),
+        ("embedding_cache_misses_total", "counter", "Embedding cache misses.", [({}, embeddings["misses"])]),
+        ("embedding_cache_evictions_total", "counter", "Embeddings evicted from the cache.",
+         [({}, embeddings["evictions"])]),
+        ("embedding_cache_entries", "gauge", "Embeddings currently cached.", [({}, embeddings["entries"])]),
+        ("semantic_cache_lookups_total", "counter", "Semantic response cache lookups by outcome.",
+         [({"outcome": "hit"}, semantic["hits"]), ({"outcome": "miss"}, semantic["misses"])]),
+        ("semantic_cache_entries", "gauge", "Reusable answers in the semantic response cache.",
+         [({}, semantic["entries"])]),
+        ("duplicate_tickets_total", "counter", "Tickets linked to an earlier near-identical ticket.",
+         [({}, dedup["duplicates"])]),
+        ("dedup_window_entries", "gauge", "Tickets in the near-duplicate detection window.",
+         [({}, dedup["entries"])]),
+        ("llm_scheduler_queue_depth", "gauge", "Gemini calls waiting for a scheduler slot by priority class.",
+         [({"priority": name}, depth) for name, depth in scheduler["queued"].items()]),
+        ("llm_scheduler_granted_total", "counter", "Scheduler slots granted by priority class.",
+         [({"priority": name}, count) for name, count in scheduler["granted"].items()]),
+        ("llm_scheduler_running", "gauge", "Gemini calls holding a scheduler slot.", [({}, scheduler["running"])]),
+        ("llm_scheduler_max_concurrency", "gauge", "Scheduler concurrency cap.",
+         [({}, scheduler["max_concurrency"])]),
+        ("webhook_deliveries_total", "counter", "Webhook sends by outcome.",
+         [({"outcome": "delivered"}, webhooks["delivered"]), ({"outcome": "dead_lettered"}, webhooks["dead_lettered"])]),
+        ("webhook_retries_total", "counter", "Webhook send attempts that were retried.", [({}, webhooks["retried"])]),
+        ("webhook_queue_depth", "gauge", "Webhooks waiting to be sent.", [({}, webhooks["queue_depth"])]),
+        ("webhook_in_flight", "gauge", "Webhooks currently being sent.", [({}, webhooks["in_flight"])]),
+        ("webhook_held", "gauge", "Webhooks waiting for the Zapier circuit to close.", [({}, webhooks["held"])]),
+        ("circuit_breaker_state", "gauge", "Circuit state by dependency: 0 closed, 1 half-open, 2 open.",
+         [({"dependency": name}, ("closed", "half_open", "open").index(circuit["state"]))
+          for name, circuit in circuits.items()]),
+        ("sentiment_routed_total", "counter", "Tickets classified by the local model or Gemini.",
+         [({"classifier": "local"}, routing["local"]), ({"classifier": "llm"}, routing["llm"])]),
+    ]
+
+
+@app.get("/metrics")
+def metrics_endpoint():
+    """
+    Per-stage latency histograms, LLM call/retry/failure counters, in-flight gauges
+    and cache and webhook counters in the Prometheus text format.
+    """
+    return Response(content=metrics.render(), media_type=CONTENT_TYPE)
 
 
 @app.get("/")
 def root():
-    return {"message": "Ticket Processing API is running. Use POST /process-ticket/ to process a ticket."}
+    return {"message": "Ticket Processing API is running. Use POST /process-ticket/ to process a ticket, "
+                       "/process-ticket/stream to receive the result as server-sent events, "
+                       "or POST /process-tickets/batch for many tickets."}
@@ -0,0 +1,5 @@
+"""
+Benchmarks for the ticket pipeline. Run them from the app directory, e.g.
+
+    python -m benchmarks.bench_client_setup
+"""
@@ -0,0 +1,96 @@
+"""
+Separate versus combined ticket analysis (TICKET_ANALYSIS_MODE) on the same tickets.
+
+Runs appp.analyze_ticket for helpdesk CSV tickets in both modes against the
+stand-in backends from benchmarks/fakes.py, with caches off, and reports
+Gemini generations per ticket, throughput and p50/p95/p99 latency.
+
+In separate mode sentiment already runs concurrently with the extraction ->
+retrieval -> generation branch, so with an idle quota both modes take about
+two generations end to end; the combined mode's gain is one generation fewer
+per ticket, which turns into lower latency once calls queue for the Gemini
+rate limit (try --gemini-rpm).
+
+    python -m benchmarks.bench_analysis_mode
+    python -m benchmarks.bench_analysis_mode --tickets 200 --concurrency 16 --gemini-rpm 600
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import logging
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.bench_pipeline import CSV_PATH, configure_environment, load_tickets, percentile
+
+MODES = ["separate", "combined"]
+
+
+async def run_mode(appp, mode, tickets, concurrency):
+    appp.TICKET_ANALYSIS_MODE = mode
+    # The same worker pool the app installs at startup
+    asyncio.get_running_loop().set_default_executor(ThreadPoolExecutor(max_workers=appp.STAGE_WORKERS))
+    limit = asyncio.Semaphore(concurrency)
+    timings, errors = [], 0
+
+    async def one(subject, body):
+        nonlocal errors
+        async with limit:
+            start = time.perf_counter()
+            try:
+                await appp.analyze_ticket(appp.Ticket(subject=subject, body=body, customer_email="benchmark@example.com"))
+            except Exception:
+                errors += 1
+            timings.append(time.perf_counter() - start)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(subject, body) for subject, body in tickets))
+    return time.perf_counter() - started, timings, errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--csv", default=CSV_PATH)
+    parser.add_argument("--tickets", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--gemini-ms", type=float, default=400)
+    parser.add_argument("--embed-ms", type=float, default=80)
+    parser.add_argument("--index-ms", type=float, default=40)
+    parser.add_argument("--sigma", type=float, default=0.35)
+    parser.add_argument("--gemini-rpm", type=int, help="Gemini requests-per-minute budget (default: unlimited)")
+    args = parser.parse_args()
+    args.cache = args.local_sentiment = False
+
+    if args.gemini_rpm:
+        os.environ["GEMINI_RPM"] = str(args.gemini_rpm)
+    configure_environment(args)
+    from benchmarks import fakes
+    from models.ratelimit import gemini_limiter
+    import appp
+
+    tickets = load_tickets(args.csv, args.tickets)
+    print(f"{len(tickets)} tickets, concurrency {args.concurrency}", file=sys.stderr)
+    print(f"{'mode':<10}{'errors':>8}{'calls/ticket':>14}{'tickets/s':>11}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}")
+    for mode in MODES:
+        # Fresh fakes with the same seeds, so both modes see the same latency draws
+        registry = fakes.install(
+            fakes.Latency(args.gemini_ms, args.sigma, seed=args.seed),
+            fakes.Latency(args.embed_ms, args.sigma, seed=args.seed + 1),
+            fakes.Latency(args.index_ms, args.sigma, seed=args.seed + 2),
+        )
+        gemini_limiter.reset()
+        logging.getLogger().setLevel(logging.WARNING)
+        with contextlib.redirect_stdout(io.StringIO()):
+            elapsed, timings, errors = asyncio.run(run_mode(appp, mode, tickets, args.concurrency))
+        calls = registry.gemini_model().calls / len(tickets)
+        print(f"{mode:<10}{errors:>8}{calls:>14.2f}{len(tickets) / elapsed:>11.1f}"
+              f"{percentile(timings, 0.5) * 1000:>9.1f}{percentile(timings, 0.95) * 1000:>9.1f}"
+              f"{percentile(timings, 0.99) * 1000:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+/process-ticket/ during a Gemini outage, with and without the circuit breaker.
+
+Every fake Gemini call hangs for --gemini-ms and then fails, like a provider
+that times out. The same CSV tickets go through the endpoint twice:
+
+    no-breaker - the Gemini breaker never opens, so every ticket waits out the
+                 failing calls before its fallbacks are used
+    breaker    - after BREAKER_FAILURE_THRESHOLD failures the circuit opens and
+                 later tickets go straight to the fallbacks
+
+Reports request latency percentiles, HTTP status codes, the share of tickets
+answered through a degraded path, and the Gemini calls made during the outage.
+
+    python -m benchmarks.bench_breakers
+    python -m benchmarks.bench_breakers --gemini-ms 5000 --tickets 100 --local-sentiment
+"""
+import argparse
+import contextlib
+import io
+import logging
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.bench_pipeline import CSV_PATH, configure_environment, load_tickets, percentile
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--csv", default=CSV_PATH)
+    parser.add_argument("--tickets", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--gemini-ms", type=float, default=2000, help="how long each failing Gemini call hangs")
+    parser.add_argument("--threshold", type=int, default=5, help="consecutive failures that open the breaker")
+    parser.add_argument("--local-sentiment", action="store_true", help="allow the local sentiment fallback")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    args.cache = False
+
+    configure_environment(args)
+    from benchmarks import fakes
+
+    registry = fakes.install(
+        fakes.Latency(args.gemini_ms, 0.1, error_rate=1.0, seed=args.seed),
+        fakes.Latency(50, seed=args.seed + 1),
+        fakes.Latency(30, seed=args.seed + 2),
+    )
+    import appp
+    from fastapi.testclient import TestClient
+    from models.breakers import gemini_breaker
+    from models.webhooks import WebhookDispatcher
+    logging.getLogger().setLevel(logging.WARNING)
+
+    tickets = load_tickets(args.csv, args.tickets)
+    model = registry.gemini_model()
+    print(f"{len(tickets)} tickets, concurrency {args.concurrency}, every Gemini call fails after "
+          f"{args.gemini_ms:.0f} ms")
+    print(f"{'mode':<12}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'statuses':>16}{'degraded':>10}{'gemini calls':>14}")
+    with TestClient(appp.app) as client:
+        appp.webhook_dispatcher = WebhookDispatcher(
+            client_factory=fakes.fake_webhook_client_factory(fakes.Latency(50, seed=args.seed + 4))
+        )
+
+        def call(ticket):
+            start = time.perf_counter()
+            response = client.post("/process-ticket/", json={
+                "subject": ticket[0], "body": ticket[1], "customer_email": "benchmark@example.com",
+            })
+            return time.perf_counter() - start, response.status_code
+
+        for mode, threshold in (("no-breaker", 10 ** 9), ("breaker", args.threshold)):
+            gemini_breaker.reset()
+            gemini_breaker.failure_threshold = threshold
+            appp.app.collection = fakes.FakeCollection(fakes.Latency(5, seed=args.seed + 3))
+            calls_before = model.calls
+
+            # The model modules print every raw reply and log every failure; keep the report readable
+            with contextlib.redirect_stdout(io.StringIO()):
+                logging.disable(logging.CRITICAL)
+                try:
+                    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+                        results = list(pool.map(call, tickets))
+                finally:
+                    logging.disable(logging.NOTSET)
+
+            latencies = [seconds for seconds, _ in results]
+            statuses = Counter(status for _, status in results)
+            documents = appp.app.collection.documents
+            degraded = sum(1 for document in documents if document.get("degraded"))
+            print(f"{mode:<12}{percentile(latencies, 0.5) * 1000:>9.1f}{percentile(latencies, 0.95) * 1000:>9.1f}"
+                  f"{percentile(latencies, 0.99) * 1000:>9.1f}"
+                  f"{' '.join(f'{code}x{count}' for code, count in sorted(statuses.items())):>16}"
+                  f"{degraded / max(1, len(documents)):>10.1%}{model.calls - calls_before:>14}")
+        appp.webhook_dispatcher.stop()
+
+
+if __name__ == "__main__":
+    main()
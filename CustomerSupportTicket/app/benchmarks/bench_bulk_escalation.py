@@ -0,0 +1,54 @@
+"""
+Escalating a whole export: escalateit called once per row (one dict and one
+tag string built in Python per ticket) versus the vectorized escalate_frame,
+on the helpdesk CSV repeated --scale times.
+
+    python -m benchmarks.bench_bulk_escalation
+    python -m benchmarks.bench_bulk_escalation --scale 50 --chunk-size 20000
+"""
+import argparse
+import time
+
+import pandas as pd
+
+from benchmarks.bench_keywords import CSV_PATH
+from models.I import escalateit
+from models.bulk_escalation import BULK_CHUNK_SIZE, escalate_frame
+
+
+def row_loop(df):
+    records = df.astype(object).where(df.notna(), None).to_dict("records")
+    return pd.Series([escalateit(record) for record in records], index=df.index)
+
+
+def chunked(df, chunk_size):
+    return pd.concat([escalate_frame(df.iloc[start:start + chunk_size]) for start in range(0, len(df), chunk_size)])
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return time.perf_counter() - start, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--csv", default=CSV_PATH)
+    parser.add_argument("--scale", type=int, default=10, help="repeat the CSV this many times")
+    parser.add_argument("--chunk-size", type=int, default=BULK_CHUNK_SIZE)
+    args = parser.parse_args()
+
+    df = pd.concat([pd.read_csv(args.csv)] * args.scale, ignore_index=True)
+    print(f"{len(df)} tickets")
+
+    loop_seconds, expected = timed(lambda: row_loop(df))
+    bulk_seconds, actual = timed(lambda: chunked(df, args.chunk_size))
+    assert expected.equals(actual), "bulk escalation disagrees with escalateit"
+
+    print(f"row loop    {loop_seconds:7.3f}s  ({len(df) / loop_seconds:>9.0f} tickets/s)")
+    print(f"vectorized  {bulk_seconds:7.3f}s  ({len(df) / bulk_seconds:>9.0f} tickets/s)  {loop_seconds / bulk_seconds:.1f}x")
+    print(f"{int(actual.sum())} escalated")
+
+
+if __name__ == "__main__":
+    main()
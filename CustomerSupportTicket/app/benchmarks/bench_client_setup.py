@@ -0,0 +1,86 @@
+"""
+Per-ticket client setup overhead: building the Gemini model, Pinecone index and
+HTTP session on every call (the old behaviour) versus reusing the handles owned
+by the client registry.
+
+Runs offline by default, with stand-in clients that take --simulate-connect-ms
+to build. --live builds the real SDK clients instead and needs GEMINI_API_KEY
+(and PINECONE_API_KEY unless --skip-pinecone) plus network access.
+
+    python -m benchmarks.bench_client_setup --iterations 200
+    python -m benchmarks.bench_client_setup --simulate-connect-ms 80
+    python -m benchmarks.bench_client_setup --live --skip-pinecone
+"""
+import argparse
+import time
+
+from models.clients import GEMINI_API_KEY, PINECONE_API_KEY, RETRIEVAL_BACKEND, ClientRegistry
+
+
+class SimulatedRegistry(ClientRegistry):
+    """
+    Registry whose factories sleep instead of talking to the real SDKs, for machines without network access.
+    """
+
+    connect_seconds = 0.0
+
+    def _build_gemini_model(self):
+        time.sleep(self.connect_seconds)
+        return object()
+
+    def _build_pinecone_index(self):
+        time.sleep(self.connect_seconds)
+        return object()
+
+    def _build_http_session(self):
+        time.sleep(self.connect_seconds)
+        return object()
+
+
+def time_per_call(fn, iterations):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return (time.perf_counter() - start) / iterations
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=100)
+    parser.add_argument("--simulate-connect-ms", type=float, default=40.0,
+                        help="how long the offline stand-in clients take to construct")
+    parser.add_argument("--live", action="store_true",
+                        help="build the real Gemini, Pinecone and HTTP clients (needs API keys and network)")
+    parser.add_argument("--skip-pinecone", action="store_true",
+                        help="skip the Pinecone index (resolving it needs network access)")
+    args = parser.parse_args()
+
+    registry_cls = ClientRegistry
+    if args.live:
+        missing = [name for name, value in [("GEMINI_API_KEY", GEMINI_API_KEY), ("PINECONE_API_KEY", PINECONE_API_KEY)]
+                   if not value and not (name == "PINECONE_API_KEY" and (args.skip_pinecone or RETRIEVAL_BACKEND == "local"))]
+        if missing:
+            parser.error(f"--live needs {', '.join(missing)} in the environment; omit --live to run offline")
+    else:
+        SimulatedRegistry.connect_seconds = args.simulate_connect_ms / 1000.0
+        registry_cls = SimulatedRegistry
+
+    shared = registry_cls()
+    stages = [
+        ("gemini model", lambda: registry_cls()._build_gemini_model(), shared.gemini_model),
+        ("http session", lambda: registry_cls()._build_http_session(), shared.http_session),
+    ]
+    if not args.skip_pinecone:
+        stages.append(("pinecone index", lambda: registry_cls()._build_retrieval_index(), shared.retrieval_index))
+
+    print(f"{'client':<16}{'per call (ms)':>16}{'registry (ms)':>16}{'speedup':>10}")
+    for name, build, reuse in stages:
+        per_call = time_per_call(build, args.iterations)
+        reuse()  # first use builds the handle, like the startup hook does
+        reused = time_per_call(reuse, args.iterations)
+        speedup = per_call / reused if reused else float("inf")
+        print(f"{name:<16}{per_call * 1000:>16.3f}{reused * 1000:>16.4f}{speedup:>9.0f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+Per-ticket escalation keyword matching on the helpdesk CSV: the old substring
+scan (one lowercase `in` test per keyword) versus the compiled KeywordMatcher,
+with the keyword lists padded to growing sizes to show how each scales.
+
+    python -m benchmarks.bench_keywords
+    python -m benchmarks.bench_keywords --sizes 13 100 500 --field body
+"""
+import argparse
+import csv
+import os
+import time
+
+from models.keywords import DEFAULT_RULES, KeywordMatcher
+
+CSV_PATH = os.path.join(os.path.dirname(__file__), "..", "..", "data", "helpdesk_customer_multi_lang_tickets.csv")
+
+
+def load_texts(path, field):
+    texts = []
+    with open(path, encoding="utf-8", newline="") as f:
+        for row in csv.DictReader(f):
+            if field == "tags":
+                texts.append(" ".join(row.get(f"tag_{i+1}") or "" for i in range(9)))
+            else:
+                texts.append(f"{row.get('subject') or ''} {row.get('body') or ''}")
+    return texts
+
+
+def padded_rules(size):
+    """
+    The default rules plus made-up filler terms (which never match) up to `size` keywords in total.
+    """
+    rules = {rule: list(keywords) for rule, keywords in DEFAULT_RULES.items()}
+    filler = size - sum(len(keywords) for keywords in rules.values())
+    rules["critical"] += [f"zzfiller{i}" for i in range(max(filler, 0))]
+    return rules
+
+
+def substring_scan(rules):
+    def match(text):
+        text = text.lower()
+        return {rule for rule, keywords in rules.items() if any(key.lower() in text for key in keywords)}
+    return match
+
+
+def time_per_ticket(match, texts, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for text in texts:
+            match(text)
+    return (time.perf_counter() - start) / (repeat * len(texts))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--csv", default=CSV_PATH)
+    parser.add_argument("--field", choices=["tags", "body"], default="tags")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[13, 100, 500])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    texts = load_texts(args.csv, args.field)
+    print(f"{len(texts)} tickets, matching on {args.field}")
+    print(f"{'keywords':>8}  {'substring us':>12}  {'compiled us':>11}  {'speedup':>7}")
+    for size in args.sizes:
+        rules = padded_rules(size)
+        old = time_per_ticket(substring_scan(rules), texts, args.repeat)
+        new = time_per_ticket(KeywordMatcher(rules).fired_rules, texts, args.repeat)
+        print(f"{size:>8}  {old * 1e6:>12.1f}  {new * 1e6:>11.1f}  {old / new:>6.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,204 @@
+"""
+Offline latency and throughput of each pipeline stage and the full endpoint.
+
+Replays tickets from the helpdesk CSV through analyze_sentiment, the response
+stages (extraction, retrieval, automate_response) and POST /process-ticket/,
+with Gemini, the embedding API, the vector index, Mongo and the Zapier
+webhook replaced by the deterministic fakes in benchmarks/fakes.py. Caches
+and the local sentiment model are off unless asked for, so every ticket
+exercises the backends. No network access is needed.
+
+    python -m benchmarks.bench_pipeline
+    python -m benchmarks.bench_pipeline --tickets 500 --concurrency 16 --gemini-ms 600 --gemini-error-rate 0.02
+    python -m benchmarks.bench_pipeline --stages sentiment endpoint --json results.json
+"""
+import argparse
+import contextlib
+import csv
+import io
+import json
+import logging
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+CSV_PATH = os.path.join(os.path.dirname(__file__), "..", "..", "data", "helpdesk_customer_multi_lang_tickets.csv")
+STAGES = ["sentiment", "extraction", "retrieval", "response", "endpoint"]
+
+
+def configure_environment(args):
+    """
+    Settings the model modules read at import time, so this runs before they are imported.
+    """
+    os.environ.setdefault("GEMINI_RPM", "1000000")
+    os.environ.setdefault("GEMINI_TPM", "1000000000")
+    os.environ["RESULT_CACHE_BACKEND"] = "memory" if args.cache else "none"
+    os.environ["EMBEDDING_CACHE_ENABLED"] = "1" if args.cache else "0"
+    os.environ["EMBEDDING_CACHE_PATH"] = os.path.join(tempfile.mkdtemp(), "embeddings.sqlite3")
+    os.environ["LOCAL_SENTIMENT_ENABLED"] = "1" if args.local_sentiment else "0"
+    os.environ["WEBHOOK_DEAD_LETTER_PATH"] = os.path.join(tempfile.mkdtemp(), "dead_letters.jsonl")
+
+
+def load_tickets(path, count):
+    tickets = []
+    with open(path, encoding="utf-8", newline="") as f:
+        for row in csv.DictReader(f):
+            tickets.append((row.get("subject") or "", row.get("body") or ""))
+            if len(tickets) == count:
+                break
+    return tickets
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+def run_stage(name, call, tickets, concurrency):
+    """
+    Call `call(subject, body)` for every ticket on `concurrency` threads; return a result row.
+    """
+    timings, errors = [], 0
+
+    def timed(ticket):
+        start = time.perf_counter()
+        try:
+            call(*ticket)
+            return time.perf_counter() - start, None
+        except Exception as e:
+            return time.perf_counter() - start, e
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for seconds, error in pool.map(timed, tickets):
+            timings.append(seconds)
+            errors += error is not None
+    elapsed = time.perf_counter() - started
+    return {
+        "stage": name,
+        "tickets": len(tickets),
+        "errors": errors,
+        "throughput": len(tickets) / elapsed if elapsed else 0.0,
+        "p50_ms": percentile(timings, 0.50) * 1000,
+        "p95_ms": percentile(timings, 0.95) * 1000,
+        "p99_ms": percentile(timings, 0.99) * 1000,
+    }
+
+
+def build_stages(args, latencies):
+    from benchmarks import fakes
+    from models.S import analyze_sentiment_llm, classify_confidently
+    from models.R import extract_issue_product, get_top_similar_issues, automate_response
+
+    def sentiment(subject, body):
+        # analyze_sentiment without the result cache: the local model when allowed, then
+        # Gemini, which raises when it fails and returns None for an unusable reply
+        result, _ = classify_confidently(subject, body)
+        if result is None and analyze_sentiment_llm.uncached(subject, body) is None:
+            raise RuntimeError("no sentiment")
+
+    def extraction(subject, body):
+        extract_issue_product.uncached(subject, body)
+
+    def retrieval(subject, body):
+        get_top_similar_issues(subject or body[:200])
+
+    def endpoint_stage():
+        import appp
+        from fastapi.testclient import TestClient
+        from models.webhooks import WebhookDispatcher
+
+        client = TestClient(appp.app)
+        client.__enter__()
+        appp.app.collection = fakes.FakeCollection(latencies["mongo"])
+        appp.webhook_dispatcher = WebhookDispatcher(
+            client_factory=fakes.fake_webhook_client_factory(latencies["webhook"])
+        )
+
+        def call(subject, body):
+            response = client.post("/process-ticket/", json={
+                "subject": subject, "body": body, "customer_email": "benchmark@example.com",
+            })
+            if response.status_code != 200:
+                raise RuntimeError(f"HTTP {response.status_code}")
+
+        return call, lambda: (appp.webhook_dispatcher.stop(), client.__exit__(None, None, None))
+
+    stages = {
+        "sentiment": (sentiment, None),
+        "extraction": (extraction, None),
+        "retrieval": (retrieval, None),
+        "response": (automate_response, None),
+    }
+    return stages, endpoint_stage
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--csv", default=CSV_PATH)
+    parser.add_argument("--tickets", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--stages", nargs="+", choices=STAGES, default=STAGES)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--gemini-ms", type=float, default=400, help="median Gemini generate_content latency")
+    parser.add_argument("--gemini-error-rate", type=float, default=0.0)
+    parser.add_argument("--embed-ms", type=float, default=80)
+    parser.add_argument("--index-ms", type=float, default=40)
+    parser.add_argument("--mongo-ms", type=float, default=5)
+    parser.add_argument("--webhook-ms", type=float, default=300)
+    parser.add_argument("--webhook-error-rate", type=float, default=0.0)
+    parser.add_argument("--sigma", type=float, default=0.35, help="lognormal spread of every latency")
+    parser.add_argument("--cache", action="store_true", help="keep the result and embedding caches on")
+    parser.add_argument("--local-sentiment", action="store_true", help="allow the local sentiment model")
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args()
+
+    configure_environment(args)
+    from benchmarks import fakes
+
+    latencies = {
+        "gemini": fakes.Latency(args.gemini_ms, args.sigma, args.gemini_error_rate, seed=args.seed),
+        "embedding": fakes.Latency(args.embed_ms, args.sigma, seed=args.seed + 1),
+        "index": fakes.Latency(args.index_ms, args.sigma, seed=args.seed + 2),
+        "mongo": fakes.Latency(args.mongo_ms, args.sigma, seed=args.seed + 3),
+        "webhook": fakes.Latency(args.webhook_ms, args.sigma, args.webhook_error_rate, seed=args.seed + 4),
+    }
+    fakes.install(latencies["gemini"], latencies["embedding"], latencies["index"])
+    stages, endpoint_stage = build_stages(args, latencies)
+    # S.py configures DEBUG logging on import; driver and client chatter would bury the table
+    logging.getLogger().setLevel(logging.WARNING)
+    tickets = load_tickets(args.csv, args.tickets)
+
+    results = []
+    print(f"{len(tickets)} tickets, concurrency {args.concurrency}", file=sys.stderr)
+    print(f"{'stage':<12}{'errors':>8}{'tickets/s':>11}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}")
+    for name in args.stages:
+        cleanup = None
+        if name == "endpoint":
+            call, cleanup = endpoint_stage()
+        else:
+            call, _ = stages[name]
+        # The model modules print every raw reply; keep the report readable
+        with contextlib.redirect_stdout(io.StringIO()):
+            logging.disable(logging.CRITICAL)
+            try:
+                row = run_stage(name, call, tickets, args.concurrency)
+            finally:
+                logging.disable(logging.NOTSET)
+                if cleanup:
+                    cleanup()
+        results.append(row)
+        print(f"{row['stage']:<12}{row['errors']:>8}{row['throughput']:>11.1f}"
+              f"{row['p50_ms']:>9.1f}{row['p95_ms']:>9.1f}{row['p99_ms']:>9.1f}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"config": vars(args), "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
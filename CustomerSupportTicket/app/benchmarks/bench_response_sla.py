@@ -0,0 +1,89 @@
+"""
+Answer latency of the dashboard's response path with and without deadlines and hedging.
+
+Replays CSV tickets through response_automation_using_genai against the fake
+backends, whose lognormal latencies have a long tail, in three modes:
+
+    unbounded - automate_response, as the dashboard called it before
+    deadline  - automate_response_within under a DASHBOARD_SLA_SECONDS budget;
+                a stage that misses its deadline means the canned reply is sent
+    hedged    - the same, plus a duplicate call for stages slower than --hedge-after
+
+and reports answer latency percentiles and the degraded-path rate. Sentiment
+runs alongside these stages in the dashboard with a shorter timeout, so it
+does not change the answer latency and is left out.
+
+    python -m benchmarks.bench_response_sla
+    python -m benchmarks.bench_response_sla --gemini-ms 900 --sigma 0.8 --hedge-after 1.2
+"""
+import argparse
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.bench_pipeline import CSV_PATH, configure_environment, load_tickets, percentile
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--csv", default=CSV_PATH)
+    parser.add_argument("--tickets", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=4, help="agents generating responses at once")
+    parser.add_argument("--sla", type=float, default=3.0, help="latency budget in seconds")
+    parser.add_argument("--hedge-after", type=float, default=1.0, help="seconds before a stage is hedged")
+    parser.add_argument("--hedge-max-fraction", type=float, default=0.1)
+    parser.add_argument("--gemini-ms", type=float, default=700, help="median Gemini latency")
+    parser.add_argument("--sigma", type=float, default=0.6, help="lognormal spread of the Gemini latency")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    args.cache = args.local_sentiment = False
+
+    configure_environment(args)
+    os.environ["HEDGE_MAX_FRACTION"] = str(args.hedge_max_fraction)
+    from benchmarks import fakes
+    from models.deadlines import LatencyBudget, deadline_runner
+    from response_automation_using_genai import automate_response, automate_response_within
+    logging.getLogger().setLevel(logging.WARNING)
+
+    tickets = load_tickets(args.csv, args.tickets)
+    modes = [
+        ("unbounded", lambda title, body: automate_response(title, body)),
+        ("deadline", lambda title, body: automate_response_within(title, body, LatencyBudget(args.sla))),
+        ("hedged", lambda title, body: automate_response_within(title, body, LatencyBudget(args.sla),
+                                                               args.hedge_after)),
+    ]
+
+    print(f"{len(tickets)} tickets, {args.concurrency} agents, Gemini median {args.gemini_ms:.0f} ms "
+          f"(sigma {args.sigma}), SLA {args.sla:g} s")
+    print(f"{'mode':<11}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'max ms':>9}{'degraded':>10}{'hedges':>8}")
+    for name, respond in modes:
+        # Same latency draws for every mode
+        fakes.install(
+            fakes.Latency(args.gemini_ms, args.sigma, seed=args.seed),
+            fakes.Latency(80, 0.3, seed=args.seed + 1),
+            fakes.Latency(40, 0.3, seed=args.seed + 2),
+        )
+        before = deadline_runner.stats()
+
+        def timed(ticket):
+            start = time.perf_counter()
+            try:
+                respond(*ticket)
+                degraded = False
+            except Exception:
+                degraded = True
+            return time.perf_counter() - start, degraded
+
+        with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+            results = list(pool.map(timed, tickets))
+        timings = [seconds for seconds, _ in results]
+        degraded = sum(failed for _, failed in results)
+        hedges = deadline_runner.stats()["hedges"] - before["hedges"]
+        print(f"{name:<11}{percentile(timings, 0.5) * 1000:>9.0f}{percentile(timings, 0.95) * 1000:>9.0f}"
+              f"{percentile(timings, 0.99) * 1000:>9.0f}{max(timings) * 1000:>9.0f}"
+              f"{degraded / len(results):>10.1%}{hedges:>8}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+Latency of escalated Gemini calls behind a deep bulk backlog: priority scheduler versus FIFO.
+
+A crowd of threads keeps the LLM scheduler saturated with bulk calls (each
+holding a slot for a fake Gemini round trip) while escalated calls arrive at a
+steady rate. The same load runs twice: once with escalated calls in their own
+class, once with every call in one class (first come, first served). Reports
+the escalated calls' end-to-end latency and the bulk throughput.
+
+    python -m benchmarks.bench_scheduler
+    python -m benchmarks.bench_scheduler --bulk-threads 1000 --concurrency 16 --gemini-ms 400
+"""
+import argparse
+import threading
+import time
+
+from benchmarks.bench_pipeline import percentile
+
+
+def run(scheduler, fifo, args):
+    from benchmarks import fakes
+
+    model = fakes.FakeGeminiModel(fakes.Latency(args.gemini_ms, args.sigma, seed=args.seed))
+    stop = threading.Event()
+    bulk_done = [0]
+    lock = threading.Lock()
+
+    def bulk_worker():
+        while not stop.is_set():
+            with scheduler.slot(priority_class="bulk"):
+                model.generate_content("bulk ticket")
+            with lock:
+                bulk_done[0] += 1
+
+    bulk_threads = [threading.Thread(target=bulk_worker, daemon=True) for _ in range(args.bulk_threads)]
+    for thread in bulk_threads:
+        thread.start()
+    time.sleep(args.warmup)  # let the bulk queue fill up
+
+    latencies = []
+
+    def escalated_call():
+        start = time.perf_counter()
+        with scheduler.slot(priority_class="bulk" if fifo else "escalated"):
+            model.generate_content("escalated ticket")
+        latencies.append(time.perf_counter() - start)
+
+    started = time.perf_counter()
+    bulk_start = bulk_done[0]
+    callers = []
+    for _ in range(args.escalated):
+        caller = threading.Thread(target=escalated_call)
+        caller.start()
+        callers.append(caller)
+        time.sleep(args.escalated_interval)
+    for caller in callers:
+        caller.join()
+    elapsed = time.perf_counter() - started
+    queued = sum(scheduler.stats()["queued"].values())
+    stop.set()
+    return latencies, (bulk_done[0] - bulk_start) / elapsed, queued, bulk_threads
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--bulk-threads", type=int, default=300, help="bulk callers kept waiting for a slot")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--reserved", type=int, default=2, help="slots only escalated calls may use")
+    parser.add_argument("--escalated", type=int, default=40)
+    parser.add_argument("--escalated-interval", type=float, default=0.1, help="seconds between escalated calls")
+    parser.add_argument("--gemini-ms", type=float, default=200)
+    parser.add_argument("--sigma", type=float, default=0.35)
+    parser.add_argument("--warmup", type=float, default=1.0)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    from models.scheduler import LLMScheduler
+
+    print(f"{args.bulk_threads} bulk callers, {args.concurrency} slots, Gemini median {args.gemini_ms:.0f} ms")
+    print(f"{'mode':<10}{'bulk queued':>12}{'bulk calls/s':>14}{'escalated p50 ms':>18}{'p95 ms':>9}{'p99 ms':>9}")
+    for mode in ("fifo", "priority"):
+        fifo = mode == "fifo"
+        scheduler = LLMScheduler(max_concurrency=args.concurrency, reserved_slots=0 if fifo else args.reserved,
+                                 limiter=None)
+        latencies, bulk_rate, queued, threads = run(scheduler, fifo, args)
+        print(f"{mode:<10}{queued:>12}{bulk_rate:>14.1f}{percentile(latencies, 0.5) * 1000:>18.1f}"
+              f"{percentile(latencies, 0.95) * 1000:>9.1f}{percentile(latencies, 0.99) * 1000:>9.1f}")
+        # Let the bulk callers drain before the next mode
+        for thread in threads:
+            thread.join()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+Generation calls avoided by the semantic response cache on the helpdesk dataset.
+
+Replays the CSV tickets through R.respond_to_issue in file order, once per
+cosine-distance threshold, and counts the Gemini generation calls made. The
+CSV has no product column, so a column stands in for product_name (the queue
+by default) and another for the extracted issue sentence (the subject).
+Embeddings come from the hashed character n-gram LexicalEmbedder in
+benchmarks/fakes.py, a rough offline proxy for Gemini embeddings: distances
+are not on the same scale, so use this to compare thresholds against each
+other and read the printed example matches before choosing a production
+SEMANTIC_CACHE_MAX_DISTANCE.
+
+    python -m benchmarks.bench_semantic_cache
+    python -m benchmarks.bench_semantic_cache --thresholds 0.1 0.2 --product-column tag_1 --examples 10
+"""
+import argparse
+import csv
+import logging
+
+from benchmarks.bench_pipeline import CSV_PATH, configure_environment
+
+DEFAULT_THRESHOLDS = [0.0, 0.1, 0.2, 0.3, 0.4]
+
+
+def load_issues(path, product_column, issue_column, count):
+    issues = []
+    with open(path, encoding="utf-8", newline="") as f:
+        for row in csv.DictReader(f):
+            issues.append((row.get(product_column) or "Unknown", row.get(issue_column) or ""))
+            if count and len(issues) == count:
+                break
+    return issues
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--csv", default=CSV_PATH)
+    parser.add_argument("--tickets", type=int, default=0, help="number of tickets (default: all)")
+    parser.add_argument("--product-column", default="queue")
+    parser.add_argument("--issue-column", default="subject")
+    parser.add_argument("--thresholds", type=float, nargs="+", default=DEFAULT_THRESHOLDS,
+                        help="cosine distances to try; 0 disables reuse of anything but identical issues")
+    parser.add_argument("--examples", type=int, default=5, help="reused answers to print for the last threshold")
+    args = parser.parse_args()
+    args.cache = args.local_sentiment = False
+
+    configure_environment(args)
+    from benchmarks import fakes
+    from models import R
+    from models.semantic_cache import SemanticResponseCache
+
+    class RecordingCache(SemanticResponseCache):
+        def __init__(self, **kwargs):
+            super().__init__(**kwargs)
+            self.last_match = None
+
+        def lookup(self, product_name, issue_sentence, embedding):
+            self.last_match = super().lookup(product_name, issue_sentence, embedding)
+            return self.last_match
+
+    issues = load_issues(args.csv, args.product_column, args.issue_column, args.tickets)
+    logging.getLogger().setLevel(logging.WARNING)
+    print(f"{len(issues)} tickets, product_name = {args.product_column}, issue_sentence = {args.issue_column}")
+    print(f"{'max distance':>12}{'generations':>13}{'avoided':>9}{'hit rate':>10}")
+    examples = []
+    for threshold in args.thresholds:
+        registry = fakes.install(fakes.Latency(0), fakes.Latency(0), fakes.Latency(0),
+                                 embedder_class=fakes.LexicalEmbedder)
+        cache = R.semantic_cache = RecordingCache(max_distance=threshold, ttl=float("inf"), enabled=True)
+        examples = []
+        for product_name, issue_sentence in issues:
+            R.respond_to_issue(product_name, issue_sentence)
+            if cache.last_match is not None:
+                examples.append((product_name, issue_sentence, cache.last_match))
+        stats = cache.stats()
+        print(f"{threshold:>12.2f}{registry.gemini_model().calls:>13}{stats['generations_avoided']:>9}"
+              f"{stats['hit_rate']:>10.1%}")
+
+    if examples and args.examples:
+        print(f"\nExample reuses at max distance {args.thresholds[-1]}:")
+        for product_name, issue_sentence, match in examples[:args.examples]:
+            print(f"  [{product_name}] d={match['distance']:.3f}\n    new:    {issue_sentence}"
+                  f"\n    reused: {match['issue_sentence']}")
+
+
+if __name__ == "__main__":
+    main()
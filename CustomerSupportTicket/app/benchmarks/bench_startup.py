@@ -0,0 +1,87 @@
+"""
+Cold-start time of the API and model modules.
+
+Each module is imported in a fresh interpreter with the external backends
+(Gemini, Pinecone, Mongo, Google Sheets) replaced by stubs that fail if they are
+called, and with outbound sockets disabled. Importing must not reach any of
+them, so the measured time is plain Python import time.
+
+    python -m benchmarks.bench_startup --repeat 5
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+MODULES = ["models.I", "models.S", "models.R", "appp", "dashboard"]
+
+# Runs inside the child interpreter before the timed import
+BOOTSTRAP = r'''
+import socket, sys, time, types
+
+def _blocked(*args, **kwargs):
+    raise RuntimeError("network access during import")
+
+socket.socket.connect = _blocked
+socket.create_connection = _blocked
+
+def _stub(name, attrs):
+    module = types.ModuleType(name)
+    for attr in attrs:
+        setattr(module, attr, _blocked)
+    sys.modules[name] = module
+    return module
+
+google = sys.modules.get("google") or _stub("google", [])
+google.generativeai = _stub("google.generativeai", ["configure", "GenerativeModel", "embed_content"])
+_stub("pinecone", ["Pinecone", "ServerlessSpec"])
+_stub("gspread", ["authorize"])
+motor = _stub("motor", [])
+motor.motor_asyncio = _stub("motor.motor_asyncio", ["AsyncIOMotorClient"])
+
+start = time.perf_counter()
+try:
+    __import__(sys.argv[1])
+    error = None
+except ImportError as exc:
+    error = "skipped: %s" % exc
+except Exception as exc:
+    error = "FAILED: %r" % exc
+print(__import__("json").dumps({"seconds": time.perf_counter() - start, "error": error}))
+'''
+
+
+def import_once(module):
+    result = subprocess.run(
+        [sys.executable, "-c", BOOTSTRAP, module],
+        cwd=APP_DIR, capture_output=True, text=True,
+    )
+    lines = result.stdout.strip().splitlines()
+    if not lines:
+        return {"seconds": None, "error": "FAILED: %s" % result.stderr.strip().splitlines()[-1:]}
+    return json.loads(lines[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("modules", nargs="*", default=MODULES)
+    args = parser.parse_args()
+
+    print(f"{'module':<14}{'median import (ms)':>20}  notes")
+    for module in args.modules:
+        runs = [import_once(module) for _ in range(args.repeat)]
+        errors = [run["error"] for run in runs if run["error"]]
+        if errors:
+            print(f"{module:<14}{'-':>20}  {errors[0]}")
+            continue
+        median = statistics.median(run["seconds"] for run in runs)
+        print(f"{module:<14}{median * 1000:>20.1f}")
+
+
+if __name__ == "__main__":
+    main()
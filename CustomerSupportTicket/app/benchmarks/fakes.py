@@ -0,0 +1,299 @@
+"""
+Deterministic local stand-ins for the external backends, for offline benchmarks.
+
+Each fake waits for a latency drawn from a seeded lognormal distribution (so
+runs are repeatable) and fails with a configurable probability. They plug in
+through the same seams the app uses: registry.override() for the Gemini model,
+embedding API and vector index, app.collection for Mongo, and the webhook
+dispatcher's client factory for Zapier.
+"""
+import asyncio
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+
+SENTIMENT_LABELS = ["positive", "neutral", "negative", "frustrated"]
+
+
+class FakeBackendError(Exception):
+    pass
+
+
+class Latency:
+    """
+    Lognormal latency with the given median (ms) and spread, plus an error rate.
+    """
+
+    def __init__(self, median_ms, sigma=0.25, error_rate=0.0, seed=0):
+        self.median = median_ms / 1000.0
+        self.sigma = sigma
+        self.error_rate = error_rate
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def draw(self):
+        """
+        Return (seconds to wait, whether this call fails).
+        """
+        with self._lock:
+            seconds = self.median * self._random.lognormvariate(0, self.sigma) if self.median > 0 else 0.0
+            return seconds, self._random.random() < self.error_rate
+
+    def wait(self):
+        seconds, failed = self.draw()
+        time.sleep(seconds)
+        if failed:
+            raise FakeBackendError("injected backend failure")
+
+    async def wait_async(self):
+        seconds, failed = self.draw()
+        await asyncio.sleep(seconds)
+        if failed:
+            raise FakeBackendError("injected backend failure")
+
+
+def _stable_hash(text):
+    return int(hashlib.sha256(text.encode("utf-8")).hexdigest()[:12], 16)
+
+
+class FakeResponse:
+    def __init__(self, text):
+        self.text = text
+
+
+class FakeGeminiModel:
+    """
+    Answers each prompt used by S.py and R.py with a well-formed reply of the expected shape.
+    `token_ms` is the gap between chunks of a streamed reply.
+    """
+
+    def __init__(self, latency, token_ms=20.0):
+        self.latency = latency
+        self.token_seconds = token_ms / 1000.0
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def _label(self, text):
+        return SENTIMENT_LABELS[_stable_hash(text) % len(SENTIMENT_LABELS)]
+
+    def _reply(self, prompt):
+        if "'sentiment_type', 'product_name' and 'issue_sentence'" in prompt:
+            title, body = re.findall(r"\n    Title: (.*)\n    Body: (.*)\n", prompt)[-1]
+            return json.dumps({
+                "thoughts": "Tone assessed.",
+                "sentiment_type": self._label(json.loads(title)),
+                "product_name": "Product " + str(_stable_hash(json.loads(body)) % 50),
+                "issue_sentence": " ".join(json.loads(body).split()[:12]) or "unspecified issue",
+            })
+        if "JSON array with exactly one object per ticket" in prompt:
+            tickets = re.findall(r"\n    Ticket (\d+):\n    Title: (.*)", prompt)
+            return json.dumps([
+                {"ticket": int(number), "thoughts": "Tone assessed.", "sentiment_type": self._label(title)}
+                for number, title in tickets
+            ])
+        if 'Chat History: "' in prompt and "sentiment_type" not in prompt:
+            # sentiment_analysis_using_gemini.get_sentiment (dashboard)
+            title = re.findall(r'Title: "(.*)"', prompt)
+            return json.dumps({"thought": "Tone assessed.", "sentiment": self._label(title[-1] if title else prompt)})
+        if "sentiment_type" in prompt:
+            title = re.findall(r'Title: "(.*)"', prompt)
+            return json.dumps({"thoughts": "Tone assessed.", "sentiment_type": self._label(title[-1] if title else prompt)})
+        if "'product_name' and 'issue_sentence'" in prompt:
+            body = prompt.split("Body:", 1)[-1]
+            return "```json\n" + json.dumps({
+                "product_name": "Product " + str(_stable_hash(body) % 50),
+                "issue_sentence": " ".join(body.split()[:12]) or "unspecified issue",
+            }) + "\n```"
+        return json.dumps({
+            "subject": "Re: your support request",
+            "body": "Thank you for contacting us. We have looked into the issue and our team is on it.",
+        })
+
+    def generate_content(self, prompt, stream=False, **kwargs):
+        with self._lock:
+            self.calls += 1
+        self.latency.wait()
+        if not stream:
+            return FakeResponse(self._reply(prompt))
+        return self._stream()
+
+    def _stream(self):
+        words = ("Subject: Re: your support request\n\nThank you for contacting us. "
+                 "We have looked into the issue and our team is on it.").split(" ")
+        for position, word in enumerate(words):
+            if position:
+                time.sleep(self.token_seconds)
+            yield FakeResponse(word if position == 0 else " " + word)
+
+
+class FakeEmbedder:
+    """
+    Stand-in for genai.embed_content: a deterministic unit vector per text.
+    """
+
+    def __init__(self, latency, dimension=768):
+        self.latency = latency
+        self.dimension = dimension
+
+    def _vector(self, text):
+        rng = random.Random(_stable_hash(text))
+        return [rng.gauss(0, 1) for _ in range(self.dimension)]
+
+    def __call__(self, model, content, task_type):
+        self.latency.wait()
+        if isinstance(content, list):
+            return {"embedding": [self._vector(text) for text in content]}
+        return {"embedding": self._vector(content)}
+
+
+class LexicalEmbedder(FakeEmbedder):
+    """
+    Embedder whose vectors are hashed character n-grams, so reworded texts land close
+    together (a rough offline proxy for semantic similarity). Needs scikit-learn.
+    """
+
+    def __init__(self, latency, dimension=768):
+        from sklearn.feature_extraction.text import HashingVectorizer
+
+        super().__init__(latency, dimension)
+        self._vectorizer = HashingVectorizer(
+            analyzer="char_wb", ngram_range=(3, 5), n_features=dimension, alternate_sign=False, norm="l2"
+        )
+
+    def _vector(self, text):
+        return self._vectorizer.transform([text.lower()]).toarray()[0].tolist()
+
+
+class FakeVectorIndex:
+    """
+    Stand-in for the Pinecone index: returns top_k deterministic matches with issue/response metadata.
+    """
+
+    def __init__(self, latency):
+        self.latency = latency
+
+    def query(self, vector, top_k=10, include_metadata=False, **kwargs):
+        self.latency.wait()
+        seed = int(abs(vector[0]) * 1e6) if vector else 0
+        matches = []
+        for rank in range(top_k):
+            match = {"id": f"ticket-{(seed + rank) % 1000}", "score": 0.9 - 0.05 * rank}
+            if include_metadata:
+                match["metadata"] = {"issue": f"Past issue {(seed + rank) % 1000}",
+                                     "response": "We reset the device and the problem was resolved."}
+            matches.append(match)
+        return {"matches": matches}
+
+    def upsert(self, vectors, **kwargs):
+        self.latency.wait()
+        return {"upserted_count": len(vectors)}
+
+
+class _InsertOneResult:
+    def __init__(self, inserted_id):
+        self.inserted_id = inserted_id
+
+
+class _InsertManyResult:
+    def __init__(self, inserted_ids):
+        self.inserted_ids = inserted_ids
+
+
+class _FakeCursor:
+    def __init__(self, documents, latency):
+        self.documents = documents
+        self.latency = latency
+
+    def sort(self, key, direction=1):
+        self.documents.sort(key=lambda document: document[key], reverse=direction < 0)
+        return self
+
+    def limit(self, count):
+        self.documents = self.documents[:count]
+        return self
+
+    async def to_list(self, length=None):
+        await self.latency.wait_async()
+        return self.documents[:length]
+
+
+class FakeCollection:
+    """
+    In-memory stand-in for a motor (async) collection.
+    """
+
+    def __init__(self, latency):
+        self.latency = latency
+        self.documents = []
+
+    async def insert_one(self, document):
+        from bson import ObjectId
+
+        await self.latency.wait_async()
+        document.setdefault("_id", ObjectId())
+        self.documents.append(document)
+        return _InsertOneResult(document["_id"])
+
+    async def insert_many(self, documents, ordered=True):
+        from bson import ObjectId
+
+        await self.latency.wait_async()
+        for document in documents:
+            document.setdefault("_id", ObjectId())
+        self.documents.extend(documents)
+        return _InsertManyResult([document["_id"] for document in documents])
+
+    async def find_one(self, query):
+        await self.latency.wait_async()
+        return next((document for document in self.documents
+                     if all(document.get(key) == value for key, value in query.items())), None)
+
+    async def create_indexes(self, indexes):
+        return [str(index.document["key"]) for index in indexes]
+
+    def find(self, query=None, projection=None):
+        """
+        Equality filters plus the {"$lt": value} form the keyset cursor uses; returns copies.
+        """
+        query = query or {}
+
+        def matches(document):
+            for key, value in query.items():
+                if isinstance(value, dict):
+                    if not document.get(key) < value["$lt"]:
+                        return False
+                elif document.get(key) != value:
+                    return False
+            return True
+
+        return _FakeCursor([
+            {key: value for key, value in document.items() if projection is None or key == "_id" or key in projection}
+            for document in self.documents if matches(document)
+        ], self.latency)
+
+
+def fake_webhook_client_factory(latency):
+    """
+    Client factory for WebhookDispatcher whose requests never leave the process.
+    """
+    import httpx
+
+    async def handler(request):
+        seconds, failed = latency.draw()
+        await asyncio.sleep(seconds)
+        return httpx.Response(503 if failed else 200)
+
+    return lambda: httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+
+def install(gemini, embedding, index, embedder_class=FakeEmbedder):
+    """
+    Route the client registry's Gemini model, embedding API and vector index to fakes.
+    """
+    from models.clients import registry
+
+    registry.override(model=FakeGeminiModel(gemini), index=FakeVectorIndex(index), embedder=embedder_class(embedding))
+    return registry
@@ -4,12 +4,16 @@ from streamlit_option_menu import option_menu
 import pandas as pd
 import nltk
 from textblob import TextBlob
-from pymongo import MongoClient # for database connectivity
+from models.mongo_store import get_mongo_client, get_write_behind, MONGO_WRITE_BEHIND # for database connectivity
 from datetime import datetime
-from response_automation_using_genai import automate_response
+from response_automation_using_genai import automate_response_within
 from issue_escalation import escalateit
 from sentiment_analysis_using_gemini import get_sentiment
+from models.webhooks import webhook_dispatcher
+from models.deadlines import LatencyBudget, deadline_runner
 import json
+import logging
+import os
 # Download required NLTK data
 try:
     nltk.data.find('tokenizers/punkt')
@@ -17,6 +21,13 @@ except LookupError:
     nltk.download('punkt')
 import requests
 
+# Agents get an answer within DASHBOARD_SLA_SECONDS: a stage that misses its deadline
+# (see response_automation_using_genai.STAGE_TIMEOUTS) is replaced by the canned reply
+DASHBOARD_SLA_SECONDS = float(os.environ.get("DASHBOARD_SLA_SECONDS", "3"))
+DASHBOARD_SENTIMENT_TIMEOUT = float(os.environ.get("DASHBOARD_SENTIMENT_TIMEOUT", "2"))
+# Start a duplicate call when a stage has not answered after this many seconds (0 = off)
+DASHBOARD_HEDGE_AFTER = float(os.environ.get("DASHBOARD_HEDGE_AFTER", "0"))
+
 # Function to send data to Zapier Webhook
 def send_to_zapier_webhook(title, body, response):
     ZAPIER_WEBHOOK_URL = "https://hooks.zapier.com/hooks/catch/21651217/2alrmst/"  # Replace with your Zapier webhook URL
@@ -28,28 +39,17 @@ def send_to_zapier_webhook(title, body, response):
         "response": response,
     }
     
-    headers = {
-        "Content-Type": "application/json"
-    }
-    
-    try:
-        response = requests.post(ZAPIER_WEBHOOK_URL, json=payload)
-
-        if response.status_code == 200:
-            return "Email sent successfully via Zapier webhook!"
-        else:
-            raise HTTPException(
-                status_code=response.status_code,
-                detail=f"Zapier webhook failed: {response.text}"
-            )
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error: {str(e)}")
+    # Delivered in the background with retries; failures go to the dead-letter file
+    if webhook_dispatcher.enqueue(ZAPIER_WEBHOOK_URL, payload):
+        return "Email queued for delivery via Zapier webhook!"
+    return "Webhook queue is full; the email was saved for later delivery."
 
 
 #function for storing data
-def store_data_in_mongodb(title, body, sentiment=None, escalation=None, response=None):
-    # Connect to MongoDB (make sure MongoDB is running locally or remotely)
-    client = MongoClient("mongodb://localhost:27017")  # Replace with your MongoDB connection string
+def store_data_in_mongodb(title, body, sentiment=None, escalation=None, response=None, degraded=False):
+    # One pooled client per process (make sure MongoDB is running locally or remotely;
+    # set DASHBOARD_MONGO_URL to use another server)
+    client = get_mongo_client()
     db = client["customer_tickets"]  # Database name
     collection = db["tickets"]  # Collection name based on data type (sentiment, escalation, response)
 
@@ -60,9 +60,14 @@ def store_data_in_mongodb(title, body, sentiment=None, escalation=None, response
         "timestamp": datetime.utcnow().isoformat(),  # Format timestamp as ISO 8601
         "sentiment": sentiment,
         "escalation": escalation,
-        "response": response
+        "response": response,
+        "degraded": degraded  # True when the canned reply stood in for the generated one
     }
 
+    # Buffer the document and return at once; it is written with the next insert_many
+    if MONGO_WRITE_BEHIND:
+        return get_write_behind("customer_tickets", "tickets").add(data_document)
+
     # Insert the document into the MongoDB collection
     result = collection.insert_one(data_document)
 
@@ -70,7 +75,12 @@ def store_data_in_mongodb(title, body, sentiment=None, escalation=None, response
 
 
 def generate_automated_response(title, body):
-    sentiment = get_sentiment(title, body)
+    budget = LatencyBudget(DASHBOARD_SLA_SECONDS)
+    # Sentiment only picks the canned reply, so it runs alongside the response stages
+    sentiment_call = deadline_runner.submit(
+        "sentiment", get_sentiment, title, body,
+        timeout=budget.stage_timeout(DASHBOARD_SENTIMENT_TIMEOUT), hedge_after=DASHBOARD_HEDGE_AFTER,
+    )
     priority = escalateit(title, body)
     
     # More contextual responses
@@ -81,20 +91,46 @@ def generate_automated_response(title, body):
         "Slightly Negative": "We apologize for any inconvenience you've experienced. Our team will look into this matter.",
         "Very Negative": "We sincerely apologize for your negative experience. This will be escalated to our team immediately for urgent attention."
     }
-    
+    # get_sentiment returns one of these labels
+    sentiment_responses = {
+        "positive": "Slightly Positive",
+        "neutral": "Neutral",
+        "negative": "Slightly Negative",
+        "frustrated": "Very Negative",
+    }
+
+    try:
+        response_subject, response_body = automate_response_within(title, body, budget, DASHBOARD_HEDGE_AFTER)
+        degraded = False
+    except Exception as e:
+        # Over budget or an upstream error: answer with the canned reply alone
+        logging.warning(f"Falling back to the canned reply after {budget.elapsed():.2f}s: {e!r}")
+        degraded = True
+
+    try:
+        sentiment = sentiment_call.result()
+    except Exception as e:
+        logging.warning(f"Sentiment unavailable, using the neutral reply: {e!r}")
+        sentiment = None
+    sentiment_label = sentiment['sentiment'] if sentiment else None
+
     # Select the appropriate response based on sentiment
-    response = responses.get(sentiment['sentiment'], responses["Neutral"])
-    response_subject, response_body = automate_response(title, body)
+    response = responses[sentiment_responses.get(sentiment_label, "Neutral")]
 
     # Add priority-based additional message
     if priority != False:
         response += f"\n\nThis has been marked as priority and needs to be escalated and will be handled accordingly."
 
     # Combine the subject, body, and response into one plain text variable
-    combined_response = f"{response_subject}\n\n{response_body}\n\n{response}"
+    if degraded:
+        combined_response = f"Re: {title}\n\n{response}"
+    else:
+        combined_response = f"{response_subject}\n\n{response_body}\n\n{response}"
+    deadline_runner.record_response(degraded)
 
     # Store data in MongoDB
-    store_data_in_mongodb(title, body, sentiment=sentiment['sentiment'], escalation=priority, response=combined_response)
+    store_data_in_mongodb(title, body, sentiment=sentiment_label, escalation=priority, response=combined_response,
+                          degraded=degraded)
     
     return combined_response
 
@@ -319,6 +355,9 @@ def main():
                     unsafe_allow_html=True
                 )
                 st.text_area("Generated Response", response, height=400)
+                sla = deadline_runner.stats()
+                st.caption(f"Canned replies used within the {DASHBOARD_SLA_SECONDS:g}s SLA: "
+                           f"{sla['degraded']} of {sla['responses']} ({sla['degraded_rate']:.0%})")
                  # Send to Zapier Webhook
                 send_result = send_to_zapier_webhook(title, body, response)
                 st.success(f"Response sent to email via Zapier: {send_result}")
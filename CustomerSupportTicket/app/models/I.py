@@ -1,17 +1,40 @@
-import re
+from models.keywords import escalation_matcher
+
+
+def escalation_rules(incoming_issues):
+    """
+    Return {rule: keywords matched} over the ticket's tags.
+    """
+    tags_combine = " ".join([incoming_issues.get(f"tag_{i+1}") or "" for i in range(9)])
+    return escalation_matcher.matches(tags_combine)
+
+
+def escalation_candidate(incoming_issues):
+    """
+    True when any escalation rule fires on the ticket's tags. Decides escalation
+    on its own when no sentiment is available (Gemini down, no local model).
+    """
+    return bool(escalation_rules(incoming_issues))
+
+
+def escalation_certain(incoming_issues):
+    """
+    True when the ticket escalates whatever its sentiment (the "specific" rule).
+    Cheap enough to run before any LLM stage, so it picks the tickets whose
+    Gemini calls are scheduled ahead of routine work.
+    """
+    return "specific" in escalation_rules(incoming_issues)
+
 
 def escalateit(incoming_issues):
-    tags_combine = " ".join([incoming_issues.get(f"tag_{i+1}", "") for i in range(9)])
+    fired = escalation_rules(incoming_issues)
 
     # Check for high-priority and critical keywords
-    critical_keywords = ["issue", "problem", "urgent", "disruption", "failure",
-                         "incident", "crash", "refund", "outage", "critical"]
-    if incoming_issues["priority"] == "high" and any(key.lower() in tags_combine.lower() for key in critical_keywords):
+    if incoming_issues["priority"] == "high" and "critical" in fired:
         return True
 
     # Escalate if specific tags are present
-    specific_tags = ["security", "data breach", "compliance"]
-    if any(tag.lower() in tags_combine.lower() for tag in specific_tags):
+    if "specific" in fired:
         return True
 
-    return False
\ No newline at end of file
+    return False
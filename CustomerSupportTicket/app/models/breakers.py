@@ -0,0 +1,191 @@
+"""
+Circuit breakers for the external dependencies: Gemini, Pinecone, MongoDB and Zapier.
+
+When a dependency is down, every call to it would otherwise wait out its full
+timeout and fail, tying up a worker thread and the client connection each
+time. A breaker counts consecutive failures of its dependency:
+
+    closed    - calls go through; BREAKER_FAILURE_THRESHOLD failures in a row open it
+    open      - calls fail at once with CircuitOpenError for BREAKER_RECOVERY_SECONDS
+    half_open - up to BREAKER_HALF_OPEN_CALLS trial calls go through; a success
+                closes the breaker, a failure opens it again
+
+Callers wrap only the network call in `with breaker.guard():` (Gemini calls
+get it from llm_scheduler.slot()), so a reply that fails to parse is not
+counted against the dependency, and handle CircuitOpenError with their
+degraded path (see appp.py). Every setting can be overridden per dependency,
+e.g. BREAKER_GEMINI_FAILURE_THRESHOLD.
+"""
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from models.metrics import metrics
+
+BREAKER_FAILURE_THRESHOLD = int(os.environ.get("BREAKER_FAILURE_THRESHOLD", "5"))
+BREAKER_RECOVERY_SECONDS = float(os.environ.get("BREAKER_RECOVERY_SECONDS", "30"))
+BREAKER_HALF_OPEN_CALLS = int(os.environ.get("BREAKER_HALF_OPEN_CALLS", "1"))
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+breaker_transitions = metrics.counter(
+    "circuit_breaker_transitions_total", "Circuit breaker state changes by dependency and new state.",
+    ["dependency", "state"]
+)
+breaker_rejections = metrics.counter(
+    "circuit_breaker_rejected_total", "Calls failed fast because the dependency's circuit was open.", ["dependency"]
+)
+degraded_paths = metrics.counter(
+    "degraded_path_total", "Requests served by a fallback because a dependency failed or its circuit was open.",
+    ["path"]
+)
+
+
+def _setting(name, key, default, cast):
+    return cast(os.environ.get(f"BREAKER_{name.upper()}_{key}", default))
+
+
+class CircuitOpenError(Exception):
+    """
+    Raised instead of calling a dependency whose circuit is open.
+    """
+
+    def __init__(self, name, retry_after):
+        super().__init__(f"{name} circuit is open; retry in {retry_after:.1f}s")
+        self.name = name
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """
+    Closed / open / half-open breaker driven by consecutive failures.
+    """
+
+    def __init__(self, name, failure_threshold=None, recovery_seconds=None, half_open_calls=None):
+        self.name = name
+        self.failure_threshold = failure_threshold or _setting(
+            name, "FAILURE_THRESHOLD", BREAKER_FAILURE_THRESHOLD, int)
+        self.recovery_seconds = recovery_seconds or _setting(
+            name, "RECOVERY_SECONDS", BREAKER_RECOVERY_SECONDS, float)
+        self.half_open_calls = half_open_calls or _setting(
+            name, "HALF_OPEN_CALLS", BREAKER_HALF_OPEN_CALLS, int)
+        self._lock = threading.Lock()
+        self.state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trials = 0
+        self.opened = 0
+        self.rejected = 0
+        self.last_error = None
+
+    def _transition(self, state):
+        # Called with the lock held
+        self.state = state
+        if state == OPEN:
+            self._opened_at = time.monotonic()
+            self.opened += 1
+        self._trials = 0
+        breaker_transitions.inc(dependency=self.name, state=state)
+
+    def retry_after(self):
+        """
+        Seconds until an open breaker lets a trial call through (0 when calls are allowed).
+        """
+        with self._lock:
+            if self.state != OPEN:
+                return 0.0
+            return max(0.0, self._opened_at + self.recovery_seconds - time.monotonic())
+
+    def allow(self):
+        """
+        Whether a call may go ahead now. Every allowed call must be followed by
+        record_success(), record_failure() or abandon().
+        """
+        with self._lock:
+            if self.state == OPEN:
+                if time.monotonic() - self._opened_at < self.recovery_seconds:
+                    self.rejected += 1
+                    breaker_rejections.inc(dependency=self.name)
+                    return False
+                self._transition(HALF_OPEN)
+            if self.state == HALF_OPEN:
+                if self._trials >= self.half_open_calls:
+                    self.rejected += 1
+                    breaker_rejections.inc(dependency=self.name)
+                    return False
+                self._trials += 1
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            if self.state != CLOSED:
+                self._transition(CLOSED)
+
+    def record_failure(self, error=None):
+        with self._lock:
+            self._failures += 1
+            if error is not None:
+                self.last_error = error if isinstance(error, str) else f"{type(error).__name__}: {error}"
+            if self.state == HALF_OPEN or (self.state == CLOSED and self._failures >= self.failure_threshold):
+                self._transition(OPEN)
+
+    def abandon(self):
+        """
+        An allowed call ended without an outcome (e.g. it was cancelled): free its half-open trial.
+        """
+        with self._lock:
+            self._trials = max(0, self._trials - 1)
+
+    def reset(self):
+        """
+        Close the breaker and clear its counters (used between benchmark runs).
+        """
+        with self._lock:
+            self.state = CLOSED
+            self._failures = self._trials = 0
+            self.opened = self.rejected = 0
+            self.last_error = None
+
+    @contextmanager
+    def guard(self):
+        """
+        Run the enclosed dependency call if the circuit allows it, else raise CircuitOpenError.
+        An exception from the block counts as a failure of the dependency.
+        """
+        if not self.allow():
+            raise CircuitOpenError(self.name, self.retry_after())
+        try:
+            yield
+        except Exception as e:
+            self.record_failure(e)
+            raise
+        except BaseException:
+            self.abandon()
+            raise
+        else:
+            self.record_success()
+
+    def stats(self):
+        retry_after = self.retry_after()
+        with self._lock:
+            return {
+                "state": self.state,
+                "consecutive_failures": self._failures,
+                "failure_threshold": self.failure_threshold,
+                "recovery_seconds": self.recovery_seconds,
+                "retry_after": retry_after,
+                "opened": self.opened,
+                "rejected": self.rejected,
+                "last_error": self.last_error,
+            }
+
+
+# One breaker per dependency, shared by the scheduler, R.py, the webhook dispatcher and appp.py
+gemini_breaker = CircuitBreaker("gemini")
+pinecone_breaker = CircuitBreaker("pinecone")
+mongo_breaker = CircuitBreaker("mongo")
+zapier_breaker = CircuitBreaker("zapier")
+
+breakers = {breaker.name: breaker for breaker in (gemini_breaker, pinecone_breaker, mongo_breaker, zapier_breaker)}
@@ -0,0 +1,96 @@
+"""
+Bulk escalation for whole ticket exports (nightly audits).
+
+Applies the same rules as escalateit in models/I.py to a pandas DataFrame at
+once: the tag columns are joined and matched with vectorized string
+operations instead of building a dict per row. Files are read in chunks so
+memory stays bounded however large the export is.
+
+    python -m models.bulk_escalation ../data/helpdesk_customer_multi_lang_tickets.csv --output escalations.csv
+"""
+import argparse
+import os
+
+from models.keywords import escalation_matcher
+
+TAG_COLUMNS = [f"tag_{i+1}" for i in range(9)]
+BULK_CHUNK_SIZE = int(os.environ.get("BULK_CHUNK_SIZE", "50000"))
+
+
+def escalate_frame(df, text_columns=TAG_COLUMNS, priority_column="priority", matcher=escalation_matcher):
+    """
+    Return a boolean Series (aligned with df) that is True where escalateit would escalate.
+    Missing text or priority columns count as empty.
+    """
+    import pandas as pd
+
+    columns = [df[column].fillna("").astype(str) for column in text_columns if column in df.columns]
+    if not columns:
+        return pd.Series(False, index=df.index, name="escalation_required")
+    text = columns[0].str.cat(columns[1:], sep=" ").str.lower()
+
+    critical = text.str.contains(matcher.rule_pattern("critical"), regex=True)
+    specific = text.str.contains(matcher.rule_pattern("specific"), regex=True)
+    if priority_column in df.columns:
+        high_priority = df[priority_column].eq("high")
+    else:
+        high_priority = pd.Series(False, index=df.index)
+
+    return ((high_priority & critical) | specific).rename("escalation_required")
+
+
+def add_escalation_column(df, **kwargs):
+    return df.assign(escalation_required=escalate_frame(df, **kwargs))
+
+
+def iter_file_chunks(path, chunk_size=BULK_CHUNK_SIZE, columns=None):
+    """
+    Yield DataFrames of at most chunk_size rows from a CSV or Parquet file.
+    """
+    import pandas as pd
+
+    if path.endswith(".parquet"):
+        import pyarrow.parquet as pq
+
+        parquet = pq.ParquetFile(path)
+        if columns is not None:
+            columns = [column for column in columns if column in parquet.schema_arrow.names]
+        for batch in parquet.iter_batches(batch_size=chunk_size, columns=columns):
+            yield batch.to_pandas()
+    else:
+        usecols = None if columns is None else lambda column: column in columns
+        yield from pd.read_csv(path, chunksize=chunk_size, usecols=usecols)
+
+
+def escalate_file(path, chunk_size=BULK_CHUNK_SIZE, text_columns=TAG_COLUMNS, priority_column="priority",
+                  keep_columns=("id",)):
+    """
+    Yield one DataFrame per chunk with the kept columns (when present) plus escalation_required.
+    """
+    wanted = list(keep_columns) + list(text_columns) + [priority_column]
+    for chunk in iter_file_chunks(path, chunk_size, columns=wanted):
+        result = chunk[[column for column in keep_columns if column in chunk.columns]].copy()
+        result["escalation_required"] = escalate_frame(chunk, text_columns, priority_column)
+        yield result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("path", help="CSV or Parquet export")
+    parser.add_argument("--output", help="CSV to write id + escalation_required to (default: summary only)")
+    parser.add_argument("--chunk-size", type=int, default=BULK_CHUNK_SIZE)
+    parser.add_argument("--text-columns", nargs="+", default=TAG_COLUMNS)
+    parser.add_argument("--priority-column", default="priority")
+    args = parser.parse_args()
+
+    total = escalated = 0
+    for i, chunk in enumerate(escalate_file(args.path, args.chunk_size, args.text_columns, args.priority_column)):
+        total += len(chunk)
+        escalated += int(chunk["escalation_required"].sum())
+        if args.output:
+            chunk.to_csv(args.output, mode="w" if i == 0 else "a", header=i == 0, index=False)
+    print(f"{escalated} of {total} tickets need escalation")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,238 @@
+"""
+Content-addressed cache for the LLM stages.
+
+Identical tickets (bulk retries, forwarded emails, the same outage reported by
+many users) hash to the same key, so their sentiment, extraction and response
+are computed once. Keys combine the stage name, the stage's prompt version and
+a normalized hash of the ticket text, so editing a prompt invalidates its
+entries automatically.
+
+Backends:
+    memory  - per-process LRU with TTL (default)
+    sqlite  - file shared by every worker on the host (RESULT_CACHE_PATH)
+    none    - caching disabled
+"""
+import functools
+import hashlib
+import json
+import os
+import pickle
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+RESULT_CACHE_BACKEND = os.environ.get("RESULT_CACHE_BACKEND", "memory")
+RESULT_CACHE_PATH = os.environ.get("RESULT_CACHE_PATH", "result_cache.sqlite3")
+RESULT_CACHE_TTL = float(os.environ.get("RESULT_CACHE_TTL", "3600"))
+RESULT_CACHE_SIZE = int(os.environ.get("RESULT_CACHE_SIZE", "10000"))
+
+_REPLY_PREFIX = re.compile(r"^\s*((re|fw|fwd|aw|wg)\s*:\s*)+", re.IGNORECASE)
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_text(text):
+    """
+    Canonical form of ticket text: reply/forward prefixes dropped, case folded, whitespace collapsed.
+    """
+    text = _REPLY_PREFIX.sub("", text or "")
+    return _WHITESPACE.sub(" ", text).strip().casefold()
+
+
+def cache_key(stage, prompt_version, *parts):
+    payload = json.dumps([stage, prompt_version] + [normalize_text(str(part)) for part in parts])
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class MemoryBackend:
+    """
+    Thread-safe LRU cache with a per-entry time-to-live.
+    """
+
+    def __init__(self, max_entries=RESULT_CACHE_SIZE, ttl=RESULT_CACHE_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return False, None
+            expires, value = entry
+            if expires < time.time():
+                del self._entries[key]
+                return False, None
+            self._entries.move_to_end(key)
+            return True, value
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.time() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class SQLiteBackend:
+    """
+    Cache stored in a SQLite file so every worker process on the host shares hits.
+    """
+
+    def __init__(self, path=RESULT_CACHE_PATH, max_entries=RESULT_CACHE_SIZE, ttl=RESULT_CACHE_TTL):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._local = threading.local()
+        self._writes = 0
+        conn = self._conn()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS results ("
+            "key TEXT PRIMARY KEY, value BLOB, expires REAL, used REAL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS results_used ON results (used)")
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            self._local.conn = conn
+        return conn
+
+    def get(self, key):
+        now = time.time()
+        conn = self._conn()
+        row = conn.execute("SELECT value, expires FROM results WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return False, None
+        if row[1] < now:
+            conn.execute("DELETE FROM results WHERE key = ?", (key,))
+            return False, None
+        conn.execute("UPDATE results SET used = ? WHERE key = ?", (now, key))
+        return True, pickle.loads(row[0])
+
+    def set(self, key, value):
+        now = time.time()
+        conn = self._conn()
+        conn.execute(
+            "INSERT OR REPLACE INTO results (key, value, expires, used) VALUES (?, ?, ?, ?)",
+            (key, pickle.dumps(value), now + self.ttl, now),
+        )
+        # Trim expired and least recently used rows every few hundred writes
+        self._writes += 1
+        if self._writes % 256 == 0:
+            conn.execute("DELETE FROM results WHERE expires < ?", (now,))
+            conn.execute(
+                "DELETE FROM results WHERE key IN ("
+                "SELECT key FROM results ORDER BY used DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+
+    def clear(self):
+        self._conn().execute("DELETE FROM results")
+
+    def __len__(self):
+        return self._conn().execute("SELECT COUNT(*) FROM results").fetchone()[0]
+
+
+class ResultCache:
+    """
+    Front end over a backend that keeps hit/miss counters per stage.
+    """
+
+    def __init__(self, backend=None):
+        self.backend = backend
+        self._stats = {}
+        self._lock = threading.Lock()
+
+    def _count(self, stage, outcome, llm_calls=0):
+        with self._lock:
+            counters = self._stats.setdefault(stage, {"hits": 0, "misses": 0, "llm_calls_saved": 0})
+            counters[outcome] += 1
+            counters["llm_calls_saved"] += llm_calls
+
+    def get_or_compute(self, stage, prompt_version, parts, compute, llm_calls=1):
+        """
+        Return the cached result for (stage, prompt_version, parts) or compute and store it.
+        `llm_calls` is how many Gemini calls one computation costs, for the savings counter.
+        Results that are None (failed calls) are never cached.
+        """
+        if self.backend is None:
+            return compute()
+        key = cache_key(stage, prompt_version, *parts)
+        found, value = self.backend.get(key)
+        if found:
+            self._count(stage, "hits", llm_calls)
+            return value
+        self._count(stage, "misses")
+        value = compute()
+        if value is not None:
+            self.backend.set(key, value)
+        return value
+
+    def lookup(self, stage, prompt_version, parts, llm_calls=1):
+        """
+        Return (found, value) for one entry, counting the hit or miss. Used by callers
+        that compute many entries at once (e.g. batched classification).
+        """
+        if self.backend is None:
+            return False, None
+        found, value = self.backend.get(cache_key(stage, prompt_version, *parts))
+        self._count(stage, "hits" if found else "misses", llm_calls if found else 0)
+        return found, value
+
+    def store(self, stage, prompt_version, parts, value):
+        if self.backend is not None and value is not None:
+            self.backend.set(cache_key(stage, prompt_version, *parts), value)
+
+    def cached(self, stage, prompt_version, llm_calls=1):
+        """
+        Decorator keying a stage function on its (text) positional arguments.
+        """
+        def decorator(func):
+            @functools.wraps(func)
+            def wrapper(*args):
+                return self.get_or_compute(stage, prompt_version, args, lambda: func(*args), llm_calls)
+            wrapper.uncached = func
+            return wrapper
+        return decorator
+
+    def stats(self):
+        with self._lock:
+            stages = {stage: dict(counters) for stage, counters in self._stats.items()}
+        hits = sum(counters["hits"] for counters in stages.values())
+        misses = sum(counters["misses"] for counters in stages.values())
+        return {
+            "backend": type(self.backend).__name__ if self.backend is not None else None,
+            "entries": len(self.backend) if self.backend is not None else 0,
+            "hits": hits,
+            "misses": misses,
+            "llm_calls_saved": sum(counters["llm_calls_saved"] for counters in stages.values()),
+            "stages": stages,
+        }
+
+    def clear(self):
+        if self.backend is not None:
+            self.backend.clear()
+
+
+def cache_from_env():
+    if RESULT_CACHE_BACKEND == "sqlite":
+        return ResultCache(SQLiteBackend())
+    if RESULT_CACHE_BACKEND == "none":
+        return ResultCache(None)
+    return ResultCache(MemoryBackend())
+
+
+# Shared by S.py and R.py
+result_cache = cache_from_env()
@@ -0,0 +1,185 @@
+"""
+Long-lived clients shared by the model modules.
+
+The Gemini model handle, the Pinecone index handle and the outbound HTTP session
+are created once per process (at app startup, or on first use for scripts such
+as the dashboard) and reused by every ticket instead of being rebuilt per call.
+
+The SDKs themselves are imported on first use, so importing this module (and the
+model modules that depend on it) never touches the network.
+
+Credentials come only from the environment: GEMINI_API_KEY, and PINECONE_API_KEY
+unless RETRIEVAL_BACKEND is "local". init_clients() fails at startup when one
+is missing.
+"""
+import os
+import threading
+
+GEMINI_API_KEY = os.environ.get("GEMINI_API_KEY")
+GEMINI_MODEL = os.environ.get("GEMINI_MODEL", "gemini-pro")
+EMBEDDING_MODEL = os.environ.get("EMBEDDING_MODEL", "models/embedding-001")
+
+PINECONE_API_KEY = os.environ.get("PINECONE_API_KEY")
+PINECONE_INDEX = os.environ.get("PINECONE_INDEX", "support-tickets")
+
+# Where get_top_similar_issues searches: "pinecone" (hosted index) or "local"
+# (in-process NumPy index from models/vector_index.py, no network needed)
+RETRIEVAL_BACKEND = os.environ.get("RETRIEVAL_BACKEND", "pinecone")
+
+# Connection pool size for the shared HTTP session (webhooks and other REST calls)
+HTTP_POOL_SIZE = int(os.environ.get("HTTP_POOL_SIZE", "64"))
+
+
+def _require(name, value):
+    if not value:
+        raise RuntimeError(f"{name} is not set; export it before starting the app")
+    return value
+
+
+class ClientRegistry:
+    """
+    Owns one instance of each external client. Accessors build the client the
+    first time they are called and return the same handle afterwards.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._gemini_configured = False
+        self._model = None
+        self._pinecone = None
+        self._index = None
+        self._session = None
+        self._embedder = None
+
+    # Factories: each builds a fresh client and is only called once per registry
+
+    def _build_gemini_model(self):
+        genai = self._configure_gemini()
+        return genai.GenerativeModel(GEMINI_MODEL)
+
+    def _build_pinecone_index(self):
+        if self._pinecone is None:
+            from pinecone import Pinecone
+
+            self._pinecone = Pinecone(api_key=_require("PINECONE_API_KEY", PINECONE_API_KEY))
+        return self._pinecone.Index(PINECONE_INDEX)
+
+    def _build_retrieval_index(self):
+        if RETRIEVAL_BACKEND == "local":
+            from models.vector_index import LocalVectorIndex
+
+            return LocalVectorIndex.open()
+        return self._build_pinecone_index()
+
+    def _build_http_session(self):
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=HTTP_POOL_SIZE, pool_maxsize=HTTP_POOL_SIZE)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        return session
+
+    def _configure_gemini(self):
+        import google.generativeai as genai
+
+        if not self._gemini_configured:
+            genai.configure(api_key=_require("GEMINI_API_KEY", GEMINI_API_KEY))
+            self._gemini_configured = True
+        return genai
+
+    # Accessors used on the hot path
+
+    def gemini_model(self):
+        if self._model is None:
+            with self._lock:
+                if self._model is None:
+                    self._model = self._build_gemini_model()
+        return self._model
+
+    def retrieval_index(self):
+        """
+        The similar-issue index: the Pinecone index handle or a LocalVectorIndex (RETRIEVAL_BACKEND).
+        """
+        if self._index is None:
+            with self._lock:
+                if self._index is None:
+                    self._index = self._build_retrieval_index()
+        return self._index
+
+    def http_session(self):
+        if self._session is None:
+            with self._lock:
+                if self._session is None:
+                    self._session = self._build_http_session()
+        return self._session
+
+    def embed_content(self, content, task_type="retrieval_document", model=EMBEDDING_MODEL):
+        """
+        Call Gemini's embedding API with the process-wide configuration.
+        """
+        if self._embedder is not None:
+            return self._embedder(model=model, content=content, task_type=task_type)
+        if not self._gemini_configured:
+            with self._lock:
+                self._configure_gemini()
+        import google.generativeai as genai
+
+        return genai.embed_content(model=model, content=content, task_type=task_type)
+
+    # Lifecycle
+
+    def init(self):
+        """
+        Build every client up front (called from the app startup hook). Raises
+        RuntimeError naming every missing credential before any client is built.
+        """
+        missing = []
+        if not GEMINI_API_KEY and not self._gemini_configured:
+            missing.append("GEMINI_API_KEY")
+        if not PINECONE_API_KEY and self._index is None and RETRIEVAL_BACKEND != "local":
+            missing.append("PINECONE_API_KEY")
+        if missing:
+            raise RuntimeError(f"Missing required environment variables: {', '.join(missing)}")
+        self.gemini_model()
+        self.retrieval_index()
+        self.http_session()
+
+    def close(self):
+        with self._lock:
+            if self._session is not None:
+                self._session.close()
+            self._session = None
+            self._model = None
+            self._index = None
+            self._pinecone = None
+            self._embedder = None
+
+    def override(self, model=None, index=None, session=None, embedder=None):
+        """
+        Install pre-built clients (e.g. stand-ins for benchmarks) instead of building real ones.
+        """
+        with self._lock:
+            if model is not None:
+                self._model = model
+                self._gemini_configured = True
+            if index is not None:
+                self._index = index
+            if session is not None:
+                self._session = session
+            if embedder is not None:
+                self._embedder = embedder
+
+
+# Process-wide registry used by S.py, R.py and the dashboard modules
+registry = ClientRegistry()
+
+
+def init_clients():
+    registry.init()
+    return registry
+
+
+def close_clients():
+    registry.close()
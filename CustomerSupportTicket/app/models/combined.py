@@ -0,0 +1,150 @@
+"""
+Single-call ticket analysis.
+
+By default a ticket costs three Gemini generations: sentiment (S.py), product
+and issue extraction, and the response (R.py). With TICKET_ANALYSIS_MODE=combined
+one structured call returns the sentiment, product name and issue sentence
+together, and the response is generated from that result, so each ticket
+needs two generations instead of three.
+
+Tickets the local sentiment classifier (S.py) is confident about skip the
+combined call: their response is generated by the separate extraction and
+generation calls, which is also two generations.
+
+The combined reply is validated against the same label set and keys the
+separate functions return; a reply that fails validation falls back to the
+separate calls for that ticket, run in parallel.
+"""
+import contextvars
+import json
+import logging
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+from models.clients import registry
+from models.ratelimit import estimate_tokens
+from models.scheduler import llm_scheduler
+from models.cache import result_cache
+from models.metrics import track_stage
+from models.S import SENTIMENT_EXAMPLES, SENTIMENT_LABELS, analyze_sentiment, classify_confidently
+from models.local_sentiment import sentiment_routing
+from models.R import (
+    EXTRACTION_PROMPT_VERSION, RESPONSE_LLM_CALLS, RESPONSE_PROMPT_VERSION, automate_response, respond_to_issue,
+)
+
+# "separate" (three generations per ticket) or "combined" (two)
+TICKET_ANALYSIS_MODE = os.environ.get("TICKET_ANALYSIS_MODE", "separate")
+
+# Bump when the prompt below changes so cached results are not reused
+COMBINED_PROMPT_VERSION = "v1"
+
+# Runs the sentiment call beside the response when a combined reply is unusable
+_fallback_pool = ThreadPoolExecutor(
+    max_workers=int(os.environ.get("COMBINED_FALLBACK_WORKERS", "8")), thread_name_prefix="combined-fallback"
+)
+
+COMBINED_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "thoughts": {
+            "type": "string",
+            "description": "Details on sentiment and reasoning."
+        },
+        "sentiment_type": {
+            "type": "string",
+            "description": "Sentiment classification: one of " + ", ".join(SENTIMENT_LABELS) + "."
+        },
+        "product_name": {
+            "type": "string",
+            "description": "The product the ticket is about."
+        },
+        "issue_sentence": {
+            "type": "string",
+            "description": "One sentence describing the customer's issue."
+        }
+    },
+    "required": ["thoughts", "sentiment_type", "product_name", "issue_sentence"]
+}
+
+
+def parse_combined_analysis(text):
+    """
+    Validate a combined reply and return {"sentiment", "thoughts", "product_name", "issue_sentence"}.
+    Raises ValueError when it is not JSON or the sentiment is not one of SENTIMENT_LABELS.
+    """
+    # Remove code block markers like ```json and ```
+    cleaned = re.sub(r"```[a-zA-Z]*\n|\n```", "", text.strip()).strip()
+    try:
+        analysis = json.loads(cleaned)
+    except json.JSONDecodeError as e:
+        raise ValueError(f"Error parsing combined analysis JSON: {e}\nResponse: {cleaned}")
+    if not isinstance(analysis, dict):
+        raise ValueError("Combined analysis response is not a JSON object")
+    if analysis.get("sentiment_type") not in SENTIMENT_LABELS:
+        raise ValueError("Invalid sentiment classification.")
+    return {
+        "sentiment": analysis["sentiment_type"],
+        "thoughts": analysis.get("thoughts", "No insights provided"),
+        "product_name": analysis.get("product_name") or "Unknown",
+        "issue_sentence": analysis.get("issue_sentence") or "Unknown",
+    }
+
+
+@result_cache.cached("combined", COMBINED_PROMPT_VERSION)
+def analyze_combined(title, body):
+    """
+    Sentiment, product name and issue sentence of a ticket from one Gemini call.
+    """
+    prompt = f"""
+    You are a customer support agent. For the ticket below, determine the sentiment of the conversation
+    and extract the product name and the issue. Return only a JSON object with the keys
+    'thoughts', 'sentiment_type', 'product_name' and 'issue_sentence', following this schema strictly:
+    {json.dumps(COMBINED_SCHEMA, indent=3)}
+
+{SENTIMENT_EXAMPLES}
+
+    Title: {json.dumps(title, ensure_ascii=False)}
+    Body: {json.dumps(body, ensure_ascii=False)}
+    """
+    with llm_scheduler.slot(estimate_tokens(prompt)), track_stage("combined_analysis", llm_call=True):
+        response = registry.gemini_model().generate_content(prompt)
+    return parse_combined_analysis(response.text)
+
+
+def analyze_and_respond(title, body):
+    """
+    Combined-mode equivalent of running analyze_sentiment and automate_response:
+    returns (sentiment result, (subject, body)) in the same shapes. When only the
+    fallback sentiment call fails, its exception is returned as the sentiment result.
+    """
+    sentiment, local_label = classify_confidently(title, body)
+    if sentiment is not None:
+        return sentiment, automate_response(title, body)
+
+    try:
+        analysis = analyze_combined(title, body)
+    except ValueError as e:
+        logging.error(f"Combined analysis failed, using separate calls: {e}")
+        # The copied context keeps the caller's scheduling priority for the sentiment call
+        sentiment_call = _fallback_pool.submit(contextvars.copy_context().run, analyze_sentiment, title, body)
+        response = automate_response(title, body)
+        try:
+            sentiment = sentiment_call.result()
+        except Exception as error:
+            # Returned like asyncio.gather(return_exceptions=True): the caller falls back
+            # for the sentiment but keeps the generated response
+            sentiment = error
+        return sentiment, response
+    sentiment_routing.record_llm(local_label, analysis["sentiment"])
+
+    sentiment = {"sentiment": analysis["sentiment"], "thoughts": analysis["thoughts"]}
+
+    # Shares cache entries with automate_response. The combined call already did the
+    # extraction, so a hit here saves the embedding and generation calls
+    parts = (title, body)
+    response_version = f"{EXTRACTION_PROMPT_VERSION}/{RESPONSE_PROMPT_VERSION}"
+    found, response = result_cache.lookup("response", response_version, parts, llm_calls=RESPONSE_LLM_CALLS - 1)
+    if not found:
+        response = respond_to_issue(analysis["product_name"], analysis["issue_sentence"])
+        result_cache.store("response", response_version, parts, response)
+    return sentiment, response
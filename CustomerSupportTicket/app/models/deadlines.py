@@ -0,0 +1,163 @@
+"""
+Per-stage deadlines and hedged requests for latency-bound callers (dashboard.py).
+
+A blocking upstream call (Gemini, Pinecone) cannot be interrupted, so each call
+runs on a worker thread and the caller stops waiting when the stage's timeout
+or the overall LatencyBudget runs out; the abandoned call finishes in the
+background and its result is dropped. With `hedge_after`, a second identical
+call is started if the first has not answered after that many seconds, and
+whichever answers first wins. Each call earns HEDGE_MAX_FRACTION of a hedge
+(banked up to HEDGE_BURST), so hedges stay a small share of recent traffic and
+a slow upstream is not hit with twice the load.
+"""
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from models.metrics import metrics
+
+DEADLINE_WORKERS = int(os.environ.get("DEADLINE_WORKERS", "32"))
+HEDGE_MAX_FRACTION = float(os.environ.get("HEDGE_MAX_FRACTION", "0.1"))
+HEDGE_BURST = float(os.environ.get("HEDGE_BURST", "5"))
+
+deadline_exceeded = metrics.counter(
+    "stage_deadline_exceeded_total", "Calls abandoned because their stage deadline passed.", ["stage"]
+)
+hedged_calls = metrics.counter(
+    "hedged_calls_total", "Hedged duplicate calls by stage and which attempt answered first.", ["stage", "winner"]
+)
+sla_responses = metrics.counter(
+    "sla_responses_total", "Responses produced under a latency budget, full or degraded.", ["path"]
+)
+
+
+class DeadlineExceeded(TimeoutError):
+    pass
+
+
+class LatencyBudget:
+    """
+    Overall time allowed for one request; stages get at most what is left of it.
+    """
+
+    def __init__(self, seconds):
+        self.seconds = seconds
+        self.started = time.monotonic()
+
+    def elapsed(self):
+        return time.monotonic() - self.started
+
+    def remaining(self):
+        return max(0.0, self.seconds - self.elapsed())
+
+    def stage_timeout(self, limit):
+        """
+        Timeout for the next stage: its own `limit`, capped by the remaining budget.
+        """
+        timeout = min(limit, self.remaining())
+        if timeout <= 0:
+            raise DeadlineExceeded("latency budget exhausted")
+        return timeout
+
+
+class DeadlineRunner:
+    """
+    Runs calls on a shared pool with a deadline and optional hedging, and counts
+    full versus degraded responses.
+    """
+
+    def __init__(self, max_workers=DEADLINE_WORKERS, hedge_max_fraction=HEDGE_MAX_FRACTION, hedge_burst=HEDGE_BURST):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="deadline")
+        # Callers of submit() wait here, so they never hold a slot the calls themselves need
+        self._waiters = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="deadline-wait")
+        self.hedge_max_fraction = hedge_max_fraction
+        self.hedge_burst = hedge_burst
+        self._hedge_tokens = hedge_burst
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.hedges = 0
+        self.timeouts = 0
+        self.responses = 0
+        self.degraded = 0
+
+    def _may_hedge(self):
+        with self._lock:
+            if self._hedge_tokens < 1:
+                return False
+            self._hedge_tokens -= 1
+            self.hedges += 1
+            return True
+
+    def call(self, stage, func, *args, timeout, hedge_after=0.0):
+        """
+        Return func(*args) if an attempt answers within `timeout` seconds, else raise
+        DeadlineExceeded. An exception from the last attempt still running is re-raised.
+        Attempts nobody will read (the loser of a hedge, everything after the deadline)
+        are cancelled; one that has already started runs to completion on its worker.
+        """
+        with self._lock:
+            self.calls += 1
+            self._hedge_tokens = min(self.hedge_burst, self._hedge_tokens + self.hedge_max_fraction)
+        start = time.monotonic()
+        deadline = start + timeout
+        attempts = {self._executor.submit(func, *args): "primary"}
+        hedge_pending = 0 < hedge_after < timeout
+        while True:
+            now = time.monotonic()
+            if now >= deadline:
+                break
+            until = min(deadline, start + hedge_after) if hedge_pending else deadline
+            done, _ = wait(attempts, timeout=until - now, return_when=FIRST_COMPLETED)
+            for future in done:
+                winner = attempts.pop(future)
+                error = future.exception()
+                if error is None:
+                    if winner == "hedge" or attempts:
+                        hedged_calls.inc(stage=stage, winner=winner)
+                    self._cancel(attempts)
+                    return future.result()
+                if not attempts:
+                    raise error
+            if hedge_pending and time.monotonic() - start >= hedge_after:
+                hedge_pending = False
+                if self._may_hedge():
+                    attempts[self._executor.submit(func, *args)] = "hedge"
+        self._cancel(attempts)
+        with self._lock:
+            self.timeouts += 1
+        deadline_exceeded.inc(stage=stage)
+        raise DeadlineExceeded(f"{stage} did not answer within {timeout:.2f}s")
+
+    @staticmethod
+    def _cancel(attempts):
+        # Only attempts still queued on the pool can be stopped; they never reach Gemini
+        for future in attempts:
+            future.cancel()
+
+    def submit(self, stage, func, *args, timeout, hedge_after=0.0):
+        """
+        Start call() in the background and return its Future, to overlap independent stages.
+        """
+        return self._waiters.submit(self.call, stage, func, *args, timeout=timeout, hedge_after=hedge_after)
+
+    def record_response(self, degraded):
+        with self._lock:
+            self.responses += 1
+            self.degraded += bool(degraded)
+        sla_responses.inc(path="degraded" if degraded else "full")
+
+    def stats(self):
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "hedges": self.hedges,
+                "timeouts": self.timeouts,
+                "responses": self.responses,
+                "degraded": self.degraded,
+                "degraded_rate": self.degraded / self.responses if self.responses else 0.0,
+            }
+
+
+# Shared by dashboard.py (module state survives Streamlit reruns of the script)
+deadline_runner = DeadlineRunner()
@@ -0,0 +1,212 @@
+"""
+Near-duplicate ticket detection with MinHash and locality-sensitive hashing.
+
+Customers and mail relays often send the same ticket several times with
+trivial edits (a signature, a forwarded-by line, whitespace). Each ticket's
+subject and body are reduced to word shingles, summarized by a MinHash
+signature, and the signature is split into bands; tickets sharing any band
+bucket are candidates, and a candidate whose estimated Jaccard similarity is
+at least DEDUP_THRESHOLD counts as a duplicate. Only tickets from the same
+customer that mention the same numbers (order, account or invoice ids) are
+compared, so an outage reported by many customers still gets an answer for
+each of them, and "order 123 has not arrived" is never merged into "order 456
+has not arrived".
+
+Detection is opt-in (DEDUP_ENABLED=1). The 0.9 default threshold only links
+resends that differ by a few words; with 3-word shingles one changed word in a
+20-word ticket already drops the similarity to about 0.7.
+
+The index covers the last DEDUP_WINDOW_SECONDS and at most DEDUP_WINDOW_SIZE
+tickets, so memory is bounded by the window. It can be saved to and loaded
+from DEDUP_INDEX_PATH to survive restarts.
+"""
+import os
+import re
+import threading
+import time
+import zlib
+from collections import OrderedDict
+
+import numpy as np
+
+from models.cache import normalize_text
+
+DEDUP_ENABLED = os.environ.get("DEDUP_ENABLED", "0") == "1"
+DEDUP_WINDOW_SECONDS = float(os.environ.get("DEDUP_WINDOW_SECONDS", "86400"))
+DEDUP_WINDOW_SIZE = int(os.environ.get("DEDUP_WINDOW_SIZE", "50000"))
+# Estimated Jaccard similarity of the shingle sets at which a ticket is a duplicate
+DEDUP_THRESHOLD = float(os.environ.get("DEDUP_THRESHOLD", "0.9"))
+# 32 bands of 4 rows: pairs at the threshold become candidates with probability > 0.999,
+# and 128 permutations keep the similarity estimate within about +/-0.04
+DEDUP_NUM_PERM = int(os.environ.get("DEDUP_NUM_PERM", "128"))
+DEDUP_BANDS = int(os.environ.get("DEDUP_BANDS", "32"))
+DEDUP_SHINGLE_SIZE = int(os.environ.get("DEDUP_SHINGLE_SIZE", "3"))
+DEDUP_INDEX_PATH = os.environ.get("DEDUP_INDEX_PATH", "")
+
+# Permutations are (a * x + b) mod p with a, b, x < p, so a * x stays within uint64
+_PRIME = (1 << 31) - 1
+
+_NUMBER = re.compile(r"\d+")
+
+
+def shingles(text, size=DEDUP_SHINGLE_SIZE):
+    """
+    Hashes (mod _PRIME) of the word `size`-grams of the normalized text.
+    """
+    words = normalize_text(text).split()
+    if len(words) <= size:
+        grams = [" ".join(words)]
+    else:
+        grams = [" ".join(words[i:i + size]) for i in range(len(words) - size + 1)]
+    return np.fromiter({zlib.crc32(gram.encode("utf-8")) % _PRIME for gram in grams}, dtype=np.uint64)
+
+
+class MinHashLSH:
+    """
+    MinHash signatures of recent tickets, bucketed by band for candidate lookup.
+    """
+
+    def __init__(self, threshold=DEDUP_THRESHOLD, num_perm=DEDUP_NUM_PERM, bands=DEDUP_BANDS,
+                 window_seconds=DEDUP_WINDOW_SECONDS, window_size=DEDUP_WINDOW_SIZE, seed=1):
+        if num_perm % bands:
+            raise ValueError("DEDUP_NUM_PERM must be a multiple of DEDUP_BANDS")
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.window_seconds = window_seconds
+        self.window_size = window_size
+        rng = np.random.RandomState(seed)
+        self._a = rng.randint(1, _PRIME, size=num_perm).astype(np.uint64)
+        self._b = rng.randint(0, _PRIME, size=num_perm).astype(np.uint64)
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> (namespace, signature, added_at)
+        self._buckets = [{} for _ in range(bands)]  # band -> {(namespace, band bytes): set of keys}
+        self.checked = 0
+        self.duplicates = 0
+
+    def signature(self, text):
+        hashes = shingles(text)
+        if not hashes.size:
+            return np.full(self.num_perm, _PRIME, dtype=np.uint64)
+        return ((np.outer(self._a, hashes) + self._b[:, None]) % np.uint64(_PRIME)).min(axis=1)
+
+    def _band_keys(self, namespace, signature):
+        for band in range(self.bands):
+            yield band, (namespace, signature[band * self.rows:(band + 1) * self.rows].tobytes())
+
+    def _expire(self, now):
+        cutoff = now - self.window_seconds
+        while self._entries:
+            key, (namespace, signature, added_at) = next(iter(self._entries.items()))
+            if added_at >= cutoff and len(self._entries) <= self.window_size:
+                break
+            self._remove(key)
+
+    def _remove(self, key):
+        namespace, signature, _ = self._entries.pop(key)
+        for band, bucket_key in self._band_keys(namespace, signature):
+            bucket = self._buckets[band].get(bucket_key)
+            if bucket is not None:
+                bucket.discard(key)
+                if not bucket:
+                    del self._buckets[band][bucket_key]
+
+    def query(self, signature, namespace=""):
+        """
+        Return (key, similarity) of the most similar ticket in the window at or above
+        the threshold, or None.
+        """
+        with self._lock:
+            self._expire(time.time())
+            self.checked += 1
+            candidates = set()
+            for band, bucket_key in self._band_keys(namespace, signature):
+                candidates.update(self._buckets[band].get(bucket_key, ()))
+            best = None
+            for key in candidates:
+                similarity = float(np.mean(self._entries[key][1] == signature))
+                if similarity >= self.threshold and (best is None or similarity > best[1]):
+                    best = (key, similarity)
+            return best
+
+    def record_duplicate(self):
+        """
+        Count a query match that was confirmed as a duplicate (its original still exists).
+        """
+        with self._lock:
+            self.duplicates += 1
+
+    def add(self, key, signature, namespace="", added_at=None):
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (namespace, signature, time.time() if added_at is None else added_at)
+            for band, bucket_key in self._band_keys(namespace, signature):
+                self._buckets[band].setdefault(bucket_key, set()).add(key)
+            self._expire(time.time())
+
+    def discard(self, key):
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "threshold": self.threshold,
+                "window_seconds": self.window_seconds,
+                "window_size": self.window_size,
+                "entries": len(self._entries),
+                "checked": self.checked,
+                "duplicates": self.duplicates,
+                "duplicate_rate": self.duplicates / self.checked if self.checked else 0.0,
+            }
+
+    # Persistence
+
+    def save(self, path=DEDUP_INDEX_PATH):
+        """
+        Write the window to `path` (an .npz file), replacing it atomically.
+        """
+        with self._lock:
+            items = list(self._entries.items())
+        keys = np.array([key for key, _ in items], dtype=str)
+        namespaces = np.array([namespace for _, (namespace, _, _) in items], dtype=str)
+        signatures = np.array([signature for _, (_, signature, _) in items], dtype=np.uint64).reshape(-1, self.num_perm)
+        added = np.array([added_at for _, (_, _, added_at) in items], dtype=np.float64)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            np.savez(f, keys=keys, namespaces=namespaces, signatures=signatures, added=added)
+        os.replace(tmp_path, path)
+
+    def load(self, path=DEDUP_INDEX_PATH):
+        """
+        Add the tickets saved at `path` that are still inside the window. Returns how many were loaded.
+        """
+        if not path or not os.path.exists(path):
+            return 0
+        with np.load(path) as data:
+            if data["signatures"].shape[1:] != (self.num_perm,):
+                return 0
+            rows = zip(data["keys"], data["namespaces"], data["signatures"], data["added"])
+            cutoff = time.time() - self.window_seconds
+            loaded = 0
+            for key, namespace, signature, added_at in rows:
+                if added_at >= cutoff:
+                    self.add(str(key), signature, str(namespace), float(added_at))
+                    loaded += 1
+        return loaded
+
+
+def dedup_namespace(customer_email, text=""):
+    """
+    The customer plus the sorted numeric tokens of `text`: tickets are only compared
+    within one namespace.
+    """
+    identifiers = sorted(set(_NUMBER.findall(text or "")))
+    return " ".join([normalize_text(customer_email or ""), *identifiers])
+
+
+# Shared by appp.py
+ticket_dedup = MinHashLSH()
@@ -0,0 +1,169 @@
+"""
+Disk-backed cache of Gemini embeddings.
+
+Extracted issue sentences repeat heavily across tickets for the same product,
+so get_top_similar_issues looks the embedding up here before calling the
+embedding API. Entries are keyed on (embedding model, task type, normalized
+text) and stored as compact float16 (or float32) blobs in a SQLite file that
+every worker process on the host shares. The least recently used entries are
+evicted beyond EMBEDDING_CACHE_SIZE.
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+import numpy as np
+
+from models.cache import normalize_text
+
+EMBEDDING_CACHE_ENABLED = os.environ.get("EMBEDDING_CACHE_ENABLED", "1") != "0"
+EMBEDDING_CACHE_PATH = os.environ.get("EMBEDDING_CACHE_PATH", "embedding_cache.sqlite3")
+EMBEDDING_CACHE_SIZE = int(os.environ.get("EMBEDDING_CACHE_SIZE", "200000"))
+# float16 halves the footprint; cosine rankings are unaffected at this precision
+EMBEDDING_CACHE_DTYPE = os.environ.get("EMBEDDING_CACHE_DTYPE", "float16")
+
+
+def embedding_key(model, task_type, text):
+    payload = json.dumps([model, task_type, normalize_text(text)])
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """
+    SQLite store of embedding vectors with hit/miss/eviction counters.
+    """
+
+    def __init__(self, path=EMBEDDING_CACHE_PATH, max_entries=EMBEDDING_CACHE_SIZE, dtype=EMBEDDING_CACHE_DTYPE):
+        self.path = path
+        self.max_entries = max_entries
+        self.dtype = np.dtype(dtype)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._writes = 0
+        conn = self._conn()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            "key TEXT PRIMARY KEY, dtype TEXT, vector BLOB, used REAL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS embeddings_used ON embeddings (used)")
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            self._local.conn = conn
+        return conn
+
+    def _count(self, counter, amount=1):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + amount)
+
+    def get(self, model, task_type, text):
+        """
+        The cached embedding as a list of floats, or None.
+        """
+        key = embedding_key(model, task_type, text)
+        conn = self._conn()
+        row = conn.execute("SELECT dtype, vector FROM embeddings WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            self._count("misses")
+            return None
+        conn.execute("UPDATE embeddings SET used = ? WHERE key = ?", (time.time(), key))
+        self._count("hits")
+        return np.frombuffer(row[1], dtype=row[0]).astype(np.float32).tolist()
+
+    def put(self, model, task_type, text, embedding):
+        conn = self._conn()
+        conn.execute(
+            "INSERT OR REPLACE INTO embeddings (key, dtype, vector, used) VALUES (?, ?, ?, ?)",
+            (embedding_key(model, task_type, text), self.dtype.name,
+             np.asarray(embedding, dtype=self.dtype).tobytes(), time.time()),
+        )
+        # Trim the least recently used rows every few hundred writes
+        with self._lock:
+            self._writes += 1
+            trim = self._writes % 256 == 0
+        if trim:
+            self.evict()
+
+    def evict(self):
+        deleted = self._conn().execute(
+            "DELETE FROM embeddings WHERE key IN ("
+            "SELECT key FROM embeddings ORDER BY used DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,),
+        ).rowcount
+        self._count("evictions", deleted)
+        return deleted
+
+    def get_or_embed(self, model, task_type, text, embed):
+        """
+        Return the cached embedding, or call embed() (returning a list of floats) and store the result.
+        """
+        embedding = self.get(model, task_type, text)
+        if embedding is None:
+            embedding = embed()
+            self.put(model, task_type, text, embedding)
+        return embedding
+
+    def stats(self):
+        entries, size = self._conn().execute(
+            "SELECT COUNT(*), COALESCE(SUM(LENGTH(vector)), 0) FROM embeddings"
+        ).fetchone()
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": entries,
+                "bytes": size,
+                "dtype": self.dtype.name,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+            }
+
+    def clear(self):
+        self._conn().execute("DELETE FROM embeddings")
+
+
+class NullEmbeddingCache:
+    """
+    Stand-in used when EMBEDDING_CACHE_ENABLED=0: every lookup calls the API.
+    """
+
+    def get(self, model, task_type, text):
+        return None
+
+    def put(self, model, task_type, text, embedding):
+        pass
+
+    def get_or_embed(self, model, task_type, text, embed):
+        return embed()
+
+    def stats(self):
+        return {"entries": 0, "bytes": 0, "hits": 0, "misses": 0, "hit_rate": 0.0, "evictions": 0}
+
+    def clear(self):
+        pass
+
+
+_embedding_cache = None
+_embedding_cache_lock = threading.Lock()
+
+
+def get_embedding_cache():
+    """
+    The process-wide cache, opened on first use so importing this module creates no files.
+    """
+    global _embedding_cache
+    if _embedding_cache is None:
+        with _embedding_cache_lock:
+            if _embedding_cache is None:
+                _embedding_cache = EmbeddingCache() if EMBEDDING_CACHE_ENABLED else NullEmbeddingCache()
+    return _embedding_cache
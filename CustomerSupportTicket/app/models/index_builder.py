@@ -0,0 +1,234 @@
+"""
+Batched, resumable build of the similar-issue retrieval index.
+
+Streams the historical tickets in data/ (helpdesk CSV, support conversation
+Parquet and the Automation Response workbook) in chunks, embeds the issue text
+in batches with one embedding call per batch, and upserts the vectors into the
+retrieval index selected by RETRIEVAL_BACKEND (Pinecone or the local index).
+
+Progress is written to a checkpoint file as batches are committed (every batch
+for Pinecone, every INDEX_BUILD_SAVE_EVERY batches for the local index), so an
+interrupted run picks up where it stopped. Run from the app directory:
+
+    python -m models.index_builder
+    python -m models.index_builder --sources helpdesk xlsx --batch-size 50
+    python -m models.index_builder --restart        # ignore the checkpoint
+"""
+import argparse
+import json
+import logging
+import os
+import time
+
+from models.clients import registry, EMBEDDING_MODEL, RETRIEVAL_BACKEND
+from models.embedding_cache import get_embedding_cache
+from models.ratelimit import gemini_limiter, estimate_tokens
+
+MODELS_DIR = os.path.dirname(os.path.abspath(__file__))
+DATA_DIR = os.path.join(MODELS_DIR, "..", "..", "data")
+
+SOURCES = {
+    "helpdesk": os.path.join(DATA_DIR, "helpdesk_customer_multi_lang_tickets.csv"),
+    "conversations": os.path.join(DATA_DIR, "train-00000-of-00001-a5a7c6e4bb30b016.parquet"),
+    "xlsx": os.path.join(DATA_DIR, "Automation Response Dataset.xlsx"),
+}
+
+INDEX_BUILD_CHECKPOINT = os.environ.get("INDEX_BUILD_CHECKPOINT", "index_build_checkpoint.json")
+INDEX_BUILD_BATCH_SIZE = int(os.environ.get("INDEX_BUILD_BATCH_SIZE", "100"))
+# Rows read from a file at a time
+READ_CHUNK_SIZE = 1000
+# Batches between saves of the local index (each save rewrites the whole vector file)
+LOCAL_SAVE_EVERY = int(os.environ.get("INDEX_BUILD_SAVE_EVERY", "10"))
+# Metadata text is truncated to stay well inside Pinecone's per-vector metadata limit
+METADATA_TEXT_LIMIT = 2000
+EMBED_TEXT_LIMIT = 4000
+
+
+def _text(value):
+    if value is None or value != value:  # None or NaN
+        return ""
+    return str(value).strip()
+
+
+def _record(record_id, subject, body, response, source):
+    issue = f"{subject}\n{body}".strip()
+    return {
+        "id": record_id,
+        "text": issue[:EMBED_TEXT_LIMIT],
+        "metadata": {
+            "issue": (subject or body)[:METADATA_TEXT_LIMIT],
+            "response": response[:METADATA_TEXT_LIMIT],
+            "source": source,
+        },
+    }
+
+
+def read_helpdesk(path, skip=0):
+    import pandas as pd
+
+    row = 0
+    for chunk in pd.read_csv(path, chunksize=READ_CHUNK_SIZE, usecols=["id", "subject", "body", "answer"]):
+        for item in chunk.itertuples(index=False):
+            row += 1
+            if row <= skip:
+                continue
+            yield _record(f"helpdesk-{item.id}", _text(item.subject), _text(item.body), _text(item.answer), "helpdesk")
+
+
+def read_conversations(path, skip=0):
+    import pyarrow.parquet as pq
+
+    columns = ["product_sub_category", "issue_category_sub_category", "conversation"]
+    row = 0
+    for batch in pq.ParquetFile(path).iter_batches(batch_size=READ_CHUNK_SIZE, columns=columns):
+        for item in batch.to_pylist():
+            row += 1
+            if row <= skip:
+                continue
+            subject = f"{_text(item['product_sub_category'])}: {_text(item['issue_category_sub_category'])}"
+            conversation = _text(item["conversation"])
+            yield _record(f"conversation-{row}", subject, conversation, conversation, "conversations")
+
+
+def read_xlsx(path, skip=0):
+    from openpyxl import load_workbook
+
+    # read_only streams rows instead of loading the whole workbook
+    workbook = load_workbook(path, read_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = [_text(cell) for cell in next(rows)]
+        subject, body, answer = header.index("subject"), header.index("body"), header.index("answer")
+        for row, values in enumerate(rows, start=1):
+            if row <= skip:
+                continue
+            yield _record(f"automation-{row}", _text(values[subject]), _text(values[body]),
+                          _text(values[answer]), "xlsx")
+    finally:
+        workbook.close()
+
+
+READERS = {
+    "helpdesk": read_helpdesk,
+    "conversations": read_conversations,
+    "xlsx": read_xlsx,
+}
+
+
+def load_checkpoint(path):
+    if os.path.exists(path):
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    return {"sources": {}, "upserted": 0}
+
+
+def save_checkpoint(path, checkpoint):
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(checkpoint, f)
+    os.replace(tmp, path)
+
+
+def embed_batch(texts):
+    """
+    Embeddings for a batch of texts: cached ones from the embedding cache, the rest in one API call.
+    """
+    cache = get_embedding_cache()
+    embeddings = [cache.get(EMBEDDING_MODEL, "retrieval_document", text) for text in texts]
+    missing = [i for i, embedding in enumerate(embeddings) if embedding is None]
+    if missing:
+        content = [texts[i] for i in missing]
+        gemini_limiter.acquire(sum(estimate_tokens(text) for text in content))
+        response = registry.embed_content(content, task_type="retrieval_document")
+        for i, embedding in zip(missing, response["embedding"]):
+            embeddings[i] = embedding
+            cache.put(EMBEDDING_MODEL, "retrieval_document", texts[i], embedding)
+    return embeddings
+
+
+def _batches(records, size):
+    batch = []
+    for record in records:
+        batch.append(record)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def build_index(sources=tuple(SOURCES), batch_size=INDEX_BUILD_BATCH_SIZE, checkpoint_path=INDEX_BUILD_CHECKPOINT,
+                restart=False, limit=None, save_every=LOCAL_SAVE_EVERY):
+    """
+    Embed and upsert every source, resuming from the checkpoint. Returns the final checkpoint.
+    """
+    checkpoint = {"sources": {}, "upserted": 0} if restart else load_checkpoint(checkpoint_path)
+    index = registry.retrieval_index()
+    # Pinecone upserts are durable immediately; the local index only once saved,
+    # so it is saved (and progress recorded) every `save_every` batches
+    local = hasattr(index, "save")
+    commit_every = save_every if local else 1
+    started = time.perf_counter()
+    indexed = 0
+
+    def commit():
+        if local:
+            index.save()
+        save_checkpoint(checkpoint_path, checkpoint)
+
+    def finish():
+        # Large local indexes are searched with IVF (see models/vector_index.py)
+        if local:
+            from models.vector_index import IVF_MIN_VECTORS
+
+            if len(index) >= IVF_MIN_VECTORS:
+                index.train_ivf()
+                index.save()
+        return checkpoint
+
+    for source in sources:
+        done = checkpoint["sources"].get(source, 0)
+        if done == "complete":
+            logging.info(f"{source}: already indexed, skipping")
+            continue
+        records = READERS[source](SOURCES[source], skip=done)
+        for number, batch in enumerate(_batches(records, batch_size), start=1):
+            embeddings = embed_batch([record["text"] for record in batch])
+            index.upsert(vectors=[
+                (record["id"], embedding, record["metadata"]) for record, embedding in zip(batch, embeddings)
+            ])
+            done += len(batch)
+            indexed += len(batch)
+            checkpoint["upserted"] += len(batch)
+            checkpoint["sources"][source] = done
+            if number % commit_every == 0:
+                commit()
+            rate = indexed / max(time.perf_counter() - started, 1e-9)
+            print(f"{source}: {done} rows indexed ({rate:.0f} rows/s)", flush=True)
+            if limit is not None and indexed >= limit:
+                commit()
+                return finish()
+        checkpoint["sources"][source] = "complete"
+        commit()
+    return finish()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sources", nargs="+", choices=list(SOURCES), default=list(SOURCES))
+    parser.add_argument("--batch-size", type=int, default=INDEX_BUILD_BATCH_SIZE)
+    parser.add_argument("--checkpoint", default=INDEX_BUILD_CHECKPOINT)
+    parser.add_argument("--restart", action="store_true", help="ignore an existing checkpoint")
+    parser.add_argument("--limit", type=int, default=None, help="stop after this many rows (for trial runs)")
+    parser.add_argument("--save-every", type=int, default=LOCAL_SAVE_EVERY,
+                        help="batches between saves of the local index")
+    args = parser.parse_args()
+
+    print(f"Building the {RETRIEVAL_BACKEND} retrieval index from: {', '.join(args.sources)}")
+    checkpoint = build_index(args.sources, args.batch_size, args.checkpoint, args.restart, args.limit,
+                             args.save_every)
+    print(f"Done: {checkpoint['upserted']} vectors upserted ({checkpoint['sources']})")
+
+
+if __name__ == "__main__":
+    main()
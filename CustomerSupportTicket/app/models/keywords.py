@@ -0,0 +1,116 @@
+"""
+Compiled keyword matcher for issue escalation.
+
+Every keyword of every rule is compiled once into a single regular expression
+whose alternation is factored into a character trie, so the regex engine tries
+at most one branch per character and matching cost stays flat as the keyword
+lists grow. Matches are on whole words: "tissue" no longer trips "issue",
+while plurals such as "issues" or "crashes" still match their keyword, and the
+words of a phrase ("data breach") may be separated by any whitespace.
+
+Rules can be overridden with a JSON file ({"rule": ["keyword", ...]}) named by
+ESCALATION_RULES_PATH.
+"""
+import json
+import os
+import re
+
+CRITICAL_KEYWORDS = ["issue", "problem", "urgent", "disruption", "failure",
+                     "incident", "crash", "refund", "outage", "critical"]
+SPECIFIC_KEYWORDS = ["security", "data breach", "compliance"]
+
+DEFAULT_RULES = {
+    "critical": CRITICAL_KEYWORDS,
+    "specific": SPECIFIC_KEYWORDS,
+}
+
+ESCALATION_RULES_PATH = os.environ.get("ESCALATION_RULES_PATH", "")
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def _normalize(keyword):
+    return _WHITESPACE.sub(" ", keyword.strip().lower())
+
+
+def _trie_pattern(words):
+    """
+    Regex alternation of `words` with shared prefixes factored out ("crash|critical" -> "cr(?:ash|itical)").
+    """
+    trie = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[""] = {}
+
+    def emit(node):
+        ends = "" in node
+        branches = [
+            (r"\s+" if char == " " else re.escape(char)) + emit(child)
+            for char, child in sorted(node.items()) if char
+        ]
+        if not branches:
+            return ""
+        if len(branches) == 1 and not ends:
+            return branches[0]
+        body = f"(?:{'|'.join(branches)})"
+        return f"{body}?" if ends else body
+
+    return emit(trie)
+
+
+class KeywordMatcher:
+    """
+    Matches a fixed set of keyword rules against text in a single regex pass.
+    """
+
+    def __init__(self, rules):
+        self.rules = {rule: list(keywords) for rule, keywords in rules.items()}
+        # normalized keyword -> rules it belongs to
+        self._rules_by_keyword = {}
+        for rule, keywords in self.rules.items():
+            for keyword in keywords:
+                if keyword.strip():
+                    self._rules_by_keyword.setdefault(_normalize(keyword), []).append(rule)
+        # No leading \b: a pattern that opens with the keyword alternation lets the
+        # regex engine skip ahead to candidate first characters; the left word
+        # boundary is checked on the (rare) candidates in matches() instead
+        self._pattern = re.compile(rf"({_trie_pattern(self._rules_by_keyword) or '(?!)'})(?:s|es)?\b")
+
+    def rule_pattern(self, rule):
+        """
+        Standalone whole-word regex (for lowercased text) matching any keyword of one rule,
+        e.g. for pandas' vectorized str.contains.
+        """
+        keywords = {_normalize(keyword) for keyword in self.rules.get(rule, []) if keyword.strip()}
+        return rf"(?<!\w)(?:{_trie_pattern(keywords) or '(?!)'})(?:s|es)?\b"
+
+    def matches(self, text):
+        """
+        Return {rule: set of keywords found} for every rule that fired.
+        """
+        fired = {}
+        text = (text or "").lower()
+        for match in self._pattern.finditer(text):
+            start = match.start()
+            if start and (text[start - 1].isalnum() or text[start - 1] == "_"):
+                continue
+            keyword = _WHITESPACE.sub(" ", match.group(1))
+            for rule in self._rules_by_keyword[keyword]:
+                fired.setdefault(rule, set()).add(keyword)
+        return fired
+
+    def fired_rules(self, text):
+        return set(self.matches(text))
+
+
+def load_rules(path=ESCALATION_RULES_PATH):
+    if path:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    return DEFAULT_RULES
+
+
+# Built once at import and shared by both escalation implementations
+escalation_matcher = KeywordMatcher(load_rules())
@@ -0,0 +1,230 @@
+"""
+Local fast-path sentiment classifier.
+
+A TF-IDF + logistic regression model trained on the labelled support
+conversations in data/train-*.parquet. analyze_sentiment (models/S.py) asks it
+first and only calls Gemini when the predicted probability is below
+LOCAL_SENTIMENT_THRESHOLD, or when no trained model is available.
+
+Train and evaluate (run from the app directory):
+    python -m models.local_sentiment train
+    python -m models.local_sentiment evaluate --threshold 0.8   # held-out report, nothing saved
+"""
+import argparse
+import logging
+import os
+import threading
+
+MODELS_DIR = os.path.dirname(os.path.abspath(__file__))
+DATA_DIR = os.path.join(MODELS_DIR, "..", "..", "data")
+
+LOCAL_SENTIMENT_MODEL_PATH = os.environ.get(
+    "LOCAL_SENTIMENT_MODEL_PATH", os.path.join(MODELS_DIR, "local_sentiment.joblib")
+)
+LOCAL_SENTIMENT_THRESHOLD = float(os.environ.get("LOCAL_SENTIMENT_THRESHOLD", "0.8"))
+LOCAL_SENTIMENT_ENABLED = os.environ.get("LOCAL_SENTIMENT_ENABLED", "1") != "0"
+TRAINING_DATA_PATH = os.path.join(DATA_DIR, "train-00000-of-00001-a5a7c6e4bb30b016.parquet")
+
+
+def ticket_text(title, conversation):
+    return f"{title or ''}\n{conversation or ''}"
+
+
+class LocalSentimentClassifier:
+    """
+    Wraps a fitted scikit-learn pipeline that maps ticket text to one of the four sentiment labels.
+    """
+
+    def __init__(self, pipeline):
+        self.pipeline = pipeline
+        self.labels = list(pipeline.classes_)
+
+        # Unpack the fitted steps so a single prediction skips scikit-learn's per-call
+        # validation and sparse-matrix construction (about 3x faster for one ticket)
+        vectorizer, model = pipeline.steps[0][1], pipeline.steps[-1][1]
+        self._analyzer = vectorizer.build_analyzer()
+        self._vocabulary = vectorizer.vocabulary_
+        self._idf = vectorizer.idf_
+        self._weights = model.coef_.T.copy()
+        self._intercept = model.intercept_
+
+    @classmethod
+    def train(cls, texts, labels):
+        from sklearn.feature_extraction.text import TfidfVectorizer
+        from sklearn.linear_model import LogisticRegression
+        from sklearn.pipeline import make_pipeline
+
+        pipeline = make_pipeline(
+            TfidfVectorizer(ngram_range=(1, 2), min_df=2, sublinear_tf=True, strip_accents="unicode"),
+            LogisticRegression(C=30, max_iter=3000, class_weight="balanced"),
+        )
+        pipeline.fit(texts, labels)
+        return cls(pipeline)
+
+    def predict(self, title, conversation):
+        """
+        Return (label, probability of that label) for one ticket.
+        """
+        import numpy as np
+
+        counts = {}
+        for term in self._analyzer(ticket_text(title, conversation)):
+            column = self._vocabulary.get(term)
+            if column is not None:
+                counts[column] = counts.get(column, 0) + 1
+
+        scores = self._intercept.copy()
+        if counts:
+            columns = np.fromiter(counts.keys(), dtype=np.int64, count=len(counts))
+            tf = np.fromiter(counts.values(), dtype=np.float64, count=len(counts))
+            # Same weighting as the fitted TfidfVectorizer: sublinear tf * idf, L2-normalized
+            weights = (1.0 + np.log(tf)) * self._idf[columns]
+            weights /= np.linalg.norm(weights)
+            scores = scores + weights @ self._weights[columns]
+
+        # Multinomial logistic regression: softmax over the class scores
+        probabilities = np.exp(scores - scores.max())
+        probabilities /= probabilities.sum()
+        best = probabilities.argmax()
+        return self.labels[best], float(probabilities[best])
+
+    def save(self, path=LOCAL_SENTIMENT_MODEL_PATH):
+        import joblib
+
+        joblib.dump(self.pipeline, path)
+
+    @classmethod
+    def load(cls, path=LOCAL_SENTIMENT_MODEL_PATH):
+        import joblib
+
+        return cls(joblib.load(path))
+
+
+class RoutingStats:
+    """
+    Counts which path classified each ticket and how often the two paths agree
+    on the tickets that were escalated to Gemini.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.local = 0
+        self.llm = 0
+        self.compared = 0
+        self.agreed = 0
+
+    def record_local(self):
+        with self._lock:
+            self.local += 1
+
+    def record_llm(self, local_label=None, llm_label=None):
+        with self._lock:
+            self.llm += 1
+            if local_label is not None and llm_label is not None:
+                self.compared += 1
+                self.agreed += int(local_label == llm_label)
+
+    def report(self):
+        with self._lock:
+            total = self.local + self.llm
+            return {
+                "threshold": LOCAL_SENTIMENT_THRESHOLD,
+                "model_loaded": _classifier is not None,
+                "local": self.local,
+                "llm": self.llm,
+                "llm_fraction": self.llm / total if total else 0.0,
+                "compared": self.compared,
+                "agreement_rate": self.agreed / self.compared if self.compared else None,
+            }
+
+
+sentiment_routing = RoutingStats()
+
+_classifier = None
+_load_attempted = False
+_load_lock = threading.Lock()
+
+
+def get_local_classifier():
+    """
+    The trained classifier, loaded on first use; None when disabled, untrained or scikit-learn is missing.
+    """
+    global _classifier, _load_attempted
+    if not _load_attempted:
+        with _load_lock:
+            if not _load_attempted:
+                if LOCAL_SENTIMENT_ENABLED and os.path.exists(LOCAL_SENTIMENT_MODEL_PATH):
+                    try:
+                        _classifier = LocalSentimentClassifier.load(LOCAL_SENTIMENT_MODEL_PATH)
+                    except Exception as e:
+                        logging.error(f"Could not load local sentiment model: {e}")
+                _load_attempted = True
+    return _classifier
+
+
+def classify_locally(title, conversation):
+    """
+    Return (label, confidence) from the local model, or None if it is unavailable.
+    """
+    classifier = get_local_classifier()
+    if classifier is None:
+        return None
+    return classifier.predict(title, conversation)
+
+
+def load_training_data(path=TRAINING_DATA_PATH):
+    import pandas as pd
+
+    df = pd.read_parquet(path, columns=["conversation", "customer_sentiment"]).dropna()
+    texts = [ticket_text("", conversation) for conversation in df["conversation"]]
+    return texts, df["customer_sentiment"].tolist()
+
+
+def evaluate(classifier, texts, labels, threshold=LOCAL_SENTIMENT_THRESHOLD):
+    """
+    Held-out accuracy overall and on the confident predictions, plus the share that would go to Gemini.
+    """
+    confident = correct = confident_correct = 0
+    for text, label in zip(texts, labels):
+        predicted, confidence = classifier.predict("", text)
+        correct += predicted == label
+        if confidence >= threshold:
+            confident += 1
+            confident_correct += predicted == label
+    return {
+        "samples": len(texts),
+        "accuracy": correct / len(texts),
+        "threshold": threshold,
+        "llm_fraction": 1 - confident / len(texts),
+        "confident_accuracy": confident_correct / confident if confident else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=["train", "evaluate"])
+    parser.add_argument("--data", default=TRAINING_DATA_PATH)
+    parser.add_argument("--model", default=LOCAL_SENTIMENT_MODEL_PATH, help="where train saves the model")
+    parser.add_argument("--threshold", type=float, default=LOCAL_SENTIMENT_THRESHOLD)
+    parser.add_argument("--test-size", type=float, default=0.2)
+    args = parser.parse_args()
+
+    from sklearn.model_selection import train_test_split
+
+    texts, labels = load_training_data(args.data)
+    train_texts, test_texts, train_labels, test_labels = train_test_split(
+        texts, labels, test_size=args.test_size, stratify=labels, random_state=42
+    )
+
+    classifier = LocalSentimentClassifier.train(train_texts, train_labels)
+    print("Held-out evaluation:", evaluate(classifier, test_texts, test_labels, args.threshold))
+
+    if args.command == "train":
+        # Refit on all labelled data for the persisted model
+        classifier = LocalSentimentClassifier.train(texts, labels)
+        classifier.save(args.model)
+        print(f"Saved model to {args.model}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,212 @@
+"""
+In-process metrics exposed in the Prometheus text format (GET /metrics).
+
+Hot-path updates are a lock and a few arithmetic operations, so timing every
+stage of every ticket costs microseconds next to the network calls it measures.
+Numbers that other modules already keep (cache hits, webhook retries, ...)
+are not duplicated: collectors registered with `metrics.collector()` read them
+when /metrics is scraped.
+"""
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+
+# Upper bounds (seconds) of the latency histogram buckets
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=""):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def _key(self, labels):
+        return tuple(labels.get(name, "") for name in self.labelnames)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            values = dict(self._values)
+        for key, value in sorted(values.items()):
+            lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}")
+        return lines
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+    def set(self, value, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        position = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._values.get(key)
+            if series is None:
+                # Per-bucket counts (last slot is +Inf), sum
+                series = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][position] += 1
+            series[1] += value
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            values = {key: (list(counts), total) for key, (counts, total) in self._values.items()}
+        for key, (counts, total) in sorted(values.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = 'le="' + _format_value(float(bound)) + '"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    """
+    Named metrics plus scrape-time collectors, rendered together by render().
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._metrics = {}
+        self._collectors = []
+
+    def _register(self, metric):
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                return existing
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name, documentation, labelnames=()):
+        return self._register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def collector(self, func):
+        """
+        Register `func() -> [(name, kind, documentation, [(labels dict, value), ...]), ...]`,
+        called on every scrape. Usable as a decorator.
+        """
+        with self._lock:
+            self._collectors.append(func)
+        return func
+
+    def render(self):
+        with self._lock:
+            metrics = list(self._metrics.values())
+            collectors = list(self._collectors)
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        for func in collectors:
+            for name, kind, documentation, samples in func():
+                lines.append(f"# HELP {name} {documentation}")
+                lines.append(f"# TYPE {name} {kind}")
+                for labels, value in samples:
+                    lines.append(f"{name}{_format_labels(labels.keys(), labels.values())} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+# Process-wide registry and the metrics shared by the model modules and appp.py
+metrics = MetricsRegistry()
+
+stage_seconds = metrics.histogram(
+    "ticket_stage_duration_seconds", "Time spent in each ticket processing stage.", ["stage"]
+)
+stage_failures = metrics.counter(
+    "ticket_stage_failures_total", "Stage executions that raised an exception.", ["stage"]
+)
+stage_in_flight = metrics.gauge(
+    "ticket_stage_in_flight", "Stage executions currently running.", ["stage"]
+)
+llm_calls = metrics.counter(
+    "llm_calls_total", "Gemini generate/embed calls by stage and outcome.", ["stage", "outcome"]
+)
+llm_retries = metrics.counter(
+    "llm_retries_total", "Gemini calls repeated after an unusable reply.", ["stage"]
+)
+
+
+@contextmanager
+def track_stage(stage, llm_call=False):
+    """
+    Time the enclosed block as `stage`: duration histogram, in-flight gauge and
+    failure counter, and the LLM call counter when the block is a Gemini call.
+    """
+    stage_in_flight.inc(stage=stage)
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        # Cancellation and abandoned generators are not failures
+        stage_failures.inc(stage=stage)
+        if llm_call:
+            llm_calls.inc(stage=stage, outcome="error")
+        raise
+    else:
+        if llm_call:
+            llm_calls.inc(stage=stage, outcome="ok")
+    finally:
+        stage_seconds.observe(time.perf_counter() - start, stage=stage)
+        stage_in_flight.dec(stage=stage)
@@ -0,0 +1,207 @@
+"""
+MongoDB access for the synchronous (dashboard) path.
+
+get_mongo_client() returns one pooled MongoClient per connection string for
+the whole process instead of a new client per ticket. WriteBehindBuffer lets
+callers hand documents off without waiting for the database: documents get
+their _id up front, are buffered, and are written with insert_many once
+MONGO_WRITE_BATCH_SIZE documents are waiting or MONGO_WRITE_MAX_DELAY seconds
+have passed, and once more at interpreter exit. It is off by default
+(MONGO_WRITE_BEHIND=1 turns it on): the caller gets an _id before the document
+is stored. A failed batch is retried with the next flush, up to
+MONGO_WRITE_MAX_ATTEMPTS times, and then appended to MONGO_DEAD_LETTER_PATH.
+After a failed write the next flush waits MONGO_WRITE_RETRY_DELAY seconds,
+doubling with each further failure up to MONGO_WRITE_MAX_RETRY_DELAY, even if
+a full batch is waiting, so the attempts are not spent back to back while the
+database is down.
+"""
+import atexit
+import json
+import logging
+import os
+import threading
+import time
+
+DASHBOARD_MONGO_URL = os.environ.get("DASHBOARD_MONGO_URL", "mongodb://localhost:27017")
+MONGO_WRITE_BEHIND = os.environ.get("MONGO_WRITE_BEHIND", "0") == "1"
+MONGO_WRITE_BATCH_SIZE = int(os.environ.get("MONGO_WRITE_BATCH_SIZE", "50"))
+MONGO_WRITE_MAX_DELAY = float(os.environ.get("MONGO_WRITE_MAX_DELAY", "1.0"))
+# Flushes a document is tried in before it is dead-lettered
+MONGO_WRITE_MAX_ATTEMPTS = int(os.environ.get("MONGO_WRITE_MAX_ATTEMPTS", "5"))
+MONGO_DEAD_LETTER_PATH = os.environ.get("MONGO_DEAD_LETTER_PATH", "mongo_dead_letters.jsonl")
+# Backoff after a failed write: doubles per consecutive failure, capped
+MONGO_WRITE_RETRY_DELAY = float(os.environ.get("MONGO_WRITE_RETRY_DELAY", "1.0"))
+MONGO_WRITE_MAX_RETRY_DELAY = float(os.environ.get("MONGO_WRITE_MAX_RETRY_DELAY", "30.0"))
+
+# Duplicate key: an earlier attempt already stored the document
+DUPLICATE_KEY_ERROR = 11000
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def get_mongo_client(url=DASHBOARD_MONGO_URL):
+    """
+    The process-wide client for `url` (MongoClient is thread-safe and pools its own connections).
+    """
+    client = _clients.get(url)
+    if client is None:
+        with _clients_lock:
+            client = _clients.get(url)
+            if client is None:
+                from pymongo import MongoClient
+
+                client = _clients[url] = MongoClient(url)
+    return client
+
+
+def close_mongo_clients():
+    with _clients_lock:
+        for client in _clients.values():
+            client.close()
+        _clients.clear()
+
+
+class WriteBehindBuffer:
+    """
+    Buffers documents for one collection and writes them in batches from a background thread.
+    """
+
+    def __init__(self, collection, batch_size=MONGO_WRITE_BATCH_SIZE, max_delay=MONGO_WRITE_MAX_DELAY,
+                 max_attempts=MONGO_WRITE_MAX_ATTEMPTS, dead_letter_path=MONGO_DEAD_LETTER_PATH,
+                 retry_delay=MONGO_WRITE_RETRY_DELAY, max_retry_delay=MONGO_WRITE_MAX_RETRY_DELAY):
+        self.collection = collection
+        self.batch_size = batch_size
+        self.max_delay = max_delay
+        self.max_attempts = max_attempts
+        self.dead_letter_path = dead_letter_path
+        self.retry_delay = retry_delay
+        self.max_retry_delay = max_retry_delay
+        self._pending = []
+        self._attempts = {}
+        self._failures = 0  # consecutive failed flushes
+        self._retry_at = 0.0  # monotonic time before which the next flush waits
+        self._condition = threading.Condition()
+        self._flush_lock = threading.Lock()
+        self._closed = False
+        self.stats = {"buffered": 0, "written": 0, "flushes": 0, "retried": 0, "dead_lettered": 0}
+        self._thread = threading.Thread(target=self._run, name="mongo-write-behind", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def add(self, document):
+        """
+        Queue a document and return its _id immediately.
+        """
+        from bson import ObjectId
+
+        document.setdefault("_id", ObjectId())
+        with self._condition:
+            self._pending.append(document)
+            self.stats["buffered"] += 1
+            if len(self._pending) >= self.batch_size:
+                self._condition.notify()
+        return document["_id"]
+
+    def _run(self):
+        while True:
+            with self._condition:
+                # After a failed write, wait out the backoff first, whatever is queued
+                self._condition.wait_for(
+                    lambda: self._closed or time.monotonic() >= self._retry_at,
+                    timeout=max(0.0, self._retry_at - time.monotonic()),
+                )
+                # Wake on a full batch, the time limit, close(), or documents due for a retry
+                self._condition.wait_for(
+                    lambda: self._closed or len(self._pending) >= self.batch_size or bool(self._attempts),
+                    timeout=self.max_delay,
+                )
+                closed = self._closed
+            self.flush()
+            if closed:
+                return
+
+    def flush(self):
+        from pymongo.errors import BulkWriteError
+
+        with self._flush_lock:
+            with self._condition:
+                documents, self._pending = self._pending, []
+            if not documents:
+                return 0
+            try:
+                self.collection.insert_many(documents, ordered=False)
+                failed, error = [], None
+            except BulkWriteError as e:
+                # The insert is unordered, so only documents with a write error were not stored
+                errors = {
+                    write_error["index"]: write_error for write_error in e.details.get("writeErrors", [])
+                    if write_error.get("code") != DUPLICATE_KEY_ERROR
+                }
+                failed = [documents[index] for index in sorted(errors)]
+                error = "; ".join(write_error.get("errmsg", "") for write_error in errors.values())
+            except Exception as e:
+                failed, error = documents, str(e)
+            if failed:
+                logging.error(f"Write-behind insert of {len(failed)} of {len(documents)} documents failed: {error}")
+                self._failures += 1
+                backoff = min(self.retry_delay * 2 ** (self._failures - 1), self.max_retry_delay)
+                self._retry_at = time.monotonic() + backoff
+                self._retry_or_dead_letter(failed, error)
+            else:
+                self._failures, self._retry_at = 0, 0.0
+            self.stats["written"] += len(documents) - len(failed)
+            self.stats["flushes"] += 1
+            return len(documents)
+
+    def _retry_or_dead_letter(self, documents, error):
+        retry = []
+        for document in documents:
+            attempts = self._attempts.pop(document["_id"], 0) + 1
+            if attempts < self.max_attempts and not self._closed:
+                self._attempts[document["_id"]] = attempts
+                retry.append(document)
+            else:
+                self._dead_letter(document, error, attempts)
+        if retry:
+            # Put back in front of newer documents; a retry that partly succeeded before is
+            # safe because already-stored _ids fail with a duplicate key error, which is skipped
+            with self._condition:
+                self._pending[:0] = retry
+            self.stats["retried"] += len(retry)
+
+    def _dead_letter(self, document, error, attempts):
+        logging.error(f"Write-behind document {document['_id']} dead-lettered after {attempts} attempt(s): {error}")
+        record = {"document": document, "error": error, "attempts": attempts, "failed_at": time.time()}
+        with open(self.dead_letter_path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record, default=str) + "\n")
+        self.stats["dead_lettered"] += 1
+
+    def close(self):
+        """
+        Write everything still buffered and stop the background thread.
+        """
+        with self._condition:
+            if self._closed:
+                return
+            self._closed = True
+            self._condition.notify()
+        self._thread.join(timeout=30)
+
+
+_buffers = {}
+
+
+def get_write_behind(database, collection, url=DASHBOARD_MONGO_URL):
+    """
+    The process-wide write-behind buffer for one collection.
+    """
+    key = (url, database, collection)
+    buffer = _buffers.get(key)
+    if buffer is None:
+        collection_handle = get_mongo_client(url)[database][collection]
+        with _clients_lock:
+            buffer = _buffers.get(key)
+            if buffer is None:
+                buffer = _buffers[key] = WriteBehindBuffer(collection_handle)
+    return buffer
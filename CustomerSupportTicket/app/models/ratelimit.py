@@ -0,0 +1,167 @@
+"""
+Token-bucket rate limiting for Gemini calls.
+
+Every Gemini request goes through one shared limiter with a requests-per-minute
+and a tokens-per-minute budget. By default the buckets live in process memory;
+set GEMINI_RATE_LIMIT_DB to a SQLite file path to share the same budget between
+all worker processes on a host.
+"""
+import os
+import sqlite3
+import threading
+import time
+from models.metrics import metrics
+
+GEMINI_RPM = int(os.environ.get("GEMINI_RPM", "60"))
+GEMINI_TPM = int(os.environ.get("GEMINI_TPM", "120000"))
+GEMINI_RATE_LIMIT_DB = os.environ.get("GEMINI_RATE_LIMIT_DB", "")
+
+rate_limit_wait = metrics.histogram(
+    "gemini_rate_limit_wait_seconds", "Time Gemini calls waited for the shared rate limit."
+)
+
+
+def estimate_tokens(text):
+    """
+    Rough token count for a prompt (about four characters per token).
+    """
+    return max(1, len(text) // 4)
+
+
+class TokenBucket:
+    """
+    A bucket holding up to `capacity` units, refilled continuously at `rate` units per second.
+    """
+
+    def __init__(self, capacity, rate, level=None, updated=None):
+        self.capacity = float(capacity)
+        self.rate = float(rate)
+        self.level = self.capacity if level is None else float(level)
+        self.updated = time.monotonic() if updated is None else updated
+
+    def refill(self, now):
+        elapsed = max(0.0, now - self.updated)
+        self.level = min(self.capacity, self.level + elapsed * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount):
+        """
+        Seconds until `amount` units are available (0 if they are available now).
+        """
+        # Requests larger than the whole bucket are let through once it is full
+        amount = min(amount, self.capacity)
+        if self.level >= amount:
+            return 0.0
+        return (amount - self.level) / self.rate
+
+
+class RateLimiter:
+    """
+    In-process limiter enforcing a requests-per-minute and a tokens-per-minute budget.
+    """
+
+    def __init__(self, requests_per_minute=GEMINI_RPM, tokens_per_minute=GEMINI_TPM):
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self._lock = threading.Lock()
+        self._requests = TokenBucket(requests_per_minute, requests_per_minute / 60.0)
+        self._tokens = TokenBucket(tokens_per_minute, tokens_per_minute / 60.0)
+
+    def reset(self):
+        """
+        Refill both budgets (e.g. between benchmark runs).
+        """
+        with self._lock:
+            self._requests = TokenBucket(self.requests_per_minute, self.requests_per_minute / 60.0)
+            self._tokens = TokenBucket(self.tokens_per_minute, self.tokens_per_minute / 60.0)
+
+    def _reserve(self, tokens):
+        with self._lock:
+            now = time.monotonic()
+            self._requests.refill(now)
+            self._tokens.refill(now)
+            wait = max(self._requests.wait_time(1), self._tokens.wait_time(tokens))
+            if wait == 0.0:
+                self._requests.level -= 1
+                self._tokens.level -= min(tokens, self._tokens.capacity)
+            return wait
+
+    def acquire(self, tokens=1):
+        """
+        Block until one request carrying `tokens` prompt tokens fits in both budgets.
+        Returns the number of seconds spent waiting.
+        """
+        waited = 0.0
+        while True:
+            wait = self._reserve(tokens)
+            if wait == 0.0:
+                rate_limit_wait.observe(waited)
+                return waited
+            time.sleep(wait)
+            waited += wait
+
+
+class SQLiteRateLimiter(RateLimiter):
+    """
+    Limiter whose bucket state lives in a SQLite file so several processes share one budget.
+    """
+
+    def __init__(self, path, requests_per_minute=GEMINI_RPM, tokens_per_minute=GEMINI_TPM, name="gemini"):
+        super().__init__(requests_per_minute, tokens_per_minute)
+        self.path = path
+        self.name = name
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS rate_buckets ("
+                "name TEXT PRIMARY KEY, requests REAL, tokens REAL, updated REAL)"
+            )
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=30, isolation_level=None)
+
+    def _reserve(self, tokens):
+        # Wall-clock time is shared between processes, monotonic time is not
+        now = time.time()
+        conn = self._connect()
+        try:
+            # BEGIN IMMEDIATE takes the write lock so read-modify-write is atomic across processes
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute(
+                "SELECT requests, tokens, updated FROM rate_buckets WHERE name = ?", (self.name,)
+            ).fetchone()
+            if row is None:
+                row = (self.requests_per_minute, self.tokens_per_minute, now)
+            requests = TokenBucket(self.requests_per_minute, self.requests_per_minute / 60.0, row[0], row[2])
+            token_bucket = TokenBucket(self.tokens_per_minute, self.tokens_per_minute / 60.0, row[1], row[2])
+            requests.refill(now)
+            token_bucket.refill(now)
+
+            wait = max(requests.wait_time(1), token_bucket.wait_time(tokens))
+            if wait == 0.0:
+                requests.level -= 1
+                token_bucket.level -= min(tokens, token_bucket.capacity)
+            conn.execute(
+                "INSERT OR REPLACE INTO rate_buckets (name, requests, tokens, updated) VALUES (?, ?, ?, ?)",
+                (self.name, requests.level, token_bucket.level, now),
+            )
+            conn.execute("COMMIT")
+            return wait
+        except Exception:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+
+def limiter_from_env():
+    """
+    Build the limiter described by GEMINI_RPM, GEMINI_TPM and GEMINI_RATE_LIMIT_DB.
+    """
+    if GEMINI_RATE_LIMIT_DB:
+        return SQLiteRateLimiter(GEMINI_RATE_LIMIT_DB)
+    return RateLimiter()
+
+
+# Shared by every Gemini call in this process
+gemini_limiter = limiter_from_env()
@@ -0,0 +1,148 @@
+"""
+Priority scheduling of outbound Gemini calls.
+
+Every generate/embed call from S.py, R.py and combined.py takes a slot from
+one scheduler, so at most LLM_MAX_CONCURRENCY calls are in flight per process.
+When all slots are busy, callers wait in one FIFO queue per priority class and
+a freed slot goes to the best waiting class:
+
+    escalated - tickets that escalate whatever their sentiment (keyword rule, no LLM needed)
+    standard  - other tickets from /process-ticket/ and the streaming endpoint
+    bulk      - tickets from the batch endpoint
+
+A waiter's class improves by one level for every LLM_AGING_SECONDS it has
+waited, so bulk work still progresses under a steady stream of escalations.
+LLM_RESERVED_SLOTS extra slots are only ever given to escalated calls, so an
+escalated ticket does not even wait for a routine call to finish.
+
+The class travels with the request in a context variable (set by appp.py and
+copied into worker threads), so the model functions need no extra argument.
+The Gemini rate limit is taken after the slot, so quota is also spent in
+priority order. While the Gemini circuit breaker is open, slot() fails at once
+with CircuitOpenError instead of queueing a call that would time out.
+"""
+import contextvars
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager, nullcontext
+
+from models.breakers import gemini_breaker
+from models.metrics import metrics
+from models.ratelimit import gemini_limiter
+
+LLM_MAX_CONCURRENCY = int(os.environ.get("LLM_MAX_CONCURRENCY", "16"))
+LLM_AGING_SECONDS = float(os.environ.get("LLM_AGING_SECONDS", "30"))
+LLM_RESERVED_SLOTS = int(os.environ.get("LLM_RESERVED_SLOTS", "2"))
+
+PRIORITY_CLASSES = ("escalated", "standard", "bulk")
+
+llm_priority = contextvars.ContextVar("llm_priority", default="standard")
+
+queue_wait = metrics.histogram(
+    "llm_queue_wait_seconds", "Time Gemini calls waited for a scheduler slot.", ["priority"]
+)
+
+
+class _Waiter:
+    __slots__ = ("event", "enqueued")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.enqueued = time.monotonic()
+
+
+class LLMScheduler:
+    """
+    Concurrency cap with per-class FIFO queues and aging.
+    """
+
+    def __init__(self, max_concurrency=LLM_MAX_CONCURRENCY, aging_seconds=LLM_AGING_SECONDS,
+                 reserved_slots=LLM_RESERVED_SLOTS, classes=PRIORITY_CLASSES, limiter=gemini_limiter,
+                 breaker=gemini_breaker):
+        self.max_concurrency = max_concurrency
+        self.aging_seconds = aging_seconds
+        self.reserved_slots = reserved_slots
+        self.limiter = limiter
+        self.breaker = breaker
+        self._top = classes[0]
+        self._rank = {name: rank for rank, name in enumerate(classes)}
+        self._queues = {name: deque() for name in classes}
+        self._lock = threading.Lock()
+        self.running = 0
+        self._granted = {name: 0 for name in classes}
+
+    def _acquire(self, priority_class):
+        with self._lock:
+            limit = self.max_concurrency + (self.reserved_slots if priority_class == self._top else 0)
+            if self.running < limit:
+                self.running += 1
+                self._granted[priority_class] += 1
+                return 0.0
+            waiter = _Waiter()
+            self._queues[priority_class].append(waiter)
+        waiter.event.wait()
+        return time.monotonic() - waiter.enqueued
+
+    def _release(self):
+        with self._lock:
+            now = time.monotonic()
+            # A slot above the cap is a reserved one and may only go to the top class
+            reserved = self.running > self.max_concurrency
+            best = None
+            for name, queue in self._queues.items():
+                if queue and (not reserved or name == self._top):
+                    score = self._rank[name] - (now - queue[0].enqueued) / self.aging_seconds
+                    if best is None or score < best[0]:
+                        best = (score, name)
+            if best is None:
+                self.running -= 1
+                return
+            waiter = self._queues[best[1]].popleft()
+            self._granted[best[1]] += 1
+        # The slot passes straight to the waiter, so `running` is unchanged
+        waiter.event.set()
+
+    @contextmanager
+    def slot(self, tokens=0, priority_class=None):
+        """
+        Hold one of the concurrency slots (and, with `tokens`, the Gemini rate limit)
+        for the enclosed call. The class defaults to the current llm_priority. An
+        exception from the call counts as a failure for the circuit breaker.
+        """
+        priority_class = priority_class or llm_priority.get()
+        if priority_class not in self._queues:
+            priority_class = "standard"
+        with self.breaker.guard() if self.breaker is not None else nullcontext():
+            queue_wait.observe(self._acquire(priority_class), priority=priority_class)
+            try:
+                if tokens and self.limiter is not None:
+                    self.limiter.acquire(tokens)
+                yield
+            finally:
+                self._release()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "max_concurrency": self.max_concurrency,
+                "reserved_slots": self.reserved_slots,
+                "aging_seconds": self.aging_seconds,
+                "running": self.running,
+                "queued": {name: len(queue) for name, queue in self._queues.items()},
+                "granted": dict(self._granted),
+            }
+
+
+def priority_context(priority_class):
+    """
+    A copy of the current context with llm_priority set, for running a stage in a worker thread.
+    """
+    context = contextvars.copy_context()
+    context.run(llm_priority.set, priority_class)
+    return context
+
+
+# Shared by every Gemini call in the API process
+llm_scheduler = LLMScheduler()
@@ -0,0 +1,184 @@
+"""
+Semantic cache of generated responses.
+
+During an outage many tickets for the same product describe the same issue in
+different words, so the exact-text result cache misses while the answer would
+be the same. Before generate_personalized_response runs, the issue embedding is
+compared with recently answered issues for the same product_name; if one lies
+within SEMANTIC_CACHE_MAX_DISTANCE (cosine distance, 1 - cosine similarity)
+its subject and body are reused and neither the vector search nor the
+generation call is made.
+
+The generated answer depends only on the product and the issue sentence, never
+on the customer, so reuse cannot leak one customer's details into another's
+reply unless the issue sentence carries them. Issue sentences that mention a
+number (order, account, invoice or tracking ids) are therefore neither looked
+up nor stored: "order 123 arrived damaged" must not be answered with the reply
+written for order 456.
+
+The cache is opt-in (SEMANTIC_CACHE_ENABLED=1). SEMANTIC_CACHE_MAX_DISTANCE
+0.08 means a cosine similarity of at least 0.92 between the two issue
+embeddings, which is meant to admit rewordings of one issue but not a
+different issue of the same product. It has not been calibrated on Gemini
+embeddings of production tickets, so replay real issues with
+benchmarks/bench_semantic_cache.py and read the reused pairs before enabling
+the cache or raising the threshold.
+
+Entries live in process memory, expire after SEMANTIC_CACHE_TTL seconds, are
+capped at SEMANTIC_CACHE_SIZE per product (oldest dropped first), and can be
+invalidated per product or entirely, e.g. once the outage is resolved and the
+stock answer is no longer right.
+"""
+import os
+import re
+import threading
+import time
+
+import numpy as np
+
+from models.cache import normalize_text
+
+SEMANTIC_CACHE_ENABLED = os.environ.get("SEMANTIC_CACHE_ENABLED", "0") == "1"
+# Cosine distance (1 - cosine similarity) within which an answered issue is reused
+SEMANTIC_CACHE_MAX_DISTANCE = float(os.environ.get("SEMANTIC_CACHE_MAX_DISTANCE", "0.08"))
+SEMANTIC_CACHE_TTL = float(os.environ.get("SEMANTIC_CACHE_TTL", "3600"))
+SEMANTIC_CACHE_SIZE = int(os.environ.get("SEMANTIC_CACHE_SIZE", "500"))
+# Rewrite a reused answer for the new ticket with a short Gemini call (R.personalize_response)
+SEMANTIC_CACHE_PERSONALIZE = os.environ.get("SEMANTIC_CACHE_PERSONALIZE", "0") != "0"
+
+_NUMBER = re.compile(r"\d+")
+
+
+class _ProductEntries:
+    """
+    Unit-normalized issue embeddings of one product as a matrix, with their answers.
+    """
+
+    def __init__(self, dimension):
+        self.vectors = np.empty((0, dimension), dtype=np.float32)
+        self.records = []  # (issue_sentence, subject, body, stored_at)
+
+    def expire(self, cutoff, max_entries):
+        keep = next((i for i, record in enumerate(self.records) if record[3] >= cutoff), len(self.records))
+        keep = max(keep, len(self.records) - max_entries)
+        if keep:
+            self.vectors = self.vectors[keep:]
+            self.records = self.records[keep:]
+        return keep
+
+
+class SemanticResponseCache:
+    """
+    Per-product nearest-neighbour lookup of previously generated (subject, body) pairs.
+    """
+
+    def __init__(self, max_distance=SEMANTIC_CACHE_MAX_DISTANCE, ttl=SEMANTIC_CACHE_TTL,
+                 max_entries=SEMANTIC_CACHE_SIZE, enabled=SEMANTIC_CACHE_ENABLED):
+        self.max_distance = max_distance
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.enabled = enabled
+        self._products = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.skipped = 0
+        self.invalidated = 0
+
+    @staticmethod
+    def _product_key(product_name):
+        return normalize_text(product_name or "unknown")
+
+    @staticmethod
+    def reusable(issue_sentence):
+        """
+        Whether an answer to this issue may be shared: False when it mentions an identifier.
+        """
+        return not _NUMBER.search(issue_sentence or "")
+
+    @staticmethod
+    def _unit(embedding):
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = float(np.linalg.norm(vector))
+        return vector / norm if norm else vector
+
+    def lookup(self, product_name, issue_sentence, embedding):
+        """
+        Return {"issue_sentence", "subject", "body", "distance"} for the closest answered
+        issue of this product within max_distance, or None.
+        """
+        if not self.enabled:
+            return None
+        if not self.reusable(issue_sentence):
+            with self._lock:
+                self.skipped += 1
+            return None
+        vector = self._unit(embedding)
+        with self._lock:
+            entries = self._products.get(self._product_key(product_name))
+            match = None
+            if entries is not None:
+                entries.expire(time.time() - self.ttl, self.max_entries)
+                if entries.records and entries.vectors.shape[1] == vector.shape[0]:
+                    similarities = entries.vectors @ vector
+                    best = int(np.argmax(similarities))
+                    distance = 1.0 - float(similarities[best])
+                    if distance <= self.max_distance:
+                        issue_sentence, subject, body, _ = entries.records[best]
+                        match = {"issue_sentence": issue_sentence, "subject": subject, "body": body,
+                                 "distance": distance}
+            if match is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return match
+
+    def store(self, product_name, issue_sentence, embedding, subject, body):
+        if not self.enabled or not self.reusable(issue_sentence):
+            return
+        vector = self._unit(embedding)
+        with self._lock:
+            key = self._product_key(product_name)
+            entries = self._products.get(key)
+            if entries is None or entries.vectors.shape[1] != vector.shape[0]:
+                entries = self._products[key] = _ProductEntries(vector.shape[0])
+            entries.vectors = np.vstack([entries.vectors, vector[None, :]])
+            entries.records.append((issue_sentence, subject, body, time.time()))
+            entries.expire(time.time() - self.ttl, self.max_entries)
+
+    def invalidate(self, product_name=None):
+        """
+        Drop the entries of one product (or of every product). Returns how many were removed.
+        """
+        with self._lock:
+            if product_name is None:
+                removed = sum(len(entries.records) for entries in self._products.values())
+                self._products.clear()
+            else:
+                entries = self._products.pop(self._product_key(product_name), None)
+                removed = len(entries.records) if entries is not None else 0
+            self.invalidated += removed
+        return removed
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "enabled": self.enabled,
+                "max_distance": self.max_distance,
+                "ttl": self.ttl,
+                "products": len(self._products),
+                "entries": sum(len(entries.records) for entries in self._products.values()),
+                "hits": self.hits,
+                "misses": self.misses,
+                # Lookups not attempted because the issue mentions an identifier
+                "skipped": self.skipped,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                # Each hit skips one vector search and one generation call
+                "generations_avoided": self.hits,
+                "invalidated": self.invalidated,
+            }
+
+
+# Shared by R.py and appp.py
+semantic_cache = SemanticResponseCache()
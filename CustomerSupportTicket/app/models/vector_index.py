@@ -0,0 +1,306 @@
+"""
+Local, in-process vector index that stands in for the hosted Pinecone
+`support-tickets` index.
+
+Vectors are L2-normalized float32 rows, so cosine similarity is one matrix
+product. Small corpora are searched exactly; once an IVF (inverted file) layout
+has been trained, large corpora are searched approximately by scanning only the
+`nprobe` clusters whose centroids are closest to the query.
+
+The exact scan grows linearly with the corpus; IVF stays under a millisecond.
+On 768-dimensional clustered vectors (benchmarks/bench_vector_index.py, top 3):
+
+    vectors   exact p50   IVF p50 (nprobe 8)   IVF recall@3
+     5,000     1.2 ms        0.2 ms               1.0
+    10,000     3.8 ms        0.4 ms               1.0
+    50,000    16.5 ms        0.6 ms               1.0
+
+IVF is therefore the default from IVF_MIN_VECTORS vectors up: the index builder
+trains it after a build, and open() trains it in memory when a saved index of
+that size has none (e.g. one saved by an interrupted build).
+
+An index is a directory holding:
+    vectors.npy     - float32 (count, dim), opened memory-mapped on load
+    records.jsonl   - one {"id", "metadata"} object per row
+    ivf.npz         - optional IVF centroids and row assignments
+
+query() and upsert() take and return the same shapes as the Pinecone client,
+so R.py works unchanged against either (RETRIEVAL_BACKEND in models/clients.py).
+"""
+import json
+import logging
+import os
+import threading
+
+import numpy as np
+
+MODELS_DIR = os.path.dirname(os.path.abspath(__file__))
+
+LOCAL_INDEX_PATH = os.environ.get("LOCAL_INDEX_PATH", os.path.join(MODELS_DIR, "support_tickets_index"))
+# Corpora smaller than this are always searched exactly
+IVF_MIN_VECTORS = int(os.environ.get("IVF_MIN_VECTORS", "10000"))
+IVF_NPROBE = int(os.environ.get("IVF_NPROBE", "8"))
+
+
+def _normalize_rows(vectors):
+    vectors = np.asarray(vectors, dtype=np.float32)
+    if vectors.ndim == 1:
+        vectors = vectors[None, :]
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+def _top_k(scores, k):
+    """
+    Positions of the k largest scores, best first.
+    """
+    k = min(k, len(scores))
+    if k <= 0:
+        return np.empty(0, dtype=np.int64)
+    top = np.argpartition(-scores, k - 1)[:k]
+    return top[np.argsort(-scores[top])]
+
+
+def _spherical_kmeans(vectors, nlist, iterations, seed):
+    """
+    k-means on unit vectors using cosine similarity; returns (centroids, assignments).
+    """
+    rng = np.random.default_rng(seed)
+    centroids = vectors[rng.choice(len(vectors), size=nlist, replace=False)].copy()
+    for _ in range(iterations):
+        assignments = (vectors @ centroids.T).argmax(axis=1)
+        for cluster in range(nlist):
+            members = vectors[assignments == cluster]
+            if len(members):
+                centroids[cluster] = members.sum(axis=0)
+            else:
+                # Re-seed empty clusters so every list stays useful
+                centroids[cluster] = vectors[rng.integers(len(vectors))]
+        centroids = _normalize_rows(centroids)
+    return centroids, (vectors @ centroids.T).argmax(axis=1)
+
+
+class LocalVectorIndex:
+    """
+    Cosine-similarity index with exact and IVF search, persisted as a directory.
+    """
+
+    def __init__(self, dimension=None):
+        self.dimension = dimension
+        # Rows are appended into `_store`, which grows geometrically; `_vectors` is its filled part
+        self._store = np.empty((0, dimension or 0), dtype=np.float32)
+        self._vectors = self._store
+        self._ids = []
+        self._metadata = []
+        self._rows = {}
+        self._centroids = None
+        self._assignments = None
+        self._lists = None
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._ids)
+
+    # Writes
+
+    def upsert(self, vectors, namespace=""):
+        """
+        Insert or replace vectors given as (id, values[, metadata]) tuples or
+        {"id", "values", "metadata"} dicts, as accepted by Pinecone's Index.upsert.
+        """
+        ids, values, metadata = [], [], []
+        for item in vectors:
+            if isinstance(item, dict):
+                ids.append(str(item["id"]))
+                values.append(item["values"])
+                metadata.append(item.get("metadata") or {})
+            else:
+                ids.append(str(item[0]))
+                values.append(item[1])
+                metadata.append(item[2] if len(item) > 2 else {})
+        if not ids:
+            return {"upserted_count": 0}
+
+        # Pinecone keeps the last write when a batch repeats an id
+        last = {vector_id: position for position, vector_id in enumerate(ids)}
+        keep = sorted(last.values())
+        upserted = len(ids)
+        ids, metadata = [ids[position] for position in keep], [metadata[position] for position in keep]
+        rows = _normalize_rows([values[position] for position in keep])
+        with self._lock:
+            if self.dimension is None or len(self._ids) == 0:
+                self.dimension = rows.shape[1]
+                self._store = self._store.reshape(0, self.dimension)
+                self._vectors = self._store
+            if rows.shape[1] != self.dimension:
+                raise ValueError(f"Vector dimension {rows.shape[1]} does not match index dimension {self.dimension}")
+
+            existing = [(position, self._rows[vector_id]) for position, vector_id in enumerate(ids)
+                        if vector_id in self._rows]
+            new_rows = [position for position, vector_id in enumerate(ids) if vector_id not in self._rows]
+            count = len(self._ids)
+            self._reserve(count + len(new_rows))
+
+            for position, row in existing:
+                self._vectors[row] = rows[position]
+                self._metadata[row] = metadata[position]
+            if self._assignments is not None and existing:
+                positions = [position for position, _ in existing]
+                self._assignments[[row for _, row in existing]] = self._nearest_list(rows[positions])
+                self._lists = None
+
+            if new_rows:
+                self._store[count:count + len(new_rows)] = rows[new_rows]
+                if self._assignments is not None:
+                    self._assignments = np.concatenate([self._assignments, self._nearest_list(rows[new_rows])])
+                    self._lists = None
+                self._vectors = self._store[:count + len(new_rows)]
+                # Row numbers are only published once the vectors are in place
+                self._ids.extend(ids[position] for position in new_rows)
+                self._metadata.extend(metadata[position] for position in new_rows)
+                for offset, position in enumerate(new_rows):
+                    self._rows[ids[position]] = count + offset
+        return {"upserted_count": upserted}
+
+    def _reserve(self, count):
+        """
+        Make room for `count` rows, doubling the capacity so a full build copies
+        each vector a constant number of times. Called with the lock held.
+        """
+        # A memory-mapped (read-only) matrix is copied into memory on the first write
+        if len(self._store) >= count and self._store.flags.writeable:
+            return
+        capacity = max(count, 2 * len(self._store), 1024)
+        store = np.empty((capacity, self.dimension), dtype=np.float32)
+        store[:len(self._ids)] = self._vectors
+        self._store = store
+        self._vectors = store[:len(self._ids)]
+
+    # IVF
+
+    def train_ivf(self, nlist=None, iterations=10, seed=0, sample_size=100000):
+        """
+        Cluster the stored vectors into `nlist` lists (default ~4*sqrt(count)) for approximate search.
+        Vectors upserted afterwards are assigned to their nearest existing list.
+        """
+        count = len(self)
+        if count == 0:
+            raise ValueError("Cannot train IVF on an empty index")
+        nlist = min(nlist or max(1, int(4 * np.sqrt(count))), count)
+        vectors = np.asarray(self._vectors)
+        sample = vectors
+        if count > sample_size:
+            sample = vectors[np.random.default_rng(seed).choice(count, size=sample_size, replace=False)]
+        centroids, _ = _spherical_kmeans(sample, nlist, iterations, seed)
+        with self._lock:
+            self._centroids = centroids
+            self._assignments = self._nearest_list(vectors)
+            self._lists = None
+
+    def _nearest_list(self, rows):
+        return (rows @ self._centroids.T).argmax(axis=1)
+
+    def _inverted_lists(self):
+        if self._lists is None:
+            order = np.argsort(self._assignments, kind="stable")
+            bounds = np.searchsorted(self._assignments[order], np.arange(len(self._centroids) + 1))
+            self._lists = [order[bounds[i]:bounds[i + 1]] for i in range(len(self._centroids))]
+        return self._lists
+
+    # Reads
+
+    def query(self, vector, top_k=10, include_metadata=False, include_values=False,
+              namespace="", nprobe=None, exact=None):
+        """
+        Return {"matches": [{"id", "score"[, "metadata"][, "values"]}], "namespace"} best first.
+        `exact` forces (True) or disables (False) the exhaustive scan; by default IVF is used
+        when it has been trained and the index holds at least IVF_MIN_VECTORS vectors.
+        """
+        if len(self) == 0:
+            return {"matches": [], "namespace": namespace}
+        query = _normalize_rows(vector)[0]
+        with self._lock:
+            vectors = self._vectors
+            use_ivf = self._centroids is not None and (
+                not exact if exact is not None else len(self) >= IVF_MIN_VECTORS
+            )
+            if use_ivf:
+                lists = self._inverted_lists()
+                probes = _top_k(self._centroids @ query, nprobe or IVF_NPROBE)
+                candidates = np.concatenate([lists[probe] for probe in probes])
+                scores = vectors[candidates] @ query
+                rows = candidates[_top_k(scores, top_k)]
+            else:
+                scores = vectors @ query
+                rows = _top_k(scores, top_k)
+            row_scores = vectors[rows] @ query
+
+            matches = []
+            for row, score in zip(rows.tolist(), row_scores.tolist()):
+                match = {"id": self._ids[row], "score": score}
+                if include_metadata:
+                    match["metadata"] = self._metadata[row]
+                if include_values:
+                    match["values"] = vectors[row].tolist()
+                matches.append(match)
+        return {"matches": matches, "namespace": namespace}
+
+    def describe_index_stats(self):
+        return {
+            "dimension": self.dimension,
+            "total_vector_count": len(self),
+            "ivf_lists": len(self._centroids) if self._centroids is not None else 0,
+        }
+
+    # Persistence
+
+    def save(self, path=LOCAL_INDEX_PATH):
+        os.makedirs(path, exist_ok=True)
+        with self._lock:
+            # Write beside the live files and rename, so a crash never leaves a half-written index
+            np.save(os.path.join(path, "vectors.tmp.npy"), np.asarray(self._vectors))
+            with open(os.path.join(path, "records.jsonl.tmp"), "w", encoding="utf-8") as f:
+                for vector_id, metadata in zip(self._ids, self._metadata):
+                    f.write(json.dumps({"id": vector_id, "metadata": metadata}) + "\n")
+            if self._centroids is not None:
+                np.savez(os.path.join(path, "ivf.tmp.npz"), centroids=self._centroids, assignments=self._assignments)
+            os.replace(os.path.join(path, "vectors.tmp.npy"), os.path.join(path, "vectors.npy"))
+            os.replace(os.path.join(path, "records.jsonl.tmp"), os.path.join(path, "records.jsonl"))
+            if self._centroids is not None:
+                os.replace(os.path.join(path, "ivf.tmp.npz"), os.path.join(path, "ivf.npz"))
+            elif os.path.exists(os.path.join(path, "ivf.npz")):
+                os.remove(os.path.join(path, "ivf.npz"))
+
+    @classmethod
+    def load(cls, path=LOCAL_INDEX_PATH, mmap=True):
+        vectors = np.load(os.path.join(path, "vectors.npy"), mmap_mode="r" if mmap else None)
+        index = cls(dimension=vectors.shape[1])
+        index._store = index._vectors = vectors
+        with open(os.path.join(path, "records.jsonl"), encoding="utf-8") as f:
+            for row, line in enumerate(f):
+                record = json.loads(line)
+                index._ids.append(record["id"])
+                index._metadata.append(record["metadata"])
+                index._rows[record["id"]] = row
+        ivf_path = os.path.join(path, "ivf.npz")
+        if os.path.exists(ivf_path):
+            with np.load(ivf_path) as ivf:
+                index._centroids = ivf["centroids"]
+                index._assignments = ivf["assignments"]
+        return index
+
+    @classmethod
+    def open(cls, path=LOCAL_INDEX_PATH):
+        """
+        Load the index at `path`, or start an empty one there if none has been saved yet.
+        An index of at least IVF_MIN_VECTORS vectors saved without IVF is trained on load.
+        """
+        if not os.path.exists(os.path.join(path, "vectors.npy")):
+            return cls()
+        index = cls.load(path)
+        if index._centroids is None and len(index) >= IVF_MIN_VECTORS:
+            logging.warning(f"Local index at {path} has {len(index)} vectors but no IVF; training it in memory. "
+                            "Rebuild with models/index_builder.py to save it.")
+            index.train_ivf()
+        return index
@@ -0,0 +1,232 @@
+"""
+Background delivery of outbound webhooks (Zapier).
+
+Callers enqueue a payload and return immediately; the ticket is never held up
+by, or failed because of, the webhook. Payloads are sent from a background
+thread running its own event loop, on one pooled keep-alive httpx client with
+timeouts. Failed sends are retried with exponential backoff and jitter; a
+payload that still fails (or is rejected with a 4xx) is appended to a
+dead-letter JSONL file for later replay. While the Zapier circuit breaker is
+open, payloads stay queued instead of spending their attempts on a service
+that is down.
+
+The dispatcher starts on first use and drains its queue at interpreter exit,
+so the FastAPI app and the Streamlit dashboard use it the same way.
+"""
+import asyncio
+import atexit
+import json
+import logging
+import os
+import random
+import threading
+import time
+from models.metrics import track_stage
+from models.breakers import zapier_breaker, degraded_paths
+
+WEBHOOK_TIMEOUT_SECONDS = float(os.environ.get("WEBHOOK_TIMEOUT_SECONDS", "10"))
+WEBHOOK_WORKERS = int(os.environ.get("WEBHOOK_WORKERS", "8"))
+WEBHOOK_QUEUE_SIZE = int(os.environ.get("WEBHOOK_QUEUE_SIZE", "10000"))
+WEBHOOK_MAX_ATTEMPTS = int(os.environ.get("WEBHOOK_MAX_ATTEMPTS", "5"))
+WEBHOOK_BACKOFF_SECONDS = float(os.environ.get("WEBHOOK_BACKOFF_SECONDS", "0.5"))
+WEBHOOK_BACKOFF_MAX_SECONDS = float(os.environ.get("WEBHOOK_BACKOFF_MAX_SECONDS", "30"))
+WEBHOOK_DEAD_LETTER_PATH = os.environ.get("WEBHOOK_DEAD_LETTER_PATH", "webhook_dead_letters.jsonl")
+# How long shutdown waits for queued webhooks to go out
+WEBHOOK_DRAIN_SECONDS = float(os.environ.get("WEBHOOK_DRAIN_SECONDS", "10"))
+
+
+class WebhookDispatcher:
+    """
+    Queue of webhook payloads delivered by worker coroutines on a background event loop.
+    """
+
+    def __init__(self, workers=WEBHOOK_WORKERS, max_queue=WEBHOOK_QUEUE_SIZE, max_attempts=WEBHOOK_MAX_ATTEMPTS,
+                 dead_letter_path=WEBHOOK_DEAD_LETTER_PATH, client_factory=None, breaker=zapier_breaker):
+        self.workers = workers
+        self.max_queue = max_queue
+        self.max_attempts = max_attempts
+        self.dead_letter_path = dead_letter_path
+        self._client_factory = client_factory or self._build_client
+        self.breaker = breaker
+        self._lock = threading.Lock()
+        self._dead_letter_lock = threading.Lock()
+        self._loop = None
+        self._thread = None
+        self._queue = None
+        self._client = None
+        self._workers = []
+        self._ready = threading.Event()
+        self._stats = {"enqueued": 0, "queued": 0, "in_flight": 0, "held": 0, "delivered": 0, "retried": 0,
+                       "dead_lettered": 0}
+        self._atexit_registered = False
+
+    def _build_client(self):
+        import httpx
+
+        return httpx.AsyncClient(
+            timeout=httpx.Timeout(WEBHOOK_TIMEOUT_SECONDS),
+            limits=httpx.Limits(max_connections=self.workers, max_keepalive_connections=self.workers),
+        )
+
+    def _count(self, counter, amount=1):
+        with self._lock:
+            self._stats[counter] += amount
+
+    # Lifecycle
+
+    def start(self):
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, name="webhook-dispatcher", daemon=True)
+            self._thread.start()
+        self._ready.wait()
+        if not self._atexit_registered:
+            atexit.register(self.stop)
+            self._atexit_registered = True
+
+    def _run(self):
+        self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self._loop)
+        # Bounded by the "queued" counter in enqueue(), so producers never wait on the loop
+        self._queue = asyncio.Queue()
+        self._client = self._client_factory()
+        self._workers = [self._loop.create_task(self._worker()) for _ in range(self.workers)]
+        self._ready.set()
+        self._loop.run_forever()
+
+    def stop(self, timeout=WEBHOOK_DRAIN_SECONDS):
+        """
+        Wait up to `timeout` seconds for queued webhooks to be sent, then stop the loop.
+        Anything still queued is written to the dead-letter file.
+        """
+        if self._thread is None:
+            return
+        loop = self._loop
+
+        async def drain():
+            try:
+                await asyncio.wait_for(self._queue.join(), timeout)
+            except asyncio.TimeoutError:
+                while not self._queue.empty():
+                    url, payload = self._queue.get_nowait()
+                    self._count("queued", -1)
+                    self._dead_letter(url, payload, "not sent before shutdown", 0)
+            for task in self._workers:
+                task.cancel()
+            await asyncio.gather(*self._workers, return_exceptions=True)
+            await self._client.aclose()
+
+        try:
+            asyncio.run_coroutine_threadsafe(drain(), loop).result(timeout + 5)
+        except Exception as e:
+            logging.error(f"Webhook dispatcher did not shut down cleanly: {e}")
+        loop.call_soon_threadsafe(loop.stop)
+        self._thread.join(timeout=5)
+        with self._lock:
+            self._thread = None
+            self._ready.clear()
+
+    # Sending
+
+    def enqueue(self, url, payload):
+        """
+        Queue `payload` to be POSTed to `url` as JSON. Never blocks; returns False (and
+        dead-letters the payload) only if the queue is full.
+        """
+        self.start()
+        with self._lock:
+            accepted = self._stats["queued"] < self.max_queue
+            if accepted:
+                self._stats["queued"] += 1
+                self._stats["enqueued"] += 1
+        if not accepted:
+            self._dead_letter(url, payload, "webhook queue full", 0)
+            return False
+        # asyncio.Queue is not thread-safe, so the put itself runs on the dispatcher loop
+        self._loop.call_soon_threadsafe(self._queue.put_nowait, (url, payload))
+        return True
+
+    async def _worker(self):
+        while True:
+            url, payload = await self._queue.get()
+            with self._lock:
+                self._stats["queued"] -= 1
+                self._stats["in_flight"] += 1
+            try:
+                await self._deliver(url, payload)
+            except asyncio.CancelledError:
+                self._dead_letter(url, payload, "still retrying at shutdown", 0)
+                raise
+            except Exception as e:
+                self._dead_letter(url, payload, f"unexpected error: {e}", 0)
+            finally:
+                self._count("in_flight", -1)
+                self._queue.task_done()
+
+    async def _wait_for_circuit(self):
+        """
+        Hold the payload (without using up an attempt) until the breaker lets a call through.
+        """
+        if self.breaker.retry_after() == 0 and self.breaker.allow():
+            return
+        degraded_paths.inc(path="webhook_held")
+        self._count("held")
+        try:
+            while True:
+                await asyncio.sleep(max(self.breaker.retry_after(), 1.0))
+                if self.breaker.allow():
+                    return
+        finally:
+            self._count("held", -1)
+
+    async def _deliver(self, url, payload):
+        error = None
+        for attempt in range(1, self.max_attempts + 1):
+            await self._wait_for_circuit()
+            try:
+                with track_stage("zapier_delivery"):
+                    response = await self._client.post(url, json=payload)
+            except asyncio.CancelledError:
+                self.breaker.abandon()
+                raise
+            except Exception as e:
+                self.breaker.record_failure(e)
+                error = f"{type(e).__name__}: {e}"
+            else:
+                if response.status_code < 300:
+                    self.breaker.record_success()
+                    self._count("delivered")
+                    return
+                error = f"HTTP {response.status_code}: {response.text[:200]}"
+                # Client errors other than throttling will not succeed on retry (and mean Zapier is up)
+                if 400 <= response.status_code < 500 and response.status_code != 429:
+                    self.breaker.record_success()
+                    break
+                self.breaker.record_failure(error)
+            if attempt < self.max_attempts:
+                self._count("retried")
+                delay = min(WEBHOOK_BACKOFF_SECONDS * 2 ** (attempt - 1), WEBHOOK_BACKOFF_MAX_SECONDS)
+                await asyncio.sleep(delay * random.uniform(0.5, 1.0))
+        self._dead_letter(url, payload, error, attempt)
+
+    def _dead_letter(self, url, payload, error, attempts):
+        logging.error(f"Webhook to {url} dead-lettered after {attempts} attempt(s): {error}")
+        record = {"url": url, "payload": payload, "error": error, "attempts": attempts, "failed_at": time.time()}
+        with self._dead_letter_lock:
+            with open(self.dead_letter_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(record, default=str) + "\n")
+        self._count("dead_lettered")
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+        stats["queue_depth"] = stats.pop("queued")
+        stats["running"] = self._thread is not None
+        return stats
+
+
+# Shared by appp.py and the dashboard
+webhook_dispatcher = WebhookDispatcher()
@@ -0,0 +1,58 @@
+"""
+Shared setup for the unit tests: run from the app directory with `python -m pytest`.
+
+The model modules read their settings at import time, so the environment is
+fixed here before any of them is imported: no caches, no local sentiment model,
+no dedup window, and every file the app writes goes to a temporary directory.
+Gemini, the vector index, MongoDB and Zapier are replaced by the in-process
+fakes from benchmarks/fakes.py, so no test touches the network.
+"""
+import os
+import sys
+import tempfile
+
+import pytest
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, APP_DIR)
+
+_TMP = tempfile.mkdtemp(prefix="ticket-tests-")
+os.environ.update({
+    "RESULT_CACHE_BACKEND": "none",
+    "EMBEDDING_CACHE_ENABLED": "0",
+    "EMBEDDING_CACHE_PATH": os.path.join(_TMP, "embeddings.sqlite3"),
+    "SEMANTIC_CACHE_ENABLED": "0",
+    "LOCAL_SENTIMENT_ENABLED": "0",
+    "DEDUP_ENABLED": "0",
+    "DEDUP_INDEX_PATH": "",
+    "GEMINI_RPM": "1000000",
+    "GEMINI_TPM": "1000000000",
+    "WEBHOOK_DEAD_LETTER_PATH": os.path.join(_TMP, "webhook_dead_letters.jsonl"),
+    "WEBHOOK_DRAIN_SECONDS": "1",
+    "MONGO_DEAD_LETTER_PATH": os.path.join(_TMP, "mongo_dead_letters.jsonl"),
+})
+
+
+@pytest.fixture
+def app_client(monkeypatch):
+    """
+    A TestClient for appp.app backed by fakes. Yields (client, collection, sent
+    webhook payloads).
+    """
+    from fastapi.testclient import TestClient
+    from benchmarks import fakes
+
+    fakes.install(fakes.Latency(0), fakes.Latency(0), fakes.Latency(0))
+    import appp
+    from models.breakers import breakers
+
+    for breaker in breakers.values():
+        breaker.reset()
+    sent = []
+    monkeypatch.setattr(appp, "send_to_zapier", sent.append)
+    with TestClient(appp.app) as client:
+        collection = fakes.FakeCollection(fakes.Latency(0))
+        appp.app.collection = collection
+        yield client, collection, sent
+    for breaker in breakers.values():
+        breaker.reset()
@@ -0,0 +1,60 @@
+import json
+
+
+def ticket(i):
+    return {"subject": f"Ticket {i}", "body": f"My order {i} has a problem", "customer_email": f"user{i}@example.com"}
+
+
+def lines(response):
+    return [json.loads(line) for line in response.text.splitlines()]
+
+
+def test_results_errors_and_summary(app_client):
+    client, collection, sent = app_client
+    response = client.post("/process-tickets/batch", params={"concurrency": 3},
+                           json=[ticket(i) for i in range(5)] + [{"subject": "missing fields"}])
+    assert response.status_code == 200
+    *results, summary = lines(response)
+    assert summary == {"status": "done", "received": 6, "succeeded": 5, "failed": 1, "inserted": 5}
+    assert sorted(result["index"] for result in results) == list(range(6))
+    error = next(result for result in results if result["status"] == "error")
+    assert error["index"] == 5 and "customer_email" in error["detail"]
+    stored = {str(document["_id"]) for document in collection.documents}
+    assert stored == {result["ticket_id"] for result in results if result["status"] == "success"}
+    assert sorted(payload["To"] for payload in sent) == [f"user{i}@example.com" for i in range(5)]
+
+
+def test_ndjson_with_malformed_line_keeps_earlier_tickets(app_client):
+    client, collection, sent = app_client
+    body = "\n".join(json.dumps(ticket(i)) for i in range(3)) + "\n{not json\n" + json.dumps(ticket(9))
+    response = client.post("/process-tickets/batch", content=body,
+                           headers={"content-type": "application/x-ndjson"})
+    assert response.status_code == 200
+    summary = lines(response)[-1]
+    assert summary["status"] == "error" and "Invalid batch payload" in summary["detail"]
+    assert summary["received"] == summary["inserted"] == 3
+    assert len(collection.documents) == len(sent) == 3
+
+
+def test_failed_insert_reports_ids_and_sends_no_webhooks(app_client):
+    client, collection, sent = app_client
+
+    async def insert_many(documents, ordered=True):
+        raise ConnectionError("mongo down")
+
+    collection.insert_many = insert_many
+    response = client.post("/process-tickets/batch", json=[ticket(i) for i in range(2)])
+    *results, error, summary = lines(response)
+    assert error["status"] == "error" and "mongo down" in error["detail"]
+    assert sorted(error["ticket_ids"]) == sorted(result["ticket_id"] for result in results)
+    assert summary["inserted"] == 0
+    assert sent == []
+
+
+def test_invalid_payloads(app_client):
+    client, _, _ = app_client
+    assert client.post("/process-tickets/batch", json={"not": "a list"}).status_code == 400
+    assert client.post("/process-tickets/batch", content="{bad",
+                       headers={"content-type": "application/x-ndjson"}).status_code == 400
+    empty = client.post("/process-tickets/batch", json=[])
+    assert lines(empty) == [{"status": "done", "received": 0, "succeeded": 0, "failed": 0, "inserted": 0}]
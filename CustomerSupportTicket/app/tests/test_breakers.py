@@ -0,0 +1,83 @@
+import pytest
+
+from models import breakers as breakers_module
+from models.breakers import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitOpenError
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(breakers_module.time, "monotonic", clock)
+    return clock
+
+
+def fail(breaker, times=1):
+    for _ in range(times):
+        with pytest.raises(RuntimeError):
+            with breaker.guard():
+                raise RuntimeError("down")
+
+
+def test_opens_after_consecutive_failures(clock):
+    breaker = CircuitBreaker("test", failure_threshold=3, recovery_seconds=10)
+    fail(breaker, 2)
+    with breaker.guard():
+        pass  # a success resets the count
+    fail(breaker, 2)
+    assert breaker.state == CLOSED
+    fail(breaker)
+    assert breaker.state == OPEN
+    assert breaker.stats()["last_error"] == "RuntimeError: down"
+
+
+def test_open_circuit_fails_fast(clock):
+    breaker = CircuitBreaker("test", failure_threshold=1, recovery_seconds=10)
+    fail(breaker)
+    clock.now += 4
+    with pytest.raises(CircuitOpenError) as raised:
+        with breaker.guard():
+            pytest.fail("dependency called while the circuit is open")
+    assert raised.value.retry_after == pytest.approx(6)
+    assert breaker.stats()["rejected"] == 1
+
+
+def test_half_open_trial_closes_or_reopens(clock):
+    breaker = CircuitBreaker("test", failure_threshold=1, recovery_seconds=10, half_open_calls=1)
+    fail(breaker)
+    clock.now += 10
+    assert breaker.allow()
+    assert breaker.state == HALF_OPEN
+    assert not breaker.allow()  # only one trial at a time
+    breaker.record_failure("still down")
+    assert breaker.state == OPEN and breaker.opened == 2
+
+    clock.now += 10
+    with breaker.guard():
+        pass
+    assert breaker.state == CLOSED
+    assert breaker.retry_after() == 0.0
+
+
+def test_cancelled_trial_is_released(clock):
+    breaker = CircuitBreaker("test", failure_threshold=1, recovery_seconds=1)
+    fail(breaker)
+    clock.now += 1
+    with pytest.raises(KeyboardInterrupt):
+        with breaker.guard():
+            raise KeyboardInterrupt
+    assert breaker.state == HALF_OPEN
+    assert breaker.allow()
+
+
+def test_settings_can_be_overridden_per_dependency(monkeypatch):
+    monkeypatch.setenv("BREAKER_PINECONE_FAILURE_THRESHOLD", "2")
+    assert CircuitBreaker("pinecone").failure_threshold == 2
+    assert CircuitBreaker("pinecone", failure_threshold=7).failure_threshold == 7
@@ -0,0 +1,78 @@
+import pytest
+
+from models.cache import MemoryBackend, cache_key, result_cache
+
+
+@pytest.fixture
+def memory_cache(monkeypatch):
+    monkeypatch.setattr(result_cache, "backend", MemoryBackend())
+    monkeypatch.setattr(result_cache, "_stats", {})
+    return result_cache
+
+
+def gemini_calls():
+    from models.clients import registry
+
+    return registry.gemini_model().calls
+
+
+def test_keys_ignore_reply_prefixes_case_and_whitespace():
+    assert cache_key("sentiment", "v1", "Re: Fwd:  Order LATE", "where\nis it") == \
+        cache_key("sentiment", "v1", "order late", "Where is it")
+    assert cache_key("sentiment", "v1", "order late", "") != cache_key("sentiment", "v2", "order late", "")
+
+
+def test_memory_backend_evicts_least_recently_used():
+    backend = MemoryBackend(max_entries=2)
+    backend.set("a", 1)
+    backend.set("b", 2)
+    backend.get("a")
+    backend.set("c", 3)
+    assert backend.get("b") == (False, None)
+    assert backend.get("a") == (True, 1) and len(backend) == 2
+
+
+def test_local_sentiment_is_neither_cached_nor_counted(app_client, memory_cache, monkeypatch):
+    from models import S
+
+    monkeypatch.setattr(S, "classify_locally", lambda title, body: ("negative", 0.99))
+    before = gemini_calls()
+    for _ in range(2):
+        assert S.analyze_sentiment("Refund", "Where is my refund?")["sentiment"] == "negative"
+    assert gemini_calls() == before
+    assert len(memory_cache.backend) == 0
+    assert memory_cache.stats()["llm_calls_saved"] == 0
+
+
+def test_gemini_sentiment_hit_saves_one_call(app_client, memory_cache):
+    from models.S import analyze_sentiment
+
+    before = gemini_calls()
+    first = analyze_sentiment("Refund", "Where is my refund?")
+    assert analyze_sentiment("Re: refund", "Where is my  refund?") == first
+    assert gemini_calls() == before + 1
+    assert memory_cache.stats()["stages"]["sentiment"] == {"hits": 1, "misses": 1, "llm_calls_saved": 1}
+
+
+def test_batch_skips_the_cache_for_local_results(app_client, memory_cache, monkeypatch):
+    from models import S
+
+    monkeypatch.setattr(S, "classify_locally", lambda title, body: ("positive", 0.99) if title == "Thanks" else None)
+    results = S.analyze_sentiment_batch([("Thanks", "All good"), ("Refund", "Where is my refund?")])
+    assert results[0]["sentiment"] == "positive" and results[1] is not None
+    assert len(memory_cache.backend) == 1
+    assert S.analyze_sentiment("Refund", "Where is my refund?") == results[1]
+    assert memory_cache.stats()["stages"]["sentiment"]["llm_calls_saved"] == 1
+
+
+def test_response_hits_count_the_calls_each_path_avoids(app_client, memory_cache):
+    from models.combined import analyze_and_respond
+    from models.R import RESPONSE_LLM_CALLS, automate_response
+
+    response = automate_response("Broken charger", "My charger stopped working")
+    assert automate_response("Broken charger", "My charger stopped working") == response
+    assert memory_cache.stats()["stages"]["response"]["llm_calls_saved"] == RESPONSE_LLM_CALLS
+
+    _, combined = analyze_and_respond("Broken charger", "My charger stopped working")
+    assert combined == response
+    assert memory_cache.stats()["stages"]["response"]["llm_calls_saved"] == 2 * RESPONSE_LLM_CALLS - 1
@@ -0,0 +1,59 @@
+from types import SimpleNamespace
+
+import pytest
+
+from models.combined import analyze_and_respond, parse_combined_analysis
+
+
+@pytest.fixture
+def model(app_client):
+    from models.clients import registry
+
+    return registry.gemini_model()
+
+
+def test_parse_validates_the_sentiment_and_fills_defaults():
+    analysis = parse_combined_analysis('```json\n{"sentiment_type": "negative", "thoughts": "upset"}\n```')
+    assert analysis == {"sentiment": "negative", "thoughts": "upset", "product_name": "Unknown",
+                        "issue_sentence": "Unknown"}
+    for text in ("not json", "[]", '{"sentiment_type": "angry"}'):
+        with pytest.raises(ValueError):
+            parse_combined_analysis(text)
+
+
+def test_two_generations_per_ticket(model):
+    before = model.calls
+    sentiment, response = analyze_and_respond("Broken charger", "My charger stopped working")
+    assert model.calls == before + 2
+    assert sentiment["sentiment"] in ("positive", "neutral", "negative", "frustrated")
+    assert response[0] == "Re: your support request"
+
+
+def test_unusable_reply_falls_back_to_separate_calls(model, monkeypatch):
+    real = model.generate_content
+    prompts = []
+
+    def generate_content(prompt, **kwargs):
+        prompts.append(prompt)
+        if "'sentiment_type', 'product_name' and 'issue_sentence'" in prompt:
+            return SimpleNamespace(text="not json")
+        return real(prompt, **kwargs)
+
+    monkeypatch.setattr(model, "generate_content", generate_content)
+    sentiment, response = analyze_and_respond("Broken charger", "My charger stopped working")
+    assert sentiment["sentiment"] and response[0] == "Re: your support request"
+    # combined, then sentiment, extraction and generation
+    assert len(prompts) == 4
+
+
+def test_confident_local_sentiment_skips_the_combined_call(model, monkeypatch):
+    from models import S
+
+    monkeypatch.setattr(S, "classify_locally", lambda title, body: ("positive", 0.99))
+    prompts = []
+    real = model.generate_content
+    monkeypatch.setattr(model, "generate_content", lambda prompt, **kwargs: prompts.append(prompt) or real(prompt))
+    sentiment, _ = analyze_and_respond("Thanks", "All working now")
+    assert sentiment["sentiment"] == "positive"
+    assert len(prompts) == 2
+    assert not any("'sentiment_type', 'product_name'" in prompt for prompt in prompts)
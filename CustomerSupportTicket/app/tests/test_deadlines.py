@@ -0,0 +1,60 @@
+import itertools
+import threading
+import time
+
+import pytest
+
+from models.deadlines import DeadlineExceeded, DeadlineRunner, LatencyBudget
+
+
+@pytest.fixture
+def release():
+    event = threading.Event()
+    yield event
+    event.set()  # let abandoned calls finish
+
+
+def test_result_within_deadline_and_errors_reraised():
+    runner = DeadlineRunner(max_workers=4)
+    assert runner.call("stage", lambda x: x * 2, 21, timeout=1) == 42
+
+    def fail():
+        raise ConnectionError("down")
+
+    with pytest.raises(ConnectionError):
+        runner.call("stage", fail, timeout=1)
+
+
+def test_slow_call_is_abandoned_at_the_deadline(release):
+    runner = DeadlineRunner(max_workers=4)
+    start = time.monotonic()
+    with pytest.raises(DeadlineExceeded):
+        runner.call("stage", release.wait, timeout=0.1)
+    assert time.monotonic() - start < 1
+    assert runner.stats()["timeouts"] == 1
+
+
+def test_hedge_answers_when_the_first_attempt_stalls(release):
+    runner = DeadlineRunner(max_workers=4, hedge_max_fraction=0, hedge_burst=1)
+    attempt = itertools.count()
+
+    def call():
+        if next(attempt) == 0:
+            release.wait()
+            return "primary"
+        return "hedge"
+
+    assert runner.call("stage", call, timeout=2, hedge_after=0.05) == "hedge"
+    # The single banked hedge is spent: the next stalled call is not duplicated
+    attempt = itertools.count()
+    with pytest.raises(DeadlineExceeded):
+        runner.call("stage", call, timeout=0.2, hedge_after=0.05)
+    assert runner.stats()["hedges"] == 1
+
+
+def test_budget_caps_each_stage():
+    budget = LatencyBudget(0.05)
+    assert budget.stage_timeout(10) <= 0.05
+    time.sleep(0.06)
+    with pytest.raises(DeadlineExceeded):
+        budget.stage_timeout(10)
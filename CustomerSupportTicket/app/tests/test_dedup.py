@@ -0,0 +1,125 @@
+import time
+
+import numpy as np
+import pytest
+
+from models.dedup import MinHashLSH, dedup_namespace
+
+TICKET = ("Our Cisco router ISR4331 keeps dropping the WAN link every few minutes since the firmware "
+          "update yesterday. Please advise how to roll back to the previous version.")
+
+
+@pytest.fixture
+def lsh():
+    return MinHashLSH(threshold=0.7, num_perm=128, bands=32)
+
+
+def test_identical_and_near_identical_text_match(lsh):
+    lsh.add("original", lsh.signature(TICKET))
+    key, similarity = lsh.query(lsh.signature("Fwd:  " + TICKET.upper()))
+    assert key == "original" and similarity == 1.0
+    match = lsh.query(lsh.signature(TICKET + " Sent from my iPhone"))
+    assert match is not None and match[0] == "original" and match[1] >= 0.7
+
+
+def test_unrelated_text_does_not_match(lsh):
+    lsh.add("original", lsh.signature(TICKET))
+    assert lsh.query(lsh.signature("How do I change the billing address on my invoice for next month?")) is None
+
+
+def test_threshold_is_applied_to_estimated_similarity():
+    # 3 new shingles on top of the original's 25: true Jaccard similarity 25/28
+    variant = TICKET + " Thanks so much"
+    strict, loose = MinHashLSH(threshold=0.97), MinHashLSH(threshold=0.8)
+    for lsh in (strict, loose):
+        lsh.add("original", lsh.signature(TICKET))
+    assert strict.query(strict.signature(variant)) is None
+    key, similarity = loose.query(loose.signature(variant))
+    assert key == "original" and similarity == pytest.approx(25 / 28, abs=0.06)
+
+
+def test_namespaces_keep_customers_apart(lsh):
+    lsh.add("a", lsh.signature(TICKET), dedup_namespace("A@Example.com "))
+    assert lsh.query(lsh.signature(TICKET), dedup_namespace("a@example.com")) is not None
+    assert lsh.query(lsh.signature(TICKET), dedup_namespace("b@example.com")) is None
+
+
+def test_window_expires_old_and_excess_entries():
+    lsh = MinHashLSH(window_seconds=60, window_size=2)
+    lsh.add("old", lsh.signature(TICKET), added_at=time.time() - 120)
+    assert lsh.query(lsh.signature(TICKET)) is None
+    for key in ("k1", "k2", "k3"):
+        lsh.add(key, lsh.signature(f"{TICKET} {key}"))
+    assert lsh.stats()["entries"] == 2
+    lsh.discard("k3")
+    assert lsh.stats()["entries"] == 1
+
+
+def test_save_and_load_round_trip(lsh, tmp_path):
+    lsh.add("original", lsh.signature(TICKET), "ns")
+    path = str(tmp_path / "dedup.npz")
+    lsh.save(path)
+    restored = MinHashLSH()
+    assert restored.load(path) == 1
+    assert restored.query(restored.signature(TICKET), "ns")[0] == "original"
+
+
+def test_bands_must_divide_permutations():
+    with pytest.raises(ValueError):
+        MinHashLSH(num_perm=100, bands=32)
+    assert MinHashLSH().signature("").dtype == np.uint64
+
+
+def test_namespaces_keep_different_order_numbers_apart(lsh):
+    first = "My order 123 has not arrived yet, it was due last week. Please help."
+    second = first.replace("123", "456")
+    lsh.add("first", lsh.signature(first), dedup_namespace("a@example.com", first))
+    assert lsh.query(lsh.signature(second), dedup_namespace("a@example.com", second)) is None
+    assert lsh.query(lsh.signature(first), dedup_namespace("a@example.com", "Re: " + first)) is not None
+
+
+def test_only_confirmed_duplicates_are_counted(lsh):
+    lsh.add("original", lsh.signature(TICKET))
+    assert lsh.query(lsh.signature(TICKET)) is not None
+    assert lsh.stats()["duplicates"] == 0
+    lsh.record_duplicate()
+    assert lsh.stats()["checked"] == 1 and lsh.stats()["duplicates"] == 1
+
+
+@pytest.fixture
+def dedup_client(app_client, monkeypatch):
+    import appp
+
+    monkeypatch.setattr(appp, "DEDUP_ENABLED", True)
+    monkeypatch.setattr(appp, "ticket_dedup", MinHashLSH())
+    return app_client
+
+
+def test_resent_ticket_is_linked_and_still_answered(dedup_client):
+    client, collection, sent = dedup_client
+    ticket = {"subject": "Late delivery", "customer_email": "a@example.com",
+              "body": "My order 123 has not arrived yet, it was due last week. Please help."}
+    first = client.post("/process-ticket/", json=ticket).json()
+    resent = client.post("/process-ticket/", json={**ticket, "subject": "Fwd: Late delivery"}).json()
+    other = client.post("/process-ticket/", json={**ticket, "body": ticket["body"].replace("123", "456")}).json()
+
+    assert resent["duplicate_of"] == first["ticket_id"]
+    assert "duplicate_of" not in other
+    assert len(collection.documents) == len(sent) == 3
+    assert sent[1]["Body"] == sent[0]["Body"]
+
+    # Stored duplicates must stay JSON-serializable in the full listing
+    listing = client.get("/tickets", params={"full": "true"})
+    assert listing.status_code == 200
+    duplicate = next(t for t in listing.json()["tickets"] if t["ticket_id"] == resent["ticket_id"])
+    assert duplicate["duplicate_of"] == first["ticket_id"]
+    assert client.get("/dedup/stats").json()["duplicates"] == 1
+
+
+def test_missing_original_is_not_counted(dedup_client):
+    client, collection, sent = dedup_client
+    ticket = {"subject": "Late delivery", "body": "My order 123 has not arrived.", "customer_email": "a@example.com"}
+    client.post("/process-ticket/", json=ticket)
+    collection.documents.clear()
+    assert "duplicate_of" not in client.post("/process-ticket/", json=ticket).json()
+    assert client.get("/dedup/stats").json()["duplicates"] == 0
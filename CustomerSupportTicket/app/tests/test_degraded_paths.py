@@ -0,0 +1,83 @@
+from types import SimpleNamespace
+
+import pytest
+
+
+def test_process_ticket_stores_then_notifies(app_client):
+    client, collection, sent = app_client
+    response = client.post("/process-ticket/", json={
+        "subject": "Security problem", "body": "Possible data breach on my account", "customer_email": "a@b.com",
+    })
+    assert response.status_code == 200
+    document = collection.documents[0]
+    assert str(document["_id"]) == response.json()["ticket_id"]
+    assert document["escalation_required"] is True and "degraded" not in document
+    assert [payload["To"] for payload in sent] == ["a@b.com"]
+
+
+def test_gemini_outage_uses_fallbacks(app_client, monkeypatch):
+    from models.clients import registry
+
+    def unavailable(*args, **kwargs):
+        raise ConnectionError("Gemini unavailable")
+
+    monkeypatch.setattr(registry.gemini_model(), "generate_content", unavailable)
+    client, collection, _ = app_client
+    response = client.post("/process-ticket/", json={
+        "subject": "Refund", "body": "Urgent refund problem", "customer_email": "a@b.com",
+    })
+    assert response.status_code == 200
+    document = collection.documents[0]
+    assert document["sentiment"] is None
+    assert document["escalation_required"] is True
+    assert set(document["degraded"]) == {"canned_response", "keyword_escalation"}
+    assert document["response"][0] == "Re: Refund"
+
+
+def test_open_mongo_circuit_returns_503(app_client):
+    from models.breakers import mongo_breaker
+
+    client, collection, sent = app_client
+    for _ in range(mongo_breaker.failure_threshold):
+        mongo_breaker.record_failure("down")
+    response = client.post("/process-ticket/", json={"subject": "s", "body": "b", "customer_email": "a@b.com"})
+    assert response.status_code == 503
+    assert int(response.headers["Retry-After"]) >= 1
+    assert collection.documents == [] and sent == []
+    health = client.get("/health")
+    assert health.status_code == 503 and health.json()["dependencies"]["mongo"]["state"] == "open"
+
+
+def test_sentiment_llm_raises_open_circuit_and_returns_none_for_bad_reply(app_client, monkeypatch):
+    from models.breakers import CircuitOpenError, gemini_breaker
+    from models.clients import registry
+    from models.S import analyze_sentiment_llm
+
+    monkeypatch.setattr(registry.gemini_model(), "generate_content", lambda prompt: SimpleNamespace(text="not json"))
+    assert analyze_sentiment_llm("Refund", "Where is my refund?") is None
+
+    for _ in range(gemini_breaker.failure_threshold):
+        gemini_breaker.record_failure("down")
+    with pytest.raises(CircuitOpenError):
+        analyze_sentiment_llm("Refund", "Where is my refund?")
+
+
+def test_open_gemini_circuit_degrades_combined_mode(app_client, monkeypatch):
+    import appp
+    from models import combined
+    from models.breakers import gemini_breaker
+
+    def unusable(title, body):
+        raise ValueError("unparseable combined reply")
+
+    monkeypatch.setattr(appp, "TICKET_ANALYSIS_MODE", "combined")
+    monkeypatch.setattr(combined, "analyze_combined", unusable)
+    monkeypatch.setattr(combined, "automate_response", lambda title, body: ("subject", "body"))
+    for _ in range(gemini_breaker.failure_threshold):
+        gemini_breaker.record_failure("down")
+    client, collection, _ = app_client
+    response = client.post("/process-ticket/", json={"subject": "Refund", "body": "Urgent refund problem", "customer_email": "a@b.com"})
+    assert response.status_code == 200
+    document = collection.documents[0]
+    assert tuple(document["response"]) == ("subject", "body")
+    assert document["sentiment"] is None and document["degraded"] == ["keyword_escalation"]
@@ -0,0 +1,31 @@
+import numpy as np
+import pytest
+
+from models.embedding_cache import EmbeddingCache
+
+
+def test_hit_is_shared_across_instances_and_normalized_text(tmp_path):
+    path = str(tmp_path / "embeddings.sqlite3")
+    calls = []
+
+    def embed():
+        calls.append(1)
+        return [0.1, 0.2, 0.3]
+
+    first = EmbeddingCache(path).get_or_embed("model", "retrieval_document", "Screen flickers", embed)
+    second = EmbeddingCache(path)
+    cached = second.get_or_embed("model", "retrieval_document", "  screen FLICKERS ", embed)
+    assert len(calls) == 1
+    assert cached == pytest.approx(first, abs=1e-3)
+    assert second.stats()["hits"] == 1 and second.stats()["dtype"] == "float16"
+    assert second.get("other-model", "retrieval_document", "Screen flickers") is None
+
+
+def test_evict_keeps_most_recently_used(tmp_path):
+    cache = EmbeddingCache(str(tmp_path / "embeddings.sqlite3"), max_entries=2, dtype="float32")
+    for text in ("a", "b", "c"):
+        cache.put("model", "task", text, np.ones(4))
+    cache.get("model", "task", "a")
+    assert cache.evict() == 1
+    assert cache.get("model", "task", "b") is None
+    assert cache.get("model", "task", "a") == [1.0] * 4
@@ -0,0 +1,31 @@
+from models import index_builder, vector_index
+from models.vector_index import LocalVectorIndex
+
+
+def read_tickets(path, skip=0):
+    for row in range(skip + 1, 11):
+        yield index_builder._record(f"ticket-{row}", f"Subject {row}", f"Body {row}", f"Answer {row}", "tickets")
+
+
+def test_build_resumes_from_checkpoint_and_trains_ivf(app_client, tmp_path, monkeypatch):
+    from models.clients import registry
+
+    monkeypatch.setattr(index_builder, "SOURCES", {"tickets": "unused"})
+    monkeypatch.setattr(index_builder, "READERS", {"tickets": read_tickets})
+    monkeypatch.setattr(vector_index, "IVF_MIN_VECTORS", 6)
+    index = LocalVectorIndex()
+    saves = []
+    monkeypatch.setattr(index, "save", lambda: saves.append(len(index)))
+    registry.override(index=index)
+    checkpoint_path = str(tmp_path / "checkpoint.json")
+
+    checkpoint = index_builder.build_index(["tickets"], batch_size=2, checkpoint_path=checkpoint_path,
+                                           limit=4, save_every=1)
+    assert checkpoint == {"sources": {"tickets": 4}, "upserted": 4}
+    assert len(index) == 4 and index.describe_index_stats()["ivf_lists"] == 0
+
+    checkpoint = index_builder.build_index(["tickets"], batch_size=2, checkpoint_path=checkpoint_path, save_every=2)
+    assert checkpoint == {"sources": {"tickets": "complete"}, "upserted": 10}
+    assert index_builder.load_checkpoint(checkpoint_path) == checkpoint
+    assert len(index) == 10 and index.describe_index_stats()["ivf_lists"] > 0
+    assert saves[-1] == 10
@@ -0,0 +1,42 @@
+import pytest
+
+from models.I import escalateit, escalation_candidate, escalation_certain
+from models.keywords import KeywordMatcher, escalation_matcher
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("There is an issue with my order", {"critical": {"issue"}}),
+    ("Several issues and two crashes", {"critical": {"issue", "crash"}}),
+    ("URGENT: outage!", {"critical": {"urgent", "outage"}}),
+    ("Possible data\n  breach in our account", {"specific": {"data breach"}}),
+    ("security and refund", {"critical": {"refund"}, "specific": {"security"}}),
+])
+def test_matches_whole_words(text, expected):
+    assert escalation_matcher.matches(text) == expected
+
+
+@pytest.mark.parametrize("text", [
+    "Please send a tissue",           # "issue" inside a word
+    "The problematic_field is empty",  # followed by a word character
+    "non_urgent request",              # preceded by an underscore
+    "securityteam@example.com",
+    "",
+    None,
+])
+def test_ignores_keywords_inside_words(text):
+    assert escalation_matcher.matches(text) == {}
+
+
+def test_shared_prefixes_and_custom_rules():
+    matcher = KeywordMatcher({"a": ["crash", "critical"], "b": ["cr"]})
+    assert matcher.matches("critical crash cr") == {"a": {"critical", "crash"}, "b": {"cr"}}
+    assert matcher.fired_rules("crib") == set()
+
+
+def test_escalation_rules_on_ticket_tags():
+    security = {"tag_1": "Security question", "tag_2": "", "priority": "low"}
+    generic = {"tag_1": "Problem with login", "priority": "low"}
+    assert escalation_certain(security) and escalation_candidate(security) and escalateit(security)
+    assert escalation_candidate(generic) and not escalation_certain(generic)
+    assert not escalateit(generic)
+    assert escalateit({**generic, "priority": "high"})
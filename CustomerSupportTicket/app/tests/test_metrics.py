@@ -0,0 +1,46 @@
+import pytest
+
+from models.metrics import MetricsRegistry, track_stage
+
+
+def test_histogram_renders_cumulative_buckets():
+    registry = MetricsRegistry()
+    histogram = registry.histogram("latency_seconds", "Latency.", ["stage"], buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 5.0):
+        histogram.observe(value, stage="mongo")
+    lines = registry.render().splitlines()
+    assert 'latency_seconds_bucket{stage="mongo",le="0.1"} 1' in lines
+    assert 'latency_seconds_bucket{stage="mongo",le="1.0"} 2' in lines
+    assert 'latency_seconds_bucket{stage="mongo",le="+Inf"} 3' in lines
+    assert 'latency_seconds_count{stage="mongo"} 3' in lines
+    assert 'latency_seconds_sum{stage="mongo"} 5.55' in lines
+
+
+def test_labels_are_escaped_and_collectors_read_at_scrape_time():
+    registry = MetricsRegistry()
+    registry.counter("errors_total", "Errors.", ["reason"]).inc(reason='bad "quote"\n')
+    hits = {"count": 1}
+    registry.collector(lambda: [("cache_hits_total", "counter", "Hits.", [({"stage": "sentiment"}, hits["count"])])])
+    hits["count"] = 7
+    lines = registry.render().splitlines()
+    assert 'errors_total{reason="bad \\"quote\\"\\n"} 1' in lines
+    assert 'cache_hits_total{stage="sentiment"} 7' in lines
+
+
+def sample(text, name):
+    return next(float(line.split()[-1]) for line in text.splitlines() if line.startswith(name + " "))
+
+
+def test_track_stage_counts_failures_and_llm_calls(app_client):
+    client, _, _ = app_client
+    with pytest.raises(RuntimeError):
+        with track_stage("test_stage", llm_call=True):
+            raise RuntimeError("down")
+    with track_stage("test_stage", llm_call=True):
+        pass
+    response = client.get("/metrics")
+    assert response.status_code == 200 and response.headers["content-type"].startswith("text/plain")
+    text = response.text
+    assert sample(text, 'ticket_stage_failures_total{stage="test_stage"}') >= 1
+    assert sample(text, 'llm_calls_total{stage="test_stage",outcome="ok"}') >= 1
+    assert sample(text, 'ticket_stage_in_flight{stage="test_stage"}') == 0
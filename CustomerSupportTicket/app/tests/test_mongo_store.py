@@ -0,0 +1,88 @@
+import json
+import threading
+import time
+
+from pymongo.errors import BulkWriteError
+
+from models.mongo_store import DUPLICATE_KEY_ERROR, WriteBehindBuffer
+
+
+class FlakyCollection:
+    """
+    insert_many fails the first `failures` calls; records the time of every call.
+    """
+
+    def __init__(self, failures=0, error=None):
+        self.failures = failures
+        self.error = error or ConnectionError("mongo down")
+        self.calls = []
+        self.stored = []
+        self.called = threading.Event()
+
+    def insert_many(self, documents, ordered=True):
+        self.calls.append(time.monotonic())
+        self.called.set()
+        if len(self.calls) <= self.failures:
+            raise self.error
+        self.stored.extend(documents)
+
+
+def wait_for(predicate, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not predicate() and time.monotonic() < deadline:
+        time.sleep(0.005)
+    return predicate()
+
+
+def make_buffer(collection, tmp_path, **kwargs):
+    options = dict(batch_size=1, max_delay=5.0, max_attempts=3, retry_delay=0.05,
+                   dead_letter_path=str(tmp_path / "dead.jsonl"))
+    options.update(kwargs)
+    return WriteBehindBuffer(collection, **options)
+
+
+def test_full_retried_batch_waits_for_the_backoff(tmp_path):
+    # batch_size=1: the re-queued document alone is a full batch
+    collection = FlakyCollection(failures=2)
+    buffer = make_buffer(collection, tmp_path)
+    buffer.add({"n": 1})
+    assert wait_for(lambda: len(collection.stored) == 1)
+    gaps = [later - earlier for earlier, later in zip(collection.calls, collection.calls[1:])]
+    assert gaps[0] >= 0.05 and gaps[1] >= 0.1  # doubled after the second failure
+    assert buffer.stats["retried"] == 2 and buffer.stats["dead_lettered"] == 0
+    buffer.close()
+
+
+def test_dead_letter_after_max_attempts(tmp_path):
+    collection = FlakyCollection(failures=10)
+    buffer = make_buffer(collection, tmp_path, retry_delay=0.01)
+    document_id = buffer.add({"n": 1})
+    assert wait_for(lambda: buffer.stats["dead_lettered"] == 1)
+    assert len(collection.calls) == 3
+    record = json.loads((tmp_path / "dead.jsonl").read_text())
+    assert record["attempts"] == 3 and record["document"]["_id"] == str(document_id)
+    buffer.close()
+
+
+def test_only_documents_with_write_errors_are_retried(tmp_path):
+    error = BulkWriteError({"writeErrors": [
+        {"index": 0, "code": DUPLICATE_KEY_ERROR, "errmsg": "duplicate key"},
+        {"index": 1, "code": 91, "errmsg": "shutdown in progress"},
+    ]})
+    collection = FlakyCollection(failures=1, error=error)
+    buffer = make_buffer(collection, tmp_path, batch_size=2)
+    first, second = buffer.add({"n": 1}), buffer.add({"n": 2})
+    assert wait_for(lambda: collection.stored)
+    assert [document["_id"] for document in collection.stored] == [second]
+    assert buffer.stats["written"] == 2 and first != second
+    buffer.close()
+
+
+def test_close_dead_letters_instead_of_retrying(tmp_path):
+    collection = FlakyCollection(failures=10)
+    buffer = make_buffer(collection, tmp_path, batch_size=100, retry_delay=60)
+    buffer.add({"n": 1})
+    started = time.monotonic()
+    buffer.close()
+    assert time.monotonic() - started < 5
+    assert len(collection.calls) == 1 and buffer.stats["dead_lettered"] == 1
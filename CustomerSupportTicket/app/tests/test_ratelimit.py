@@ -0,0 +1,73 @@
+import pytest
+
+from models import ratelimit
+from models.ratelimit import RateLimiter, SQLiteRateLimiter, TokenBucket, estimate_tokens
+
+
+def test_bucket_refills_up_to_capacity():
+    bucket = TokenBucket(capacity=10, rate=2, level=0, updated=100.0)
+    bucket.refill(102.5)
+    assert bucket.level == pytest.approx(5)
+    bucket.refill(200.0)
+    assert bucket.level == 10
+    bucket.refill(150.0)  # a clock going backwards adds nothing
+    assert bucket.level == 10
+
+
+def test_wait_time():
+    bucket = TokenBucket(capacity=10, rate=2, level=4, updated=0.0)
+    assert bucket.wait_time(4) == 0.0
+    assert bucket.wait_time(8) == pytest.approx(2)
+    # More than the whole bucket only waits for it to be full
+    assert bucket.wait_time(50) == pytest.approx(3)
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+        self.slept = []
+
+    def time(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.slept.append(seconds)
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    # The in-process limiter reads monotonic time, the SQLite one wall-clock time
+    monkeypatch.setattr(ratelimit.time, "monotonic", clock.time)
+    monkeypatch.setattr(ratelimit.time, "time", clock.time)
+    monkeypatch.setattr(ratelimit.time, "sleep", clock.sleep)
+    return clock
+
+
+def test_limiter_enforces_requests_per_minute(clock):
+    limiter = RateLimiter(requests_per_minute=2, tokens_per_minute=1000)
+    assert limiter.acquire() == 0.0
+    assert limiter.acquire() == 0.0
+    assert limiter.acquire() == pytest.approx(30)
+
+
+def test_limiter_enforces_tokens_per_minute(clock):
+    limiter = RateLimiter(requests_per_minute=100, tokens_per_minute=600)
+    assert limiter.acquire(600) == 0.0
+    assert limiter.acquire(100) == pytest.approx(10)
+    limiter.reset()
+    assert limiter.acquire(600) == 0.0
+
+
+def test_sqlite_limiter_shares_budget_between_instances(tmp_path, clock):
+    path = str(tmp_path / "rate.sqlite3")
+    first = SQLiteRateLimiter(path, requests_per_minute=1, tokens_per_minute=1000)
+    second = SQLiteRateLimiter(path, requests_per_minute=1, tokens_per_minute=1000)
+    assert first.acquire() == 0.0
+    assert second.acquire() == pytest.approx(60)
+
+
+def test_estimate_tokens():
+    assert estimate_tokens("") == 1
+    assert estimate_tokens("x" * 400) == 100
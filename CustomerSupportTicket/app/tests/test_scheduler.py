@@ -0,0 +1,105 @@
+import threading
+import time
+
+import pytest
+
+from models import scheduler as scheduler_module
+from models.breakers import CircuitBreaker, CircuitOpenError
+from models.scheduler import LLMScheduler
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_scheduler(**kwargs):
+    kwargs.setdefault("max_concurrency", 1)
+    kwargs.setdefault("reserved_slots", 0)
+    return LLMScheduler(limiter=None, breaker=None, **kwargs)
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        if condition():
+            return True
+        time.sleep(0.005)
+    return False
+
+
+def queue(scheduler, priority_class, granted):
+    """
+    Start a thread that waits for a slot in `priority_class`, then records the grant
+    and keeps the slot. Returns once the thread is queued.
+    """
+    queued = sum(scheduler.stats()["queued"].values())
+
+    def wait():
+        scheduler._acquire(priority_class)
+        granted.append(priority_class)
+
+    thread = threading.Thread(target=wait, daemon=True)
+    thread.start()
+    assert wait_for(lambda: sum(scheduler.stats()["queued"].values()) == queued + 1)
+    return thread
+
+
+def release_and_wait(scheduler, granted, thread):
+    count = len(granted)
+    scheduler._release()
+    thread.join(timeout=5)
+    assert len(granted) == count + 1
+
+
+def test_freed_slot_goes_to_the_best_class():
+    scheduler = make_scheduler()
+    granted = []
+    scheduler._acquire("standard")
+    bulk = queue(scheduler, "bulk", granted)
+    escalated = queue(scheduler, "escalated", granted)
+    release_and_wait(scheduler, granted, escalated)
+    release_and_wait(scheduler, granted, bulk)
+    assert granted == ["escalated", "bulk"]
+
+
+def test_reserved_slots_only_serve_escalated_calls():
+    scheduler = make_scheduler(reserved_slots=1)
+    granted = []
+    scheduler._acquire("standard")
+    standard = queue(scheduler, "standard", granted)
+    assert scheduler._acquire("escalated") == 0.0  # a reserved slot, no wait
+    assert scheduler.stats()["running"] == 2
+
+    # Freeing the slot above the cap does not let the standard call in
+    scheduler._release()
+    assert scheduler.stats()["running"] == 1 and scheduler.stats()["queued"]["standard"] == 1
+    release_and_wait(scheduler, granted, standard)
+    assert granted == ["standard"]
+
+
+def test_waiting_bulk_call_ages_past_new_escalations(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(scheduler_module.time, "monotonic", clock)
+    scheduler = make_scheduler(aging_seconds=10)
+    granted = []
+    scheduler._acquire("standard")
+    bulk = queue(scheduler, "bulk", granted)
+    clock.now += 25  # two and a half aging periods: bulk now ranks above escalated
+    escalated = queue(scheduler, "escalated", granted)
+    release_and_wait(scheduler, granted, bulk)
+    release_and_wait(scheduler, granted, escalated)
+    assert granted == ["bulk", "escalated"]
+
+
+def test_open_circuit_fails_without_queueing():
+    breaker = CircuitBreaker("test-gemini", failure_threshold=1, recovery_seconds=60)
+    breaker.record_failure("down")
+    scheduler = LLMScheduler(max_concurrency=1, limiter=None, breaker=breaker)
+    with pytest.raises(CircuitOpenError):
+        with scheduler.slot(priority_class="bulk"):
+            pass
+    assert scheduler.stats()["running"] == 0 and scheduler.stats()["granted"]["bulk"] == 0
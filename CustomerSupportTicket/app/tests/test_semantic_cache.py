@@ -0,0 +1,20 @@
+from models.semantic_cache import SemanticResponseCache
+
+
+def test_rewording_of_an_answered_issue_is_reused():
+    cache = SemanticResponseCache(max_distance=0.08, enabled=True)
+    cache.store("Phone", "screen flickers", [1.0, 0.0, 0.0], "Re: screen", "Try this")
+    match = cache.lookup("phone", "the screen keeps flickering", [0.99, 0.1, 0.0])
+    assert (match["subject"], match["body"]) == ("Re: screen", "Try this")
+    assert cache.lookup("Phone", "battery drains", [0.0, 1.0, 0.0]) is None
+    assert cache.lookup("Laptop", "screen flickers", [1.0, 0.0, 0.0]) is None
+
+
+def test_issues_with_identifiers_are_never_shared():
+    cache = SemanticResponseCache(enabled=True)
+    cache.store("Phone", "order 123 arrived damaged", [1.0, 0.0], "Re: order 123", "Order 123 is replaced")
+    assert cache.stats()["entries"] == 0
+    cache.store("Phone", "order arrived damaged", [1.0, 0.0], "Re: order", "We will replace it")
+    assert cache.lookup("Phone", "order 456 arrived damaged", [1.0, 0.0]) is None
+    assert cache.stats()["skipped"] == 1 and cache.stats()["misses"] == 0
+
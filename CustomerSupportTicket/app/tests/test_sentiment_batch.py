@@ -0,0 +1,53 @@
+import pytest
+
+from models.S import analyze_sentiment_batch, plan_sentiment_batches
+
+TICKETS = [(f"Ticket {i}", f"My order {i} is late") for i in range(6)]
+
+
+@pytest.fixture
+def model(app_client):
+    from models.clients import registry
+
+    return registry.gemini_model()
+
+
+def test_batches_respect_size_and_token_budget():
+    assert plan_sentiment_batches(TICKETS, max_batch=4, token_budget=10 ** 6) == [[0, 1, 2, 3], [4, 5]]
+    long_ticket = ("Long", "word " * 4000)
+    assert len(plan_sentiment_batches([long_ticket, long_ticket], max_batch=10, token_budget=6000)) == 2
+
+
+def test_one_call_per_batch(model):
+    before = model.calls
+    results = analyze_sentiment_batch(TICKETS, max_batch=3)
+    assert model.calls == before + 2
+    assert all(result["sentiment"] for result in results)
+
+
+def test_unusable_reply_is_retried_as_halves(model, monkeypatch):
+    real = model.generate_content
+    prompts = []
+
+    def generate_content(prompt, **kwargs):
+        prompts.append(prompt)
+        if len(prompts) == 1:
+            return type("Reply", (), {"text": "not json"})()
+        return real(prompt, **kwargs)
+
+    monkeypatch.setattr(model, "generate_content", generate_content)
+    results = analyze_sentiment_batch(TICKETS[:4], max_batch=4)
+    assert len(prompts) == 3 and all(results)
+
+
+def test_network_errors_are_raised_without_splitting(model, monkeypatch):
+    calls = []
+
+    def unavailable(prompt, **kwargs):
+        calls.append(prompt)
+        raise ConnectionError("Gemini unavailable")
+
+    monkeypatch.setattr(model, "generate_content", unavailable)
+    with pytest.raises(ConnectionError):
+        analyze_sentiment_batch(TICKETS[:4], max_batch=4)
+    assert len(calls) == 1
@@ -0,0 +1,115 @@
+import json
+
+import pytest
+
+from models.R import parse_streamed_response
+
+
+def body_text(events):
+    return "".join(text for kind, text in events if kind == "token")
+
+
+def test_subject_split_across_chunks():
+    events = list(parse_streamed_response(["Subj", "ect: Hello\n", "\nBody one", " two"]))
+    assert events[0] == ("subject", "Hello")
+    assert body_text(events) == "Body one two"
+
+
+def test_code_fences_are_dropped():
+    events = list(parse_streamed_response(["```text\nSubject: Hi\n\nBody`", "``", "`\n"]))
+    assert events == [("subject", "Hi"), ("token", "Body")]
+
+
+def test_inline_backticks_are_kept():
+    events = list(parse_streamed_response(["Subject: Hi\n\nuse `x`", " here"]))
+    assert body_text(events) == "use `x` here"
+
+
+def test_missing_subject_line():
+    events = list(parse_streamed_response(["Just a body\nmore"]))
+    assert events == [("subject", "No subject"), ("token", "Just a body\nmore")]
+
+
+def parse_events(text):
+    events = []
+    for block in text.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.splitlines())
+        events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+
+@pytest.fixture
+def stream_client(app_client):
+    from models.clients import registry
+
+    registry.gemini_model().token_seconds = 0
+    return app_client
+
+
+TICKET = {"subject": "Router down", "body": "Our router keeps rebooting", "customer_email": "a@b.com"}
+
+
+def test_stream_stores_and_notifies(stream_client):
+    client, collection, sent = stream_client
+    events = parse_events(client.post("/process-ticket/stream", json=TICKET).text)
+    kinds = [kind for kind, _ in events]
+    assert kinds[:3] == ["sentiment", "escalation", "subject"] and kinds[-1] == "done"
+    body = "".join(data["text"] for kind, data in events if kind == "token")
+    document = collection.documents[0]
+    assert str(document["_id"]) == events[-1][1]["ticket_id"]
+    assert tuple(document["response"]) == ("Re: your support request", body)
+    assert len(sent) == 1
+
+
+def test_stream_falls_back_when_sentiment_fails(stream_client, monkeypatch):
+    import appp
+
+    def unavailable(title, body):
+        raise ConnectionError("Gemini unavailable")
+
+    monkeypatch.setattr(appp, "analyze_sentiment", unavailable)
+    client, collection, sent = stream_client
+    events = parse_events(client.post("/process-ticket/stream", json=TICKET).text)
+    assert events[0] == ("sentiment", {"sentiment": None, "thought": "Sentiment unavailable; escalation decided by keywords only."})
+    assert events[-1][0] == "done"
+    assert collection.documents[0]["degraded"] == ["keyword_escalation"]
+    assert len(sent) == 1
+
+
+def test_stream_fails_fast_while_mongo_is_down(stream_client):
+    from models.breakers import mongo_breaker
+
+    client, collection, sent = stream_client
+    for _ in range(mongo_breaker.failure_threshold):
+        mongo_breaker.record_failure("down")
+    response = client.post("/process-ticket/stream", json=TICKET)
+    assert response.status_code == 503 and "Retry-After" in response.headers
+    assert client.get("/process-ticket/stream", params=TICKET).status_code == 503
+    assert collection.documents == [] and sent == []
+
+
+def test_stream_insert_is_timed(stream_client):
+    client, _, _ = stream_client
+    before = client.get("/metrics").text
+    client.post("/process-ticket/stream", json=TICKET)
+    after = client.get("/metrics").text
+
+    def mongo_count(text):
+        lines = [line for line in text.splitlines() if line.startswith("ticket_stage_duration_seconds_count") and 'stage="mongo"' in line]
+        return float(lines[0].rsplit(" ", 1)[1]) if lines else 0.0
+
+    assert mongo_count(after) == mongo_count(before) + 1
+
+
+def test_stream_replays_a_duplicate(stream_client, monkeypatch):
+    import appp
+    from models.dedup import MinHashLSH
+
+    monkeypatch.setattr(appp, "DEDUP_ENABLED", True)
+    monkeypatch.setattr(appp, "ticket_dedup", MinHashLSH())
+    client, collection, sent = stream_client
+    first = parse_events(client.post("/process-ticket/stream", json=TICKET).text)
+    again = parse_events(client.post("/process-ticket/stream", json=TICKET).text)
+    assert again[-1][1]["duplicate_of"] == first[-1][1]["ticket_id"]
+    assert again[0] == first[0]
+    assert len(collection.documents) == len(sent) == 2
@@ -0,0 +1,52 @@
+from bson import ObjectId
+
+
+def seed(collection, count):
+    ids = []
+    for i in range(count):
+        ticket_id = ObjectId()
+        ids.append(ticket_id)
+        collection.documents.append({
+            "_id": ticket_id,
+            "customer_email": f"user{i % 2}@example.com",
+            "customer_ticket": f"ticket {i}",
+            "sentiment": "negative",
+            "escalation_required": i % 2 == 0,
+            "priority": "high" if i % 2 == 0 else "low",
+            "response": ["subject", "body"],
+        })
+    return [str(ticket_id) for ticket_id in reversed(ids)]  # newest first
+
+
+def test_keyset_pages_cover_every_ticket_once(app_client):
+    client, collection, _ = app_client
+    newest_first = seed(collection, 5)
+    seen, cursor = [], None
+    while True:
+        params = {"limit": 2, **({"cursor": cursor} if cursor else {})}
+        page = client.get("/tickets", params=params).json()
+        seen.extend(ticket["ticket_id"] for ticket in page["tickets"])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+        assert cursor == page["tickets"][-1]["ticket_id"]
+    assert seen == newest_first
+
+
+def test_filters_and_projection(app_client):
+    client, collection, _ = app_client
+    newest_first = seed(collection, 6)
+    page = client.get("/tickets", params={"escalation_required": "true", "limit": 10}).json()
+    assert [ticket["ticket_id"] for ticket in page["tickets"]] == newest_first[1::2]
+    assert page["next_cursor"] is None
+    assert "response" not in page["tickets"][0] and "created_at" in page["tickets"][0]
+
+    full = client.get("/tickets", params={"limit": 1, "full": "true"}).json()
+    assert full["tickets"][0]["response"] == ["subject", "body"]
+    assert full["next_cursor"] == newest_first[0]
+
+
+def test_invalid_cursor_and_limit(app_client):
+    client, collection, _ = app_client
+    assert client.get("/tickets", params={"cursor": "not-an-id"}).status_code == 400
+    assert client.get("/tickets", params={"limit": 0}).status_code == 422
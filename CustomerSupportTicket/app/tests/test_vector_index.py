@@ -0,0 +1,88 @@
+import numpy as np
+import pytest
+
+from models.vector_index import LocalVectorIndex
+
+
+def ids(result):
+    return [match["id"] for match in result["matches"]]
+
+
+def test_query_returns_nearest_first():
+    index = LocalVectorIndex()
+    index.upsert([("x", [1, 0, 0]), ("y", [0, 1, 0]), ("xy", [1, 1, 0], {"label": "both"})])
+    result = index.query([1, 0.1, 0], top_k=2, include_metadata=True)
+    assert ids(result) == ["x", "xy"]
+    assert result["matches"][0]["score"] == pytest.approx(1 / np.sqrt(1.01))
+    assert result["matches"][1]["metadata"] == {"label": "both"}
+
+
+def test_upsert_replaces_existing_id():
+    index = LocalVectorIndex()
+    index.upsert([("a", [1, 0]), ("b", [0, 1])])
+    index.upsert([{"id": "a", "values": [0, 1], "metadata": {"v": 2}}])
+    assert len(index) == 2
+    matches = {match["id"]: match for match in index.query([0, 1], top_k=2, include_metadata=True)["matches"]}
+    assert matches["a"]["score"] == pytest.approx(1.0)
+    assert matches["a"]["metadata"] == {"v": 2}
+
+
+def test_repeated_id_in_one_batch_keeps_last_write():
+    index = LocalVectorIndex()
+    assert index.upsert([("a", [1, 0], {"v": 1}), ("a", [0, 1], {"v": 2})]) == {"upserted_count": 2}
+    assert len(index) == 1
+    match = index.query([0, 1], top_k=5, include_metadata=True)["matches"]
+    assert match == [{"id": "a", "score": pytest.approx(1.0), "metadata": {"v": 2}}]
+    # The index is still consistent for later writes
+    index.upsert([("b", [1, 0])])
+    assert ids(index.query([1, 0], top_k=1)) == ["b"]
+
+
+def test_dimension_mismatch_leaves_index_unchanged():
+    index = LocalVectorIndex()
+    index.upsert([("a", [1, 0])])
+    with pytest.raises(ValueError):
+        index.upsert([("b", [1, 0, 0])])
+    assert len(index) == 1
+    assert ids(index.query([1, 0], top_k=5)) == ["a"]
+
+
+def test_many_upserts_grow_capacity_geometrically():
+    index = LocalVectorIndex()
+    rng = np.random.default_rng(0)
+    for batch in range(50):
+        index.upsert([(f"{batch}-{i}", rng.normal(size=4)) for i in range(30)])
+    assert len(index) == 1500
+    assert len(index._store) < 2 * 1500 + 1024
+    probe = index._vectors[700]
+    assert ids(index.query(probe, top_k=1)) == [index._ids[700]]
+
+
+def test_save_load_then_upsert(tmp_path):
+    index = LocalVectorIndex()
+    index.upsert([("a", [1, 0]), ("b", [0, 1])])
+    index.save(str(tmp_path))
+    loaded = LocalVectorIndex.load(str(tmp_path))
+    loaded.upsert([("a", [0, 1]), ("c", [1, 1])])
+    assert len(loaded) == 3
+    assert ids(loaded.query([1, 0], top_k=1)) == ["c"]
+
+
+def test_ivf_search_finds_exact_match():
+    index = LocalVectorIndex()
+    rng = np.random.default_rng(1)
+    vectors = rng.normal(size=(400, 8))
+    index.upsert([(str(i), vector) for i, vector in enumerate(vectors)])
+    index.train_ivf(nlist=8)
+    assert ids(index.query(vectors[123], top_k=1, exact=False, nprobe=8)) == ["123"]
+
+
+def test_open_trains_ivf_for_a_large_index_saved_without_it(tmp_path, monkeypatch):
+    from models import vector_index
+
+    index = LocalVectorIndex()
+    index.upsert([(str(i), vector) for i, vector in enumerate(np.random.default_rng(2).normal(size=(200, 8)))])
+    index.save(str(tmp_path))
+    assert LocalVectorIndex.open(str(tmp_path)).describe_index_stats()["ivf_lists"] == 0
+    monkeypatch.setattr(vector_index, "IVF_MIN_VECTORS", 100)
+    assert LocalVectorIndex.open(str(tmp_path)).describe_index_stats()["ivf_lists"] > 0
@@ -0,0 +1,109 @@
+import json
+import time
+
+import pytest
+
+from models import webhooks
+from models.breakers import CircuitBreaker
+from models.webhooks import WebhookDispatcher
+
+
+class FakeResponse:
+    def __init__(self, status_code, text=""):
+        self.status_code = status_code
+        self.text = text
+
+
+class FakeClient:
+    """
+    Answers each POST with the next status code (or exception) in `replies`, then 200.
+    """
+
+    def __init__(self, replies):
+        self.replies = list(replies)
+        self.posts = []
+
+    async def post(self, url, json):
+        self.posts.append((url, json))
+        reply = self.replies.pop(0) if self.replies else 200
+        if isinstance(reply, Exception):
+            raise reply
+        return FakeResponse(reply, f"status {reply}")
+
+    async def aclose(self):
+        pass
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+@pytest.fixture
+def make_dispatcher(tmp_path, monkeypatch):
+    monkeypatch.setattr(webhooks, "WEBHOOK_BACKOFF_SECONDS", 0.01)
+    dispatchers = []
+
+    def make(replies, **kwargs):
+        client = FakeClient(replies)
+        kwargs.setdefault("breaker", CircuitBreaker("test-zapier", failure_threshold=100))
+        dispatcher = WebhookDispatcher(workers=2, max_attempts=3, dead_letter_path=str(tmp_path / "dead.jsonl"),
+                                       client_factory=lambda: client, **kwargs)
+        dispatchers.append(dispatcher)
+        return dispatcher, client
+
+    yield make
+    for dispatcher in dispatchers:
+        dispatcher.stop(timeout=1)
+
+
+def dead_letters(tmp_path):
+    path = tmp_path / "dead.jsonl"
+    return [json.loads(line) for line in path.read_text().splitlines()] if path.exists() else []
+
+
+def test_retries_until_delivered(make_dispatcher, tmp_path):
+    dispatcher, client = make_dispatcher([503, ConnectionError("reset")])
+    assert dispatcher.enqueue("https://hooks.example/a", {"n": 1})
+    assert wait_for(lambda: dispatcher.stats()["delivered"] == 1)
+    assert len(client.posts) == 3 and dispatcher.stats()["retried"] == 2
+    assert dead_letters(tmp_path) == []
+
+
+def test_dead_letters_after_max_attempts(make_dispatcher, tmp_path):
+    dispatcher, client = make_dispatcher([500, 502, 503])
+    dispatcher.enqueue("https://hooks.example/a", {"n": 1})
+    assert wait_for(lambda: dispatcher.stats()["dead_lettered"] == 1)
+    [record] = dead_letters(tmp_path)
+    assert record["payload"] == {"n": 1} and record["attempts"] == 3
+    assert record["error"].startswith("HTTP 503")
+
+
+def test_client_errors_are_not_retried(make_dispatcher, tmp_path):
+    dispatcher, client = make_dispatcher([400])
+    dispatcher.enqueue("https://hooks.example/a", {"n": 1})
+    assert wait_for(lambda: dispatcher.stats()["dead_lettered"] == 1)
+    assert len(client.posts) == 1 and dead_letters(tmp_path)[0]["attempts"] == 1
+
+
+def test_full_queue_dead_letters_without_blocking(make_dispatcher, tmp_path):
+    dispatcher, client = make_dispatcher([], max_queue=0)
+    assert dispatcher.enqueue("https://hooks.example/a", {"n": 1}) is False
+    [record] = dead_letters(tmp_path)
+    assert record["error"] == "webhook queue full" and record["attempts"] == 0
+    assert client.posts == []
+
+
+def test_open_circuit_holds_payloads_without_spending_attempts(make_dispatcher, tmp_path):
+    breaker = CircuitBreaker("test-zapier", failure_threshold=1, recovery_seconds=0.5)
+    breaker.record_failure("down")
+    dispatcher, client = make_dispatcher([], breaker=breaker)
+    dispatcher.enqueue("https://hooks.example/a", {"n": 1})
+    assert wait_for(lambda: dispatcher.stats()["held"] == 1)
+    assert client.posts == []
+    assert wait_for(lambda: dispatcher.stats()["delivered"] == 1)
+    assert dead_letters(tmp_path) == []